@@ -1,67 +1,159 @@
-from flask import Flask, jsonify, request
+from flask import Flask, Response, jsonify, request
 from flask_cors import CORS
 import psycopg2
-from psycopg2.extras import RealDictCursor, execute_values
-from datetime import datetime, timedelta
+from psycopg2.extras import execute_values
+from datetime import date, datetime, timedelta
+import csv
+import io
 import os
 import logging
+import threading
+
+from db_pool import get_pool
+from result_cache import TTLCache, cached
+from rolling_windows import RollingWindowEngine
+import partitions
+from live_updates import CHANNEL, Broadcaster, IngestListener, format_event
+from ingest_queue import BatchRejected, IngestQueue, QueueFull
+from serialization import COLUMNAR_MIMETYPE, JSON_MIMETYPE, FastJSONProvider, encode_body, negotiate_encoding
+from instrumentation import ENABLED as TIMING_METRICS, DictCursor, instrument_app, timed_checkout, timed_operation, timed_phase, timings
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+app.json = FastJSONProvider(app)
 CORS(app)
 
+# Request, DB-phase and serialization timings (TIMING_METRICS=1)
+instrument_app(app)
+
 DATABASE_URL = os.getenv('DATABASE_URL')
 
-def get_db_connection():
-    return psycopg2.connect(DATABASE_URL)
+# Analytics results, dropped whenever an insert commits
+analytics_cache = TTLCache(
+    maxsize=int(os.getenv('ANALYTICS_CACHE_SIZE', 64)),
+    ttl=float(os.getenv('ANALYTICS_CACHE_TTL', 60))
+)
+
+# Windowed aggregates for top-gainers, momentum and breakouts (set ROLLING_WINDOWS=0 to use SQL)
+ROLLING_WINDOWS = os.getenv('ROLLING_WINDOWS', '1') != '0'
+window_engine = RollingWindowEngine()
+
+# Server-Sent Events clients of this worker
+broadcaster = Broadcaster()
+
+@timed_checkout
+def db_connection():
+    """Check a pooled connection out for the duration of a `with` block"""
+    return get_pool().connection()
 
 def init_db():
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS stocks (
-            id SERIAL PRIMARY KEY,
-            run_timestamp TIMESTAMP NOT NULL,
-            symbol VARCHAR(20) NOT NULL,
-            stock_name VARCHAR(100),
-            pct_chg DECIMAL(10,2),
-            price DECIMAL(15,2),
-            volume BIGINT,
-            links VARCHAR(50),
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        );
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        
+        kind = partitions.table_kind(cursor)
+        if kind is None:
+            cursor.execute(partitions.CREATE_PARTITIONED_SQL)
+        elif kind == 'r':
+            logger.warning("⚠ stocks is not partitioned; run `python partitions.py migrate` to convert it")
+        
+        cursor.execute("""
+            -- Source screener of each batch (NULL for the single-screener scraper)
+            ALTER TABLE stocks ADD COLUMN IF NOT EXISTS screener VARCHAR(64);
+            
+            CREATE INDEX IF NOT EXISTS idx_symbol ON stocks(symbol);
+            CREATE INDEX IF NOT EXISTS idx_timestamp ON stocks(run_timestamp);
+            CREATE INDEX IF NOT EXISTS idx_created ON stocks(created_at);
+            
+            -- One row per symbol: the most recent snapshot, maintained by insert_data
+            CREATE TABLE IF NOT EXISTS stocks_latest (
+                symbol VARCHAR(20) PRIMARY KEY,
+                id INTEGER NOT NULL,
+                run_timestamp TIMESTAMP NOT NULL,
+                stock_name VARCHAR(100),
+                pct_chg DECIMAL(10,2),
+                price DECIMAL(15,2),
+                volume BIGINT,
+                links VARCHAR(50),
+                created_at TIMESTAMP
+            );
+            
+            -- Client batch ids already written, so replayed batches are skipped
+            CREATE TABLE IF NOT EXISTS ingest_batches (
+                batch_id VARCHAR(64) PRIMARY KEY,
+                run_timestamp TIMESTAMP NOT NULL,
+                received_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+            );
+            CREATE INDEX IF NOT EXISTS idx_ingest_batches_received ON ingest_batches(received_at);
+            
+            -- Running totals updated by every ingest, so health checks never COUNT(*) stocks
+            CREATE TABLE IF NOT EXISTS ingest_stats (
+                id SMALLINT PRIMARY KEY DEFAULT 1 CHECK (id = 1),
+                rows_ingested BIGINT NOT NULL DEFAULT 0,
+                batches_ingested BIGINT NOT NULL DEFAULT 0,
+                last_batch_rows INTEGER,
+                last_run_timestamp TIMESTAMP,
+                last_ingest_at TIMESTAMP
+            );
+            -- Bumped by every insert: the bundle's validator, since run_timestamps
+            -- repeat (several screeners per tick) and replays arrive out of order
+            ALTER TABLE ingest_stats ADD COLUMN IF NOT EXISTS version BIGINT NOT NULL DEFAULT 0;
+        """)
+        
+        # One-time backfill for databases that predate ingest_stats
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM ingest_stats)")
+        if not cursor.fetchone()[0]:
+            cursor.execute("""
+                INSERT INTO ingest_stats (id, rows_ingested, batches_ingested, last_run_timestamp, last_ingest_at)
+                SELECT 1, COUNT(*), COUNT(DISTINCT run_timestamp), MAX(run_timestamp), MAX(created_at)
+                FROM stocks
+            """)
         
-        CREATE INDEX IF NOT EXISTS idx_symbol ON stocks(symbol);
-        CREATE INDEX IF NOT EXISTS idx_timestamp ON stocks(run_timestamp);
-        CREATE INDEX IF NOT EXISTS idx_created ON stocks(created_at);
-    """)
-    
-    conn.commit()
-    cursor.close()
-    conn.close()
+        # One-time backfill for databases that predate stocks_latest
+        cursor.execute("SELECT EXISTS (SELECT 1 FROM stocks_latest)")
+        if not cursor.fetchone()[0]:
+            cursor.execute("""
+                INSERT INTO stocks_latest (symbol, id, run_timestamp, stock_name, pct_chg, price, volume, links, created_at)
+                SELECT DISTINCT ON (symbol)
+                    symbol, id, run_timestamp, stock_name, pct_chg, price, volume, links, created_at
+                FROM stocks
+                ORDER BY symbol, created_at DESC
+            """)
+            if cursor.rowcount:
+                logger.info(f"✓ Backfilled stocks_latest with {cursor.rowcount} symbols")
+        
+        conn.commit()
+        cursor.close()
+        
+        partitions.maintain(conn)
     logger.info("✓ Database initialized")
 
 # ==================== ANALYTICS LAYER (Logic) ====================
 
+LATEST_COLUMNS = "id, run_timestamp, symbol, stock_name, pct_chg, price, volume, links, created_at"
+
+def synced_window_engine():
+    """Window engine caught up with batches inserted by other workers"""
+    with db_connection() as conn:
+        window_engine.sync(conn)
+    return window_engine
+
+@cached(analytics_cache, 'market_overview')
+@timed_operation('get_market_overview')
 def get_market_overview():
     """Calculate real-time market metrics"""
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
-    # Get latest data point for each symbol
-    cursor.execute("""
-        SELECT DISTINCT ON (symbol) 
-            symbol, stock_name, pct_chg, price, volume, created_at
-        FROM stocks
-        ORDER BY symbol, created_at DESC
-    """)
+    with db_connection() as conn:
+        cursor = conn.cursor(cursor_factory=DictCursor)
+        
+        # Latest data point for each symbol (maintained on insert)
+        cursor.execute("""
+            SELECT symbol, stock_name, pct_chg, price, volume, created_at
+            FROM stocks_latest
+        """)
     
-    latest_stocks = cursor.fetchall()
-    cursor.close()
-    conn.close()
+        latest_stocks = cursor.fetchall()
+        cursor.close()
     
     if not latest_stocks:
         return None
@@ -82,165 +174,859 @@ def get_market_overview():
         'timestamp': datetime.now().isoformat()
     }
 
+@cached(analytics_cache, 'top_performers')
+@timed_operation('get_top_performers')
 def get_top_performers():
     """Analyze and rank top gaining stocks"""
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
-    cursor.execute("""
-        SELECT 
-            symbol, stock_name,
-            ROUND(AVG(pct_chg)::numeric, 2) as avg_gain,
-            MAX(pct_chg) as max_gain,
-            MIN(pct_chg) as min_gain,
-            MAX(price) as max_price,
-            MAX(volume) as max_volume,
-            COUNT(*) as occurrences,
-            MAX(created_at) as last_updated
-        FROM stocks
-        WHERE created_at > NOW() - INTERVAL '1 hour'
-        GROUP BY symbol, stock_name
-        HAVING COUNT(*) >= 3
-        ORDER BY avg_gain DESC 
-        LIMIT 25
-    """)
-    
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    if ROLLING_WINDOWS:
+        return synced_window_engine().top_performers()
+    
+    with db_connection() as conn:
+        cursor = conn.cursor(cursor_factory=DictCursor)
+        
+        cursor.execute("""
+            SELECT 
+                symbol, stock_name,
+                ROUND(AVG(pct_chg)::numeric, 2) as avg_gain,
+                MAX(pct_chg) as max_gain,
+                MIN(pct_chg) as min_gain,
+                MAX(price) as max_price,
+                MAX(volume) as max_volume,
+                COUNT(*) as occurrences,
+                MAX(created_at) as last_updated
+            FROM stocks
+            WHERE created_at > NOW() - INTERVAL '1 hour'
+            GROUP BY symbol, stock_name
+            HAVING COUNT(*) >= 3
+            ORDER BY avg_gain DESC 
+            LIMIT 25
+        """)
+    
+        results = cursor.fetchall()
+        cursor.close()
     
     return results
 
+@cached(analytics_cache, 'momentum')
+@timed_operation('get_momentum_stocks')
 def get_momentum_stocks():
     """Identify stocks with strong upward momentum"""
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
-    cursor.execute("""
-        SELECT 
-            symbol, stock_name,
-            ROUND(AVG(pct_chg)::numeric, 2) as avg_gain,
-            COUNT(*) as appearances,
-            MAX(created_at) as last_updated,
-            ROUND((MAX(pct_chg) - MIN(pct_chg))::numeric, 2) as volatility
-        FROM stocks
-        WHERE created_at > NOW() - INTERVAL '30 minutes'
-        GROUP BY symbol, stock_name
-        HAVING COUNT(*) >= 25 AND AVG(pct_chg) > 0
-        ORDER BY avg_gain DESC, appearances DESC
-        LIMIT 20
-    """)
-    
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    if ROLLING_WINDOWS:
+        return synced_window_engine().momentum()
+    
+    with db_connection() as conn:
+        cursor = conn.cursor(cursor_factory=DictCursor)
+        
+        cursor.execute("""
+            SELECT 
+                symbol, stock_name,
+                ROUND(AVG(pct_chg)::numeric, 2) as avg_gain,
+                COUNT(*) as appearances,
+                MAX(created_at) as last_updated,
+                ROUND((MAX(pct_chg) - MIN(pct_chg))::numeric, 2) as volatility
+            FROM stocks
+            WHERE created_at > NOW() - INTERVAL '30 minutes'
+            GROUP BY symbol, stock_name
+            HAVING COUNT(*) >= 25 AND AVG(pct_chg) > 0
+            ORDER BY avg_gain DESC, appearances DESC
+            LIMIT 20
+        """)
+    
+        results = cursor.fetchall()
+        cursor.close()
     
     return results
 
+@cached(analytics_cache, 'breakouts')
+@timed_operation('get_breakout_analysis')
 def get_breakout_analysis():
     """Find stocks breaking out from consolidation"""
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
-    cursor.execute("""
-        SELECT 
-            symbol, stock_name,
-            ROUND(MAX(price)::numeric, 2) as price_high,
-            ROUND(MIN(price)::numeric, 2) as price_low,
-            ROUND(MAX(pct_chg)::numeric, 2) as max_gain,
-            ROUND((MAX(price) - MIN(price))::numeric, 2) as price_range,
-            ROUND(AVG(volume)::numeric, 0) as avg_volume,
-            MAX(created_at) as last_updated
-        FROM stocks
-        WHERE created_at > NOW() - INTERVAL '15 minutes'
-        GROUP BY symbol, stock_name
-        HAVING (MAX(price) - MIN(price)) > (AVG(price) * 0.02)
-        ORDER BY max_gain DESC
-        LIMIT 20
-    """)
-    
-    results = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    if ROLLING_WINDOWS:
+        return synced_window_engine().breakouts()
+    
+    with db_connection() as conn:
+        cursor = conn.cursor(cursor_factory=DictCursor)
+        
+        cursor.execute("""
+            SELECT 
+                symbol, stock_name,
+                ROUND(MAX(price)::numeric, 2) as price_high,
+                ROUND(MIN(price)::numeric, 2) as price_low,
+                ROUND(MAX(pct_chg)::numeric, 2) as max_gain,
+                ROUND((MAX(price) - MIN(price))::numeric, 2) as price_range,
+                ROUND(AVG(volume)::numeric, 0) as avg_volume,
+                MAX(created_at) as last_updated
+            FROM stocks
+            WHERE created_at > NOW() - INTERVAL '15 minutes'
+            GROUP BY symbol, stock_name
+            HAVING (MAX(price) - MIN(price)) > (AVG(price) * 0.02)
+            ORDER BY max_gain DESC
+            LIMIT 20
+        """)
+    
+        results = cursor.fetchall()
+        cursor.close()
     
     return results
 
+# Latest rows plus the market overview over every symbol and the newest
+# batch, in one statement (window aggregates are evaluated before LIMIT)
+BUNDLE_LATEST_SQL = f"""
+    SELECT {LATEST_COLUMNS},
+        COUNT(*) OVER () AS total_symbols,
+        ROUND(AVG(COALESCE(pct_chg, 0)) OVER (), 2) AS market_avg,
+        COUNT(*) FILTER (WHERE pct_chg > 5) OVER () AS gainers_5pct,
+        COUNT(*) FILTER (WHERE pct_chg < -5) OVER () AS losers_5pct,
+        (SUM(COALESCE(volume, 0)) OVER ())::bigint AS total_volume,
+        MAX(run_timestamp) OVER () AS batch,
+        (SELECT version FROM ingest_stats WHERE id = 1) AS version
+    FROM stocks_latest
+    ORDER BY symbol
+    LIMIT 100
+"""
+
+OVERVIEW_FIELDS = ('total_symbols', 'market_avg', 'gainers_5pct', 'losers_5pct', 'total_volume')
+
+@cached(analytics_cache, 'dashboard_bundle')
+@timed_operation('get_dashboard_bundle')
+def get_dashboard_bundle():
+    """Latest rows, stats and analytics for the dashboard from a single stocks_latest read.
+    
+    With ROLLING_WINDOWS the analytics come from the window engine, which
+    only queries when it has not applied the newest batch yet.
+    """
+    with db_connection() as conn:
+        cursor = conn.cursor(cursor_factory=DictCursor)
+        cursor.execute(BUNDLE_LATEST_SQL)
+        rows = cursor.fetchall()
+        cursor.close()
+        
+        batch = rows[0]['batch'] if rows else None
+        version = rows[0]['version'] if rows else None
+        if ROLLING_WINDOWS:
+            window_engine.sync(conn, until=batch)
+    
+    stats = None
+    if rows:
+        stats = {field: rows[0][field] for field in OVERVIEW_FIELDS}
+        stats['timestamp'] = datetime.now().isoformat()
+    for row in rows:
+        for field in OVERVIEW_FIELDS + ('batch', 'version'):
+            del row[field]
+    
+    if ROLLING_WINDOWS:
+        analytics = {
+            'top_gainers': window_engine.top_performers(),
+            'momentum': window_engine.momentum(),
+            'breakouts': window_engine.breakouts(),
+        }
+    else:
+        analytics = {
+            'top_gainers': get_top_performers(),
+            'momentum': get_momentum_stocks(),
+            'breakouts': get_breakout_analysis(),
+        }
+    return {'batch': batch, 'version': version, 'latest': rows, 'stats': stats, **analytics}
+
+# ==================== INGEST ====================
+
+# Upserts the rows of an `inserted` CTE into stocks_latest.
+# DISTINCT ON keeps a symbol that appears twice in a batch from hitting the
+# same stocks_latest row twice; the WHERE clause keeps an older batch from
+# overwriting a newer snapshot.
+UPSERT_LATEST_SQL = """
+    INSERT INTO stocks_latest (symbol, id, run_timestamp, stock_name, pct_chg, price, volume, links, created_at)
+    SELECT DISTINCT ON (symbol)
+        symbol, id, run_timestamp, stock_name, pct_chg, price, volume, links, created_at
+    FROM inserted
+    ORDER BY symbol, run_timestamp DESC, id DESC
+    ON CONFLICT (symbol) DO UPDATE SET
+        id = EXCLUDED.id,
+        run_timestamp = EXCLUDED.run_timestamp,
+        stock_name = EXCLUDED.stock_name,
+        pct_chg = EXCLUDED.pct_chg,
+        price = EXCLUDED.price,
+        volume = EXCLUDED.volume,
+        links = EXCLUDED.links,
+        created_at = EXCLUDED.created_at
+    WHERE stocks_latest.run_timestamp <= EXCLUDED.run_timestamp
+"""
+
+# Appends the batch to history and upserts stocks_latest in one statement
+INSERT_BATCH_SQL = f"""
+    WITH inserted AS (
+        INSERT INTO stocks (run_timestamp, symbol, stock_name, pct_chg, price, volume, links, screener)
+        VALUES %s
+        RETURNING id, run_timestamp, symbol, stock_name, pct_chg, price, volume, links, created_at
+    )
+    {UPSERT_LATEST_SQL}
+"""
+
+# Keeps the ingest_stats row in step with stocks, in the same transaction
+UPDATE_INGEST_STATS_SQL = """
+    UPDATE ingest_stats SET
+        rows_ingested = rows_ingested + %(rows)s,
+        batches_ingested = batches_ingested + 1,
+        last_batch_rows = %(rows)s,
+        last_run_timestamp = GREATEST(last_run_timestamp, %(run_time)s),
+        last_ingest_at = NOW(),
+        version = version + 1
+    WHERE id = 1
+    RETURNING version
+"""
+
+# COPY path: raw text columns are streamed into a per-session staging table,
+# then cast and validated by Postgres while moving them into stocks.
+STAGE_COLUMNS = ('symbol', 'stock_name', 'pct_chg', 'price', 'volume', 'links')
+
+CREATE_STAGE_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS stocks_stage (
+        symbol TEXT, stock_name TEXT, pct_chg TEXT, price TEXT, volume TEXT, links TEXT
+    ) ON COMMIT DELETE ROWS
+"""
+
+COPY_STAGE_SQL = f"COPY stocks_stage ({', '.join(STAGE_COLUMNS)}) FROM STDIN WITH (FORMAT csv)"
+
+INSERT_FROM_STAGE_SQL = f"""
+    WITH inserted AS (
+        INSERT INTO stocks (run_timestamp, symbol, stock_name, pct_chg, price, volume, links, screener)
+        SELECT
+            %(run_time)s,
+            COALESCE(symbol, ''),
+            COALESCE(stock_name, ''),
+            COALESCE(NULLIF(btrim(rtrim(pct_chg, '%%')), '')::numeric, 0),
+            COALESCE(NULLIF(replace(btrim(price), ',', ''), '')::numeric, 0),
+            COALESCE(NULLIF(replace(btrim(volume), ',', ''), '')::numeric::bigint, 0),
+            COALESCE(links, ''),
+            %(screener)s
+        FROM stocks_stage
+        RETURNING id, run_timestamp, symbol, stock_name, pct_chg, price, volume, links, created_at
+    ), latest AS (
+        {UPSERT_LATEST_SQL.replace('%', '%%')}
+    )
+    SELECT run_timestamp, symbol, stock_name, pct_chg, price, volume FROM inserted
+"""
+
+# Chartink CSV header -> staging column
+CSV_HEADER_MAP = {
+    'Symbol': 'symbol',
+    'Stock Name': 'stock_name',
+    'Stock Narr': 'stock_name',
+    '%Chg': 'pct_chg',
+    'Price': 'price',
+    'Volume': 'volume',
+    'Links': 'links',
+}
+# Keys a JSON record may carry the stock name under (the CSV download and the
+# scraper have used both)
+STOCK_NAME_KEYS = [name for name, column in CSV_HEADER_MAP.items() if column == 'stock_name']
+
+# JSON/CSV ingest: 'values' (execute_values) or 'copy' (COPY FROM STDIN); ?mode= overrides
+INGEST_MODE = os.getenv('INGEST_MODE', 'values')
+
+# Queue batches and answer 202 instead of committing in the request; ?async= overrides
+INGEST_ASYNC = os.getenv('INGEST_ASYNC', '0') == '1'
+INGEST_QUEUE_SIZE = int(os.getenv('INGEST_QUEUE_SIZE', 1000))
+# Most batches written per group commit
+INGEST_GROUP_MAX = int(os.getenv('INGEST_GROUP_MAX', 50))
+# Seconds a request waits for a queue slot before getting 503
+INGEST_QUEUE_WAIT = float(os.getenv('INGEST_QUEUE_WAIT', 0.5))
+# Attempts at a group commit before its batches are marked failed
+INGEST_COMMIT_ATTEMPTS = int(os.getenv('INGEST_COMMIT_ATTEMPTS', 20))
+
+# Days a batch id is remembered for deduplication; resends only happen while
+# a scraper's outbox is catching up, so this just has to outlast an outage
+INGEST_BATCH_RETENTION_DAYS = int(os.getenv('INGEST_BATCH_RETENTION_DAYS', 7))
+
+_partitions_checked_on = None
+
+def prune_ingest_batches(conn):
+    """Forget batch ids older than INGEST_BATCH_RETENTION_DAYS"""
+    cursor = conn.cursor()
+    try:
+        cursor.execute(
+            "DELETE FROM ingest_batches WHERE received_at < NOW() - %s * INTERVAL '1 day'",
+            (INGEST_BATCH_RETENTION_DAYS,)
+        )
+        deleted = cursor.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    if deleted:
+        logger.info(f"✓ Pruned {deleted} batch ids older than {INGEST_BATCH_RETENTION_DAYS} days")
+
+def maintain_partitions_daily():
+    """Create upcoming partitions / apply retention (history and batch ids) the first time this worker inserts each day"""
+    global _partitions_checked_on
+    today = date.today()
+    if _partitions_checked_on == today:
+        return
+    try:
+        with db_connection() as conn:
+            partitions.maintain(conn)
+            prune_ingest_batches(conn)
+        _partitions_checked_on = today
+    except Exception as e:
+        # Rows still land in the default partition; retry on the next insert
+        logger.error(f"Partition maintenance error: {e}")
+
+def record_stock_name(row):
+    """A JSON record's stock name, under whichever key it came"""
+    for key in STOCK_NAME_KEYS:
+        if row.get(key):
+            return row[key]
+    return ''
+
+def parse_rows(data, run_time, screener=None):
+    """Convert Chartink JSON records into stocks value tuples"""
+    return [
+        (
+            run_time,
+            row.get('Symbol', ''),
+            record_stock_name(row),
+            float(row.get('%Chg', 0)) if row.get('%Chg') else 0,
+            float(row.get('Price', 0)) if row.get('Price') else 0,
+            int(row.get('Volume', 0)) if row.get('Volume') else 0,
+            row.get('Links', ''),
+            screener
+        )
+        for row in data
+    ]
+
+def write_batch(cursor, values):
+    """Insert (run_timestamp, symbol, stock_name, pct_chg, price, volume, links, screener) tuples"""
+    if not values:
+        return
+    # A single statement per batch so every symbol is upserted once
+    execute_values(cursor, INSERT_BATCH_SQL, values, page_size=len(values))
+
+def records_to_csv(data):
+    """Chartink JSON records -> CSV text in STAGE_COLUMNS order, values left unparsed"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        (row.get('Symbol'), record_stock_name(row) or None, row.get('%Chg'),
+         row.get('Price'), row.get('Volume'), row.get('Links'))
+        for row in data
+    )
+    return buffer.getvalue()
+
+def chartink_csv_to_stage(text):
+    """Reorder a raw Chartink CSV export (with header) into STAGE_COLUMNS order"""
+    reader = csv.reader(io.StringIO(text))
+    header = next(reader, None)
+    if not header:
+        raise ValueError("CSV body has no header")
+    
+    positions = {}
+    for index, name in enumerate(header):
+        column = CSV_HEADER_MAP.get(name.strip())
+        if column and column not in positions:
+            positions[column] = index
+    if 'symbol' not in positions:
+        raise ValueError("CSV body has no Symbol column")
+    
+    picks = [positions.get(column) for column in STAGE_COLUMNS]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    rows = 0
+    for record in reader:
+        if not record:
+            continue
+        writer.writerow([record[i] if i is not None and i < len(record) else None for i in picks])
+        rows += 1
+    return buffer.getvalue(), rows
+
+def copy_batch(cursor, run_time, csv_text, screener=None):
+    """Stream CSV text (STAGE_COLUMNS order) through COPY; returns the inserted rows"""
+    cursor.execute(CREATE_STAGE_SQL)
+    cursor.copy_expert(COPY_STAGE_SQL, io.StringIO(csv_text))
+    cursor.execute(INSERT_FROM_STAGE_SQL, {'run_time': run_time, 'screener': screener})
+    inserted = cursor.fetchall()
+    # Several batches can share a transaction (group commits)
+    cursor.execute("DELETE FROM stocks_stage")
+    return inserted
+
+def prepare_batch(data, mode, is_csv, run_time, screener=None):
+    """Validate and convert a request body; returns (payload, row_count)"""
+    if mode == 'copy':
+        if is_csv:
+            return chartink_csv_to_stage(data)
+        return records_to_csv(data), len(data)
+    values = parse_rows(data, run_time, screener)
+    return values, len(values)
+
+def parse_run_timestamp(value):
+    """Client-supplied batch time as a naive server-local timestamp (now if missing)"""
+    if not value:
+        return datetime.now()
+    run_time = datetime.fromisoformat(value)
+    if run_time.tzinfo is not None:
+        run_time = run_time.astimezone().replace(tzinfo=None)
+    return run_time
+
+def parse_screener(value):
+    """Screener id tagging a batch; None for untagged batches"""
+    if value is None or value == '':
+        return None
+    if not (isinstance(value, str) and len(value) <= 64):
+        raise ValueError("screener must be a string of up to 64 characters")
+    return value
+
+def parse_envelope(batches, screener=None):
+    """{"batches": [{"batch_id", "run_timestamp", "screener", "rows"}, ...]}
+    -> [(batch_id, run_time, screener, rows)]; `screener` is the default tag
+    """
+    if not isinstance(batches, list) or not batches:
+        raise ValueError("'batches' must be a non-empty list")
+    parsed = []
+    for batch in batches:
+        rows = batch.get('rows')
+        if not rows:
+            raise ValueError("Every batch needs rows")
+        batch_id = batch.get('batch_id')
+        if batch_id is not None and not (isinstance(batch_id, str) and 0 < len(batch_id) <= 64):
+            raise ValueError("batch_id must be a string of up to 64 characters")
+        parsed.append((
+            batch_id,
+            parse_run_timestamp(batch.get('run_timestamp')),
+            parse_screener(batch.get('screener', screener)),
+            rows
+        ))
+    return parsed
+
+def write_prepared(cursor, run_time, mode, payload, batch_id=None, screener=None):
+    """Write one prepared batch and queue its notification.
+    
+    Returns (inserted rows, data version after the batch), or (None, None)
+    if `batch_id` was already written.
+    """
+    if batch_id is not None:
+        cursor.execute("""
+            INSERT INTO ingest_batches (batch_id, run_timestamp) VALUES (%s, %s)
+            ON CONFLICT (batch_id) DO NOTHING
+        """, (batch_id, run_time))
+        if cursor.rowcount == 0:
+            return None, None
+    
+    if mode == 'copy':
+        inserted = copy_batch(cursor, run_time, payload, screener)
+    else:
+        write_batch(cursor, payload)
+        inserted = payload
+    
+    cursor.execute(UPDATE_INGEST_STATS_SQL, {'rows': len(inserted), 'run_time': run_time})
+    version = cursor.fetchone()[0]
+    
+    # Delivered to every worker's listener once the batch commits
+    cursor.execute("SELECT pg_notify(%s, %s)", (CHANNEL, f"{version} {run_time.isoformat()}"))
+    return inserted, version
+
+def after_commit(run_time, version, inserted, screener=None):
+    """In-process follow-up to a committed batch. Never raises: the batch is
+    already durable, and an error here would make callers retry (re-insert) it.
+    """
+    hooks = (
+        lambda: window_engine.add_rows(inserted, screener),
+        analytics_cache.invalidate,
+        lambda: note_version(version),
+    )
+    for hook in hooks:
+        try:
+            hook()
+        except Exception as e:
+            logger.error(f"Post-commit hook failed for batch {run_time}: {e}")
+
+@timed_operation('commit_queued')
+def commit_queued(batches):
+    """Group commit for the ingest queue: every batch in one transaction, a savepoint each"""
+    maintain_partitions_daily()
+    
+    rejected = {}
+    written = []
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            for batch in batches:
+                run_time, mode, payload, batch_id, screener = batch.payload
+                cursor.execute("SAVEPOINT queued_batch")
+                try:
+                    # Always recorded under an id, so a retried group never writes a batch twice
+                    inserted, version = write_prepared(cursor, run_time, mode, payload, batch_id or batch.id, screener)
+                    cursor.execute("RELEASE SAVEPOINT queued_batch")
+                    if inserted is not None:
+                        written.append((run_time, version, inserted, screener))
+                except psycopg2.OperationalError:
+                    raise
+                except psycopg2.DatabaseError as e:
+                    # Only this batch is bad (e.g. an uncastable value); keep the rest
+                    cursor.execute("ROLLBACK TO SAVEPOINT queued_batch")
+                    rejected[batch.id] = BatchRejected(str(e).strip())
+                    logger.error(f"Queued batch {batch.id} rejected: {e}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+    
+    for run_time, version, inserted, screener in written:
+        after_commit(run_time, version, inserted, screener)
+    return rejected
+
+ingest_queue = IngestQueue(commit_queued, maxsize=INGEST_QUEUE_SIZE, max_group=INGEST_GROUP_MAX,
+                           max_attempts=INGEST_COMMIT_ATTEMPTS)
+
+# ==================== LIVE UPDATES ====================
+
+_listener = None
+_listener_lock = threading.Lock()
+
+# Newest data version (ingest_stats.version) known to this worker; kept
+# current by the listener so conditional GETs need no query
+_known_version = None
+_batch_epoch = 0
+_batch_lock = threading.Lock()
+
+def fetch_latest(limit=100):
+    """Latest snapshot per symbol, as served by /api/dashboard/latest"""
+    with db_connection() as conn:
+        cursor = conn.cursor(cursor_factory=DictCursor)
+        cursor.execute(f"""
+            SELECT {LATEST_COLUMNS}
+            FROM stocks_latest
+            ORDER BY symbol
+            LIMIT %s
+        """, (limit,))
+        stocks = cursor.fetchall()
+        cursor.close()
+    return stocks
+
+def fetch_batch_changes(run_timestamp):
+    """Symbols whose latest snapshot came from the given batch"""
+    with db_connection() as conn:
+        cursor = conn.cursor(cursor_factory=DictCursor)
+        cursor.execute(f"""
+            SELECT {LATEST_COLUMNS}
+            FROM stocks_latest
+            WHERE run_timestamp = %s
+            ORDER BY symbol
+        """, (run_timestamp,))
+        stocks = cursor.fetchall()
+        cursor.close()
+    return stocks
+
+def note_version(version):
+    """Record a committed batch's data version as the newest this worker knows of (once one is known)"""
+    global _known_version
+    with _batch_lock:
+        if _known_version is not None and version > _known_version:
+            _known_version = version
+
+def reset_known_version():
+    """Forget the newest version; notifications may have been missed while not listening"""
+    global _known_version, _batch_epoch
+    with _batch_lock:
+        _known_version = None
+        _batch_epoch += 1
+
+def data_version():
+    """ingest_stats.version: bumped in the transaction of every insert.
+    
+    Answered from memory while this worker's listener is connected; otherwise
+    (or on first use) read from ingest_stats.
+    """
+    global _known_version
+    listener = ensure_listener()
+    with _batch_lock:
+        listening = listener.connected.is_set()
+        if listening and _known_version is not None:
+            return _known_version
+        epoch = _batch_epoch
+    
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT version FROM ingest_stats WHERE id = 1")
+        row = cursor.fetchone()
+        cursor.close()
+    version = row[0] if row else None
+    
+    # Only trust the value if LISTEN was already active before the read
+    with _batch_lock:
+        if listening and epoch == _batch_epoch and version is not None:
+            _known_version = max(version, _known_version or version)
+    return version
+
+def publish_batch(payload):
+    """Build one update for a committed batch and push it to every client of this worker"""
+    version, run_timestamp = payload.split(' ', 1)
+    batch = datetime.fromisoformat(run_timestamp)
+    note_version(int(version))
+    # The batch may have come through another worker; drop this worker's stale results
+    analytics_cache.invalidate()
+    if not broadcaster.client_count:
+        return
+    
+    bundle = get_dashboard_bundle()
+    update = {key: value for key, value in bundle.items() if key != 'latest'}
+    update['batch'] = batch
+    update['changed'] = fetch_batch_changes(batch)
+    broadcaster.publish(format_event('update', app.json.dumps(update)))
+    logger.info(f"✓ Pushed batch {run_timestamp} to {broadcaster.client_count} clients")
+
+def ensure_listener():
+    """Start this worker's LISTEN thread on first use (threads don't survive a fork)"""
+    global _listener
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = IngestListener(DATABASE_URL, publish_batch, on_connect=reset_known_version)
+            _listener.start()
+    return _listener
+
+# ==================== RESPONSES ====================
+
+# encode_body, timed as the serialize phase when TIMING_METRICS=1
+serialize_body = timed_phase('serialize')(encode_body)
+
+def response_format():
+    """(columnar, encoding) negotiated from the Accept and Accept-Encoding headers"""
+    columnar = request.accept_mimetypes.best_match([JSON_MIMETYPE, COLUMNAR_MIMETYPE]) == COLUMNAR_MIMETYPE
+    return columnar, negotiate_encoding(request.accept_encodings)
+
+def build_response(body, content_encoding, columnar):
+    response = Response(body, mimetype=COLUMNAR_MIMETYPE if columnar else JSON_MIMETYPE)
+    if content_encoding:
+        response.headers['Content-Encoding'] = content_encoding
+    response.vary.update(('Accept', 'Accept-Encoding'))
+    return response
+
+def json_response(obj):
+    """Encode a payload in the negotiated shape and encoding"""
+    columnar, encoding = response_format()
+    return build_response(*serialize_body(obj, columnar, encoding), columnar)
+
+def cached_json_response(name, compute):
+    """Like json_response, but the encoded body is kept in the analytics cache until the next insert"""
+    columnar, encoding = response_format()
+    body, content_encoding = analytics_cache.get_or_compute(
+        ('body', name, columnar, encoding),
+        lambda: serialize_body(compute(), columnar, encoding)
+    )
+    return build_response(body, content_encoding, columnar)
+
 # ==================== API ENDPOINTS ====================
 
 @app.route('/api/data/insert', methods=['POST'])
 def insert_data():
-    """Bulk insert for 1-min interval"""
-    data = request.json
+    """Bulk insert for 1-min interval (JSON records, or a raw Chartink CSV export)"""
+    is_csv = request.mimetype in ('text/csv', 'application/csv')
+    if is_csv:
+        data = request.get_data(as_text=True)
+        mode = 'copy'
+    else:
+        data = request.get_json(silent=True)
+        mode = request.args.get('mode', INGEST_MODE)
     if not data:
         return jsonify({"error": "No data"}), 400
-    
-    conn = get_db_connection()
-    cursor = conn.cursor()
+    if mode not in ('values', 'copy'):
+        return jsonify({"error": f"Unknown ingest mode: {mode}"}), 400
     
     try:
-        run_time = datetime.now()
+        screener = parse_screener(request.args.get('screener'))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    
+    use_async = request.args.get('async', '1' if INGEST_ASYNC else '0') == '1'
+    if not is_csv and isinstance(data, dict) and 'batches' in data:
+        return insert_envelope(data['batches'], mode, use_async, screener)
+    
+    run_time = datetime.now()
+    if use_async:
+        return enqueue_batch(data, mode, is_csv, run_time, screener)
+    
+    maintain_partitions_daily()
+    
+    with db_connection() as conn:
+        cursor = conn.cursor()
         
-        values = [
-            (
-                run_time,
-                row.get('Symbol', ''),
-                row.get('Stock Narr', ''),
-                float(row.get('%Chg', 0)) if row.get('%Chg') else 0,
-                float(row.get('Price', 0)) if row.get('Price') else 0,
-                int(row.get('Volume', 0)) if row.get('Volume') else 0,
-                row.get('Links', '')
-            )
-            for row in data
-        ]
+        try:
+            payload, row_count = prepare_batch(data, mode, is_csv, run_time, screener)
+            inserted, version = write_prepared(cursor, run_time, mode, payload, screener=screener)
+            conn.commit()
+            cursor.close()
+            after_commit(run_time, version, inserted, screener)
+            
+            logger.info(f"✓ Inserted {row_count} records ({mode})")
+            return jsonify({"status": "success", "rows": row_count, "timestamp": run_time.isoformat()})
         
-        execute_values(
-            cursor,
-            """
-            INSERT INTO stocks (run_timestamp, symbol, stock_name, pct_chg, price, volume, links)
-            VALUES %s
-            """,
-            values
-        )
+        except (ValueError, psycopg2.DataError) as e:
+            conn.rollback()
+            cursor.close()
+            logger.error(f"Insert rejected: {e}")
+            return jsonify({"error": str(e)}), 400
         
-        conn.commit()
-        cursor.close()
-        conn.close()
-        
-        logger.info(f"✓ Inserted {len(data)} records")
-        return jsonify({"status": "success", "rows": len(data), "timestamp": run_time.isoformat()})
+        except Exception as e:
+            conn.rollback()
+            cursor.close()
+            logger.error(f"Insert error: {e}")
+            return jsonify({"error": str(e)}), 500
+
+def enqueue_batch(data, mode, is_csv, run_time, screener=None):
+    """Async ingest: validate, queue for the group-commit writer and answer 202"""
+    try:
+        payload, row_count = prepare_batch(data, mode, is_csv, run_time, screener)
+    except ValueError as e:
+        logger.error(f"Insert rejected: {e}")
+        return jsonify({"error": str(e)}), 400
     
-    except Exception as e:
-        conn.rollback()
+    try:
+        batch_id = ingest_queue.submit((run_time, mode, payload, None, screener), row_count, wait=INGEST_QUEUE_WAIT)
+    except QueueFull as e:
+        logger.warning(f"⚠ {e}")
+        response = jsonify({"error": str(e)})
+        response.status_code = 503
+        response.headers['Retry-After'] = '5'
+        return response
+    
+    return jsonify({
+        "status": "queued",
+        "batch_id": batch_id,
+        "rows": row_count,
+        "timestamp": run_time.isoformat()
+    }), 202
+
+def insert_envelope(batches, mode, use_async, screener=None):
+    """Several batches in one request, each keeping its own run_timestamp.
+    
+    Used by the scraper outbox to replay a backlog. Batches with a
+    `batch_id` that was already written are skipped, so resending after a
+    lost response is safe.
+    """
+    try:
+        prepared = []
+        for batch_id, run_time, batch_screener, rows in parse_envelope(batches, screener):
+            payload, row_count = prepare_batch(rows, mode, False, run_time, batch_screener)
+            prepared.append((batch_id, run_time, batch_screener, payload, row_count))
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.error(f"Insert rejected: {e}")
+        return jsonify({"error": str(e)}), 400
+    
+    total_rows = sum(row_count for *_, row_count in prepared)
+    if use_async:
+        batch_ids = []
+        for batch_id, run_time, batch_screener, payload, row_count in prepared:
+            try:
+                batch_ids.append(ingest_queue.submit(
+                    (run_time, mode, payload, batch_id, batch_screener), row_count,
+                    wait=INGEST_QUEUE_WAIT, batch_id=batch_id
+                ))
+            except QueueFull as e:
+                # Batches queued so far are skipped by batch_id when the client retries
+                logger.warning(f"⚠ {e}")
+                response = jsonify({"error": str(e), "queued": batch_ids})
+                response.status_code = 503
+                response.headers['Retry-After'] = '5'
+                return response
+        return jsonify({"status": "queued", "batch_ids": batch_ids, "batches": len(prepared), "rows": total_rows}), 202
+    
+    maintain_partitions_daily()
+    
+    written = []
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        try:
+            for batch_id, run_time, batch_screener, payload, row_count in prepared:
+                inserted, version = write_prepared(cursor, run_time, mode, payload, batch_id, batch_screener)
+                if inserted is not None:
+                    written.append((run_time, version, inserted, batch_screener, row_count))
+            conn.commit()
+        except psycopg2.DataError as e:
+            conn.rollback()
+            logger.error(f"Insert rejected: {e}")
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            conn.rollback()
+            logger.error(f"Insert error: {e}")
+            return jsonify({"error": str(e)}), 500
+        finally:
+            cursor.close()
+    
+    for run_time, version, inserted, batch_screener, _ in written:
+        after_commit(run_time, version, inserted, batch_screener)
+    
+    rows = sum(row_count for *_, row_count in written)
+    logger.info(f"✓ Inserted {len(written)} batches, {rows} records ({mode})")
+    return jsonify({
+        "status": "success",
+        "batches": len(written),
+        "duplicates": len(prepared) - len(written),
+        "rows": rows
+    })
+
+def committed_batch_status(batch_id):
+    with db_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT run_timestamp, received_at FROM ingest_batches WHERE batch_id = %s", (batch_id,))
+        row = cursor.fetchone()
         cursor.close()
-        conn.close()
-        logger.error(f"Insert error: {e}")
-        return jsonify({"error": str(e)}), 500
+    if row is None:
+        return None
+    return {'status': 'committed', 'run_timestamp': row[0].isoformat(), 'received_at': row[1].isoformat()}
+
+@app.route('/api/data/insert/<batch_id>', methods=['GET'])
+def insert_status(batch_id):
+    """Status of an async batch: queued, committed or failed"""
+    status = ingest_queue.status(batch_id)
+    if status is None:
+        # Taken by another worker (or before a restart); committed batches are in the database
+        status = committed_batch_status(batch_id)
+    if status is None:
+        return jsonify({"error": "Unknown batch id (queued or failed batches are only known to the worker that took them)"}), 404
+    return jsonify({"batch_id": batch_id, **status})
 
 @app.route('/api/dashboard/latest', methods=['GET'])
 def latest_data():
     """Get latest stock data"""
-    conn = get_db_connection()
-    cursor = conn.cursor(cursor_factory=RealDictCursor)
-    
-    cursor.execute("""
-        SELECT DISTINCT ON (symbol)
-            * FROM stocks 
-        ORDER BY symbol, created_at DESC
-        LIMIT 100
-    """)
-    
-    stocks = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    return json_response(fetch_latest())
+
+@app.route('/api/dashboard/bundle', methods=['GET'])
+def dashboard_bundle():
+    """Latest rows, stats and analytics in one response; 304 if no batch arrived since the ETag"""
+    try:
+        version = data_version()
+        # Weak comparison, as If-None-Match requires
+        if version is not None and request.if_none_match.contains_weak(str(version)):
+            response = Response(status=304)
+            response.set_etag(str(version), weak=True)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        
+        bundle = get_dashboard_bundle()
+        if version is not None and (bundle['version'] is None or bundle['version'] < version):
+            # Cached before a batch this worker was not notified of
+            analytics_cache.invalidate()
+            bundle = get_dashboard_bundle()
+    except Exception as e:
+        logger.error(f"Bundle error: {e}")
+        return jsonify({"error": str(e)}), 500
     
-    return jsonify(stocks)
+    response = cached_json_response('dashboard_bundle', get_dashboard_bundle)
+    if bundle['version'] is not None:
+        # Weak: the same version is served as JSON or columnar, raw or compressed,
+        # so the tag says "same data", not "same bytes"
+        response.set_etag(str(bundle['version']), weak=True)
+    # Revalidate every time; unchanged refreshes cost a 304
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
 
 @app.route('/api/dashboard/stats', methods=['GET'])
 def dashboard_stats():
     """Get market overview using analytics layer"""
     try:
-        stats = get_market_overview()
-        return jsonify(stats) if stats else jsonify({}), 200
+        return cached_json_response('stats', lambda: get_market_overview() or {})
     except Exception as e:
         logger.error(f"Stats error: {e}")
         return jsonify({"error": str(e)}), 500
@@ -249,8 +1035,7 @@ def dashboard_stats():
 def top_gainers():
     """Get top gaining stocks using analytics layer"""
     try:
-        results = get_top_performers()
-        return jsonify(results)
+        return cached_json_response('top_gainers', get_top_performers)
     except Exception as e:
         logger.error(f"Top gainers error: {e}")
         return jsonify({"error": str(e)}), 500
@@ -259,8 +1044,7 @@ def top_gainers():
 def momentum_stocks():
     """Get momentum stocks (strong upward trend)"""
     try:
-        results = get_momentum_stocks()
-        return jsonify(results)
+        return cached_json_response('momentum', get_momentum_stocks)
     except Exception as e:
         logger.error(f"Momentum error: {e}")
         return jsonify({"error": str(e)}), 500
@@ -269,8 +1053,7 @@ def momentum_stocks():
 def breakout_stocks():
     """Get breakout stocks (price volatility)"""
     try:
-        results = get_breakout_analysis()
-        return jsonify(results)
+        return cached_json_response('breakouts', get_breakout_analysis)
     except Exception as e:
         logger.error(f"Breakout error: {e}")
         return jsonify({"error": str(e)}), 500
@@ -279,20 +1062,80 @@ def breakout_stocks():
 def top_gainers_old():
     """Legacy endpoint"""
     try:
-        results = get_top_performers()
-        return jsonify(results)
+        return cached_json_response('top_gainers', get_top_performers)
     except Exception as e:
         return jsonify({"error": str(e)}), 500
 
 @app.route('/health', methods=['GET'])
 def health():
     try:
-        conn = get_db_connection()
-        conn.close()
-        return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat()})
+        with db_connection():
+            pass
+        return jsonify({"status": "healthy", "timestamp": datetime.now().isoformat(), "pool": get_pool().stats()})
     except Exception as e:
         return jsonify({"status": "error", "message": str(e)}), 500
 
+@app.route('/api/metrics/pool', methods=['GET'])
+def pool_metrics():
+    """Connection pool saturation for this worker process"""
+    return jsonify(get_pool().stats())
+
+@app.route('/api/stream', methods=['GET'])
+def stream():
+    """Server-Sent Events: a snapshot on connect, then one delta per ingested batch"""
+    ensure_listener()
+    client = broadcaster.subscribe()
+    if client is None:
+        # Every stream holds a thread; past the cap, clients poll the bundle instead
+        response = jsonify({"error": "Too many live streams on this worker; poll /api/dashboard/bundle"})
+        response.status_code = 503
+        response.headers['Retry-After'] = '60'
+        return response
+    try:
+        snapshot = get_dashboard_bundle()
+    except Exception as e:
+        broadcaster.unsubscribe(client)
+        logger.error(f"Stream snapshot error: {e}")
+        return jsonify({"error": str(e)}), 500
+    
+    first = "retry: 5000\n" + format_event('snapshot', app.json.dumps(snapshot))
+    return Response(
+        broadcaster.stream(client, first),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+@app.route('/api/metrics/cache', methods=['GET'])
+def cache_metrics():
+    """Analytics cache hit/miss counters for this worker process"""
+    return jsonify({**analytics_cache.stats(), 'windows': window_engine.stats()})
+
+@app.route('/api/metrics/ingest', methods=['GET'])
+def ingest_metrics():
+    """Async ingest queue depth and group-commit counters for this worker process"""
+    return jsonify(ingest_queue.stats())
+
+@app.route('/api/metrics/timings', methods=['GET'])
+def timing_metrics():
+    """Request and connect/execute/fetch/serialize histograms for this worker process"""
+    if not TIMING_METRICS:
+        return jsonify({"enabled": False, "hint": "set TIMING_METRICS=1"})
+    if request.args.get('format') == 'prometheus':
+        return Response(timings.prometheus(), mimetype='text/plain; version=0.0.4')
+    return jsonify(timings.snapshot())
+
+@app.route('/api/metrics/live', methods=['GET'])
+def live_metrics():
+    """Server-Sent Events clients and pushes for this worker process"""
+    return jsonify({
+        'clients': broadcaster.client_count,
+        'published': broadcaster.published,
+        'dropped': broadcaster.dropped,
+        'rejected': broadcaster.rejected,
+        'max_clients': broadcaster.max_clients,
+        'listening': bool(_listener and _listener.connected.is_set()),
+    })
+
 if __name__ == '__main__':
     init_db()
     port = int(os.getenv('PORT', 5000))
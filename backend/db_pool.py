@@ -0,0 +1,288 @@
+"""
+PostgreSQL connection pool for the Flask backend.
+
+Connections are checked out per request and handed back afterwards instead of
+being opened and closed every time. The pool is per process: gunicorn forks
+its workers after importing the app, so `get_pool()` builds the pool lazily
+and rebuilds it when it notices it is running in a new PID.
+"""
+
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+import psycopg2
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection became available within the checkout timeout"""
+
+
+class _PooledConnection:
+    """Bookkeeping for one physical connection"""
+
+    __slots__ = ('conn', 'created_at', 'returned_at')
+
+    def __init__(self, conn):
+        now = time.monotonic()
+        self.conn = conn
+        self.created_at = now
+        self.returned_at = now
+
+
+class ConnectionPool:
+    """Thread-safe, bounded pool of psycopg2 connections.
+
+    - Checkout blocks up to `timeout` seconds when all `maxconn` connections
+      are in use, then raises PoolTimeout.
+    - Connections idle longer than `validate_after` seconds are pinged with
+      `SELECT 1` on checkout; broken ones are replaced transparently.
+    - Connections older than `max_lifetime` or idle longer than `max_idle`
+      are closed and reopened, so sockets dropped by a hosted Postgres or a
+      load balancer never reach a request handler.
+    """
+
+    def __init__(self, dsn, minconn=1, maxconn=10, timeout=10.0,
+                 max_idle=300.0, max_lifetime=1800.0, validate_after=30.0,
+                 **connect_kwargs):
+        if maxconn < 1 or minconn > maxconn:
+            raise ValueError("invalid pool size: minconn=%s maxconn=%s" % (minconn, maxconn))
+
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.max_lifetime = max_lifetime
+        self.validate_after = validate_after
+        self.connect_kwargs = connect_kwargs
+        self.pid = os.getpid()
+
+        self._cond = threading.Condition()
+        self._idle = []          # LIFO stack of _PooledConnection
+        self._in_use = {}        # id(conn) -> _PooledConnection
+        self._pending = 0        # slots reserved while connecting or validating
+        self._waiting = 0
+        self._closed = False
+
+        self._stats = {
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total_ms': 0.0,
+            'timeouts': 0,
+            'created': 0,
+            'recycled': 0,
+            'discarded': 0,
+            'validation_failures': 0,
+            'peak_in_use': 0,
+        }
+
+        for _ in range(minconn):
+            self._idle.append(self._open())
+
+    # ---------- physical connections ----------
+
+    def _open(self):
+        conn = psycopg2.connect(self.dsn, **self.connect_kwargs)
+        with self._cond:
+            self._stats['created'] += 1
+        return _PooledConnection(conn)
+
+    @staticmethod
+    def _close(entry):
+        try:
+            entry.conn.close()
+        except Exception:
+            pass
+
+    def _is_expired(self, entry, now):
+        if self.max_lifetime and now - entry.created_at > self.max_lifetime:
+            return True
+        if self.max_idle and now - entry.returned_at > self.max_idle:
+            return True
+        return False
+
+    def _is_usable(self, entry, now):
+        conn = entry.conn
+        if conn.closed:
+            return False
+        if now - entry.returned_at < self.validate_after:
+            return True
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            conn.rollback()
+            return True
+        except Exception:
+            with self._cond:
+                self._stats['validation_failures'] += 1
+            return False
+
+    # ---------- checkout / checkin ----------
+
+    def getconn(self):
+        """Check a connection out of the pool"""
+        deadline = time.monotonic() + self.timeout
+        waited_since = None
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeout("connection pool is closed")
+
+                while not self._idle and len(self._in_use) + self._pending >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeout(
+                            "no connection available after %.1fs (maxconn=%d)" % (self.timeout, self.maxconn)
+                        )
+                    if waited_since is None:
+                        waited_since = time.monotonic()
+                        self._stats['waits'] += 1
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                # Reserve a slot while validating or connecting outside the lock
+                entry = self._idle.pop() if self._idle else None
+                self._pending += 1
+
+            try:
+                if entry is None:
+                    entry = self._open()
+                else:
+                    now = time.monotonic()
+                    if self._is_expired(entry, now):
+                        self._close(entry)
+                        entry = None
+                        with self._cond:
+                            self._stats['recycled'] += 1
+                    elif not self._is_usable(entry, now):
+                        self._close(entry)
+                        entry = None
+                        with self._cond:
+                            self._stats['discarded'] += 1
+            finally:
+                with self._cond:
+                    self._pending -= 1
+                    if entry is None:
+                        self._cond.notify()
+                    else:
+                        self._in_use[id(entry.conn)] = entry
+                        self._stats['checkouts'] += 1
+                        self._stats['peak_in_use'] = max(self._stats['peak_in_use'], len(self._in_use))
+                        if waited_since is not None:
+                            self._stats['wait_time_total_ms'] += (time.monotonic() - waited_since) * 1000
+
+            if entry is not None:
+                return entry.conn
+
+    def putconn(self, conn, discard=False):
+        """Return a connection to the pool, closing it if it is broken or `discard` is set"""
+        with self._cond:
+            if id(conn) not in self._in_use:
+                return
+
+        # Reset the session before the slot becomes visible to other threads
+        if not discard and not conn.closed:
+            try:
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                discard = True
+
+        with self._cond:
+            entry = self._in_use.pop(id(conn))
+            if discard or conn.closed or self._closed:
+                self._stats['discarded'] += 1
+                self._close(entry)
+            else:
+                entry.returned_at = time.monotonic()
+                self._idle.append(entry)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Context manager that checks a connection out and always returns it.
+
+        Connection-level errors (server gone, socket reset) discard the
+        connection instead of putting it back.
+        """
+        conn = self.getconn()
+        discard = False
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            discard = True
+            raise
+        finally:
+            self.putconn(conn, discard=discard)
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._cond.notify_all()
+        for entry in idle:
+            self._close(entry)
+
+    # ---------- metrics ----------
+
+    def stats(self):
+        """Snapshot of pool size and saturation counters"""
+        with self._cond:
+            in_use = len(self._in_use)
+            snapshot = dict(self._stats)
+            snapshot.update({
+                'pid': self.pid,
+                'maxconn': self.maxconn,
+                'size': in_use + len(self._idle) + self._pending,
+                'in_use': in_use,
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'utilization': round(in_use / self.maxconn, 3),
+            })
+        snapshot['wait_time_total_ms'] = round(snapshot['wait_time_total_ms'], 2)
+        return snapshot
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return this process's pool, creating it on first use (and after a fork)"""
+    global _pool
+    pool = _pool
+    if pool is not None and pool.pid == os.getpid():
+        return pool
+
+    with _pool_lock:
+        if _pool is None or _pool.pid != os.getpid():
+            # Never close connections inherited from a parent process: that
+            # would terminate sessions the parent is still using.
+            _pool = ConnectionPool(
+                os.getenv('DATABASE_URL'),
+                minconn=int(os.getenv('DB_POOL_MIN', 1)),
+                maxconn=int(os.getenv('DB_POOL_MAX', 10)),
+                timeout=float(os.getenv('DB_POOL_TIMEOUT', 10)),
+                max_idle=float(os.getenv('DB_POOL_MAX_IDLE', 300)),
+                max_lifetime=float(os.getenv('DB_POOL_MAX_LIFETIME', 1800)),
+                validate_after=float(os.getenv('DB_POOL_VALIDATE_AFTER', 30)),
+                keepalives=1,
+                keepalives_idle=30,
+                keepalives_interval=10,
+                keepalives_count=3,
+            )
+            logger.info(f"✓ Connection pool ready (pid {_pool.pid}, max {_pool.maxconn})")
+        return _pool
@@ -0,0 +1,173 @@
+"""
+Asynchronous ingest: accept a batch, acknowledge it, commit it later.
+
+`/api/data/insert?async=1` (or INGEST_ASYNC=1) validates a batch, appends
+it to a bounded in-process queue and answers 202 with a batch id. One
+writer thread per worker drains the queue and writes whatever has piled up
+in a single transaction (a group commit), so a stalled database delays
+commits instead of holding scraper requests open. When the queue is full
+new batches are refused (503) until the writer catches up.
+
+Queued batches live in memory only: a worker that dies loses whatever it
+had not committed yet. Clients that need to know can poll the batch id.
+Queued and failed states are known only to the worker that took the batch;
+committed batches can be looked up by id in the database (ingest_batches).
+"""
+
+import logging
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the queue stays full for `wait` seconds"""
+
+
+class BatchRejected(Exception):
+    """Raised by the group writer for a single batch the database refused"""
+
+
+class QueuedBatch:
+    """A validated batch waiting for the writer"""
+
+    __slots__ = ('id', 'payload', 'rows', 'submitted_at')
+
+    def __init__(self, payload, rows, batch_id=None):
+        self.id = batch_id or uuid.uuid4().hex
+        self.payload = payload
+        self.rows = rows
+        self.submitted_at = time.time()
+
+
+class IngestQueue:
+    """Bounded queue of batches with a group-committing writer thread.
+
+    `write_group(batches)` writes a list of QueuedBatch in one transaction
+    and returns {batch_id: BatchRejected} for batches it had to skip (an
+    empty dict if all committed). Any other exception means nothing was
+    committed; the whole group is retried with backoff, in order, up to
+    `max_attempts` times, after which its batches are marked failed.
+    `write_group` must be idempotent per batch id, since a commit whose
+    acknowledgement was lost is retried too.
+    """
+
+    def __init__(self, write_group, maxsize=1000, max_group=50, history=10000, max_attempts=20):
+        self.write_group = write_group
+        self.max_group = max_group
+        self.max_attempts = max_attempts
+        self.history = history
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._status = OrderedDict()    # batch id -> status dict, oldest first
+        self._lock = threading.Lock()
+        self._writer = None
+        self._stats = {
+            'submitted': 0, 'committed': 0, 'failed': 0, 'rejected': 0,
+            'groups': 0, 'retries': 0, 'last_group_size': 0, 'last_commit_ms': None,
+        }
+
+    # ---------- producers ----------
+
+    def submit(self, payload, rows, wait=0.0, batch_id=None):
+        """Queue a batch under `batch_id` (or a new id); returns the id.
+        
+        Raises QueueFull if no slot frees up within `wait`.
+        """
+        self._ensure_writer()
+        batch = QueuedBatch(payload, rows, batch_id)
+        self._set_status(batch.id, {'status': 'queued', 'rows': rows, 'submitted_at': batch.submitted_at})
+        try:
+            self._queue.put(batch, timeout=wait) if wait else self._queue.put_nowait(batch)
+        except queue.Full:
+            with self._lock:
+                self._status.pop(batch.id, None)
+                self._stats['rejected'] += 1
+            raise QueueFull(f"Ingest queue full ({self._queue.maxsize} batches)")
+        with self._lock:
+            self._stats['submitted'] += 1
+        return batch.id
+
+    def status(self, batch_id):
+        with self._lock:
+            entry = self._status.get(batch_id)
+            return dict(entry) if entry else None
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+        snapshot.update({
+            'depth': self._queue.qsize(),
+            'capacity': self._queue.maxsize,
+            'writer_alive': bool(self._writer and self._writer.is_alive()),
+        })
+        return snapshot
+
+    # ---------- writer ----------
+
+    def _ensure_writer(self):
+        # Threads don't survive a fork, so each worker starts its own on first use
+        with self._lock:
+            if self._writer is None or not self._writer.is_alive():
+                self._writer = threading.Thread(target=self._run, name='ingest-writer', daemon=True)
+                self._writer.start()
+
+    def _run(self):
+        while True:
+            group = [self._queue.get()]
+            # Everything that queued up while the previous group was committing
+            while len(group) < self.max_group:
+                try:
+                    group.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._commit(group)
+
+    def _commit(self, group):
+        backoff = 0.5
+        for attempt in range(1, self.max_attempts + 1):
+            started = time.perf_counter()
+            try:
+                rejected = self.write_group(group)
+                break
+            except Exception as e:
+                if attempt == self.max_attempts:
+                    # Give up so one poisoned group can't stall the queue forever
+                    logger.error(f"❌ Group commit of {len(group)} batches failed {attempt} times: {e}; marking them failed")
+                    error = BatchRejected(f"commit failed after {attempt} attempts: {e}")
+                    rejected = {batch.id: error for batch in group}
+                    break
+                # Nothing was committed; keep the group (and the queue behind it) in order
+                with self._lock:
+                    self._stats['retries'] += 1
+                logger.error(f"Group commit of {len(group)} batches failed: {e}; retrying in {backoff}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        committed_at = time.time()
+        with self._lock:
+            for batch in group:
+                error = rejected.get(batch.id)
+                entry = self._status.get(batch.id, {'rows': batch.rows, 'submitted_at': batch.submitted_at})
+                if error is None:
+                    entry.update({'status': 'committed', 'committed_at': committed_at})
+                    self._stats['committed'] += 1
+                else:
+                    entry.update({'status': 'failed', 'error': str(error)})
+                    self._stats['failed'] += 1
+                self._status[batch.id] = entry
+            self._stats['groups'] += 1
+            self._stats['last_group_size'] = len(group)
+            self._stats['last_commit_ms'] = elapsed_ms
+        if len(group) > 1:
+            logger.info(f"✓ Group-committed {len(group)} batches in {elapsed_ms} ms")
+
+    def _set_status(self, batch_id, entry):
+        with self._lock:
+            self._status[batch_id] = entry
+            while len(self._status) > self.history:
+                self._status.popitem(last=False)
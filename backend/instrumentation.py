@@ -0,0 +1,331 @@
+"""
+Latency instrumentation for the Flask backend (TIMING_METRICS=1).
+
+Each request's time is recorded under its route. Inside a request (or an
+operation such as `get_breakout_analysis`) four phases are timed:
+
+- connect: checking a connection out of the pool
+- execute: `cursor.execute()`
+- fetch: `fetchone/fetchmany/fetchall`, including building the row dicts
+- serialize: encoding the response body
+
+Phases go into fixed-bucket histograms per operation, with counters of
+rows fetched from Postgres and rows returned by each operation. The
+operation is the innermost `timed_operation` running on the thread, or
+otherwise the request's endpoint. `/api/metrics/timings` exposes these
+numbers for this worker process.
+
+When TIMING_METRICS is off, every hook here hands back the original
+function or class and nothing is registered on the app, so disabled
+instrumentation costs nothing per request.
+"""
+
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from psycopg2 import extensions
+from psycopg2.extras import RealDictCursor
+
+ENABLED = os.getenv('TIMING_METRICS', '0') == '1'
+
+# Upper bounds in milliseconds; the last bucket is open-ended
+BUCKETS_MS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+PHASES = ('connect', 'execute', 'fetch', 'serialize')
+
+# Operation for work done outside any request or timed_operation
+BACKGROUND = 'background'
+
+_local = threading.local()
+
+
+def current_operation():
+    return getattr(_local, 'operation', None) or BACKGROUND
+
+
+class Histogram:
+    """Counts per latency bucket plus count, sum and max (caller holds the registry lock)"""
+
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    def percentile(self, q):
+        """Estimate, interpolating linearly inside the bucket holding the q-th observation"""
+        if not self.count:
+            return None
+        target = q * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            if bucket_count and seen + bucket_count >= target:
+                lower = BUCKETS_MS[index - 1] if index else 0.0
+                upper = BUCKETS_MS[index] if index < len(BUCKETS_MS) else self.max
+                estimate = lower + (upper - lower) * (target - seen) / bucket_count
+                return round(min(estimate, self.max), 3)
+            seen += bucket_count
+        return round(self.max, 3)
+
+    def snapshot(self):
+        return {
+            'count': self.count,
+            'sum_ms': round(self.total, 3),
+            'mean_ms': round(self.total / self.count, 3) if self.count else None,
+            'max_ms': round(self.max, 3),
+            'p50_ms': self.percentile(0.50),
+            'p95_ms': self.percentile(0.95),
+            'p99_ms': self.percentile(0.99),
+            # [upper bound in ms (None = +Inf), observations] for non-empty buckets
+            'buckets': [[BUCKETS_MS[i] if i < len(BUCKETS_MS) else None, n]
+                        for i, n in enumerate(self.counts) if n],
+        }
+
+
+class Timings:
+    """Request and phase histograms plus row counters for this worker process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._requests = {}     # route -> Histogram
+        self._statuses = {}     # route -> {'2xx': n, ...}
+        self._phases = {}       # (operation, phase) -> Histogram
+        self._rows = {}         # (operation, 'fetched' | 'returned') -> n
+        self.started_at = time.time()
+
+    def observe_request(self, route, status, ms):
+        status_class = f"{status // 100}xx"
+        with self._lock:
+            histogram = self._requests.get(route)
+            if histogram is None:
+                histogram = self._requests[route] = Histogram()
+                self._statuses[route] = {}
+            histogram.observe(ms)
+            statuses = self._statuses[route]
+            statuses[status_class] = statuses.get(status_class, 0) + 1
+
+    def observe_phase(self, operation, phase, ms):
+        key = (operation, phase)
+        with self._lock:
+            histogram = self._phases.get(key)
+            if histogram is None:
+                histogram = self._phases[key] = Histogram()
+            histogram.observe(ms)
+
+    def add_rows(self, operation, kind, count):
+        key = (operation, kind)
+        with self._lock:
+            self._rows[key] = self._rows.get(key, 0) + count
+
+    def snapshot(self):
+        with self._lock:
+            requests = {route: {**histogram.snapshot(), 'status': dict(self._statuses[route])}
+                        for route, histogram in self._requests.items()}
+            operations = {}
+            for (operation, phase), histogram in self._phases.items():
+                operations.setdefault(operation, {})[phase] = histogram.snapshot()
+            for (operation, kind), count in self._rows.items():
+                operations.setdefault(operation, {})[f"rows_{kind}"] = count
+        return {
+            'enabled': True,
+            'pid': os.getpid(),
+            'uptime_seconds': round(time.time() - self.started_at, 1),
+            'requests': requests,
+            'operations': operations,
+        }
+
+    def prometheus(self):
+        """The histograms and counters in Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            for route, histogram in sorted(self._requests.items()):
+                lines.extend(_prometheus_histogram('trc_request_duration_ms', f'route="{route}"', histogram))
+            for (operation, phase), histogram in sorted(self._phases.items()):
+                labels = f'operation="{operation}",phase="{phase}"'
+                lines.extend(_prometheus_histogram('trc_phase_duration_ms', labels, histogram))
+            for (operation, kind), count in sorted(self._rows.items()):
+                lines.append(f'trc_rows_{kind}_total{{operation="{operation}"}} {count}')
+        return "\n".join(lines) + "\n"
+
+
+def _prometheus_histogram(name, labels, histogram):
+    cumulative = 0
+    for index, bucket_count in enumerate(histogram.counts):
+        cumulative += bucket_count
+        bound = BUCKETS_MS[index] if index < len(BUCKETS_MS) else '+Inf'
+        yield f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}'
+    yield f'{name}_sum{{{labels}}} {round(histogram.total, 3)}'
+    yield f'{name}_count{{{labels}}} {histogram.count}'
+
+
+timings = Timings()
+
+
+def _elapsed_ms(started):
+    return (time.perf_counter() - started) * 1000
+
+
+def _count_rows(result):
+    if isinstance(result, list):
+        return len(result)
+    if isinstance(result, dict):
+        return sum(len(value) for value in result.values() if isinstance(value, list))
+    return 0
+
+
+# ==================== HOOKS ====================
+
+def timed_operation(name):
+    """Decorator: attribute the phases run inside `func` to `name`, and time the whole call"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            previous = getattr(_local, 'operation', None)
+            _local.operation = name
+            started = time.perf_counter()
+            try:
+                result = func(*args, **kwargs)
+            finally:
+                _local.operation = previous
+                timings.observe_phase(name, 'total', _elapsed_ms(started))
+            timings.add_rows(name, 'returned', _count_rows(result))
+            return result
+        return wrapper
+    return decorator
+
+
+def timed_phase(phase):
+    """Decorator: time each call of `func` as `phase` of the current operation"""
+    def decorator(func):
+        if not ENABLED:
+            return func
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                timings.observe_phase(current_operation(), phase, _elapsed_ms(started))
+        return wrapper
+    return decorator
+
+
+class _TimedCursorMixin:
+    """Times execute and fetch calls and counts the rows fetched"""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            timings.observe_phase(current_operation(), 'execute', _elapsed_ms(started))
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        operation = current_operation()
+        timings.observe_phase(operation, 'fetch', _elapsed_ms(started))
+        if row is not None:
+            timings.add_rows(operation, 'fetched', 1)
+        return row
+
+    def fetchmany(self, size=None):
+        started = time.perf_counter()
+        rows = super().fetchmany(size) if size is not None else super().fetchmany()
+        operation = current_operation()
+        timings.observe_phase(operation, 'fetch', _elapsed_ms(started))
+        timings.add_rows(operation, 'fetched', len(rows))
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        operation = current_operation()
+        timings.observe_phase(operation, 'fetch', _elapsed_ms(started))
+        timings.add_rows(operation, 'fetched', len(rows))
+        return rows
+
+
+class TimedCursor(_TimedCursorMixin, extensions.cursor):
+    pass
+
+
+class TimedRealDictCursor(_TimedCursorMixin, RealDictCursor):
+    pass
+
+
+# Cursor factory for dict rows: RealDictCursor itself when disabled
+DictCursor = TimedRealDictCursor if ENABLED else RealDictCursor
+
+
+class _TimedCheckout:
+    """Wraps a pool checkout context manager, timing the checkout as `connect`"""
+
+    __slots__ = ('_checkout',)
+
+    def __init__(self, checkout):
+        self._checkout = checkout
+
+    def __enter__(self):
+        started = time.perf_counter()
+        conn = self._checkout.__enter__()
+        timings.observe_phase(current_operation(), 'connect', _elapsed_ms(started))
+        # Plain conn.cursor() calls (ingest, window sync) get timed too
+        if conn.cursor_factory is None:
+            conn.cursor_factory = TimedCursor
+        return conn
+
+    def __exit__(self, *exc_info):
+        return self._checkout.__exit__(*exc_info)
+
+
+def timed_checkout(func):
+    """Decorator for the function returning a pooled-connection context manager"""
+    if not ENABLED:
+        return func
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return _TimedCheckout(func(*args, **kwargs))
+    return wrapper
+
+
+def instrument_app(app):
+    """Time every request of `app` under its route (no-op when disabled)"""
+    if not ENABLED:
+        return
+
+    from flask import g, request
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        _local.operation = request.endpoint
+
+    @app.after_request
+    def record_request_time(response):
+        started = g.pop('request_started', None)
+        if started is not None:
+            rule = request.url_rule.rule if request.url_rule is not None else 'unmatched'
+            timings.observe_request(f"{request.method} {rule}", response.status_code, _elapsed_ms(started))
+        return response
+
+    @app.teardown_request
+    def clear_request_operation(exc):
+        _local.operation = None
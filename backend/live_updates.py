@@ -0,0 +1,153 @@
+"""
+Server-Sent Events fan-out for the dashboard.
+
+`insert_data` issues `NOTIFY stocks_ingest` inside its transaction, so every
+worker process hears about every committed batch, whichever worker handled
+the insert. Each worker runs one listener thread that builds the update
+payload once and hands the same pre-serialized message to all of its
+connected clients.
+"""
+
+import logging
+import os
+import queue
+import select
+import threading
+import time
+
+import psycopg2
+from psycopg2 import extensions
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = 'stocks_ingest'
+
+# Seconds between keep-alive comments on idle streams
+HEARTBEAT_SECONDS = 15
+# Messages buffered per client before a slow client is dropped
+CLIENT_QUEUE_SIZE = 16
+# Streams per worker process. Each holds a gthread thread, so this must stay
+# well below the worker's --threads or streams starve every other endpoint.
+MAX_CLIENTS = int(os.getenv('STREAM_MAX_CLIENTS', 16))
+
+
+def format_event(event, data):
+    """One SSE message; `data` must already be a JSON string"""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+class Broadcaster:
+    """Set of per-client queues receiving the same messages, at most `max_clients`"""
+
+    def __init__(self, queue_size=CLIENT_QUEUE_SIZE, max_clients=MAX_CLIENTS):
+        self.queue_size = queue_size
+        self.max_clients = max_clients
+        self._clients = set()
+        self._lock = threading.Lock()
+        self.published = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def subscribe(self):
+        """A new client queue, or None when the worker already has max_clients streams"""
+        client = queue.Queue(maxsize=self.queue_size)
+        with self._lock:
+            if len(self._clients) >= self.max_clients:
+                self.rejected += 1
+                return None
+            self._clients.add(client)
+        return client
+
+    def unsubscribe(self, client):
+        with self._lock:
+            self._clients.discard(client)
+
+    def publish(self, message):
+        with self._lock:
+            clients = list(self._clients)
+        for client in clients:
+            try:
+                client.put_nowait(message)
+            except queue.Full:
+                # The client stopped reading; end its stream
+                self.unsubscribe(client)
+                self.dropped += 1
+                try:
+                    client.put_nowait(None)
+                except queue.Full:
+                    pass
+        self.published += 1
+
+    def stream(self, client, first_message=None, heartbeat=HEARTBEAT_SECONDS):
+        """Generator of SSE text for one client; unsubscribes when the client goes away"""
+        try:
+            if first_message:
+                yield first_message
+            while True:
+                try:
+                    message = client.get(timeout=heartbeat)
+                except queue.Empty:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(client)
+
+    @property
+    def client_count(self):
+        with self._lock:
+            return len(self._clients)
+
+
+class IngestListener(threading.Thread):
+    """Background thread that LISTENs for ingest notifications.
+
+    `on_batch(payload)` is called once per notification with the NOTIFY
+    payload ("<data version> <run_timestamp>"). `on_connect()` is called
+    each time LISTEN (re)starts, before `connected` is set, since
+    notifications sent while disconnected are lost. Reconnects with backoff if the dedicated
+    connection drops.
+    """
+
+    def __init__(self, dsn, on_batch, on_connect=None):
+        super().__init__(name='ingest-listener', daemon=True)
+        self.dsn = dsn
+        self.on_batch = on_batch
+        self.on_connect = on_connect
+        self.connected = threading.Event()
+
+    def run(self):
+        backoff = 1
+        while True:
+            conn = None
+            try:
+                conn = psycopg2.connect(self.dsn)
+                conn.set_isolation_level(extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+                cursor = conn.cursor()
+                cursor.execute(f"LISTEN {CHANNEL}")
+                if self.on_connect:
+                    self.on_connect()
+                self.connected.set()
+                logger.info(f"✓ Listening for {CHANNEL} notifications")
+                backoff = 1
+
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        try:
+                            self.on_batch(notify.payload)
+                        except Exception as e:
+                            logger.error(f"Live update error: {e}")
+            except Exception as e:
+                self.connected.clear()
+                logger.error(f"Ingest listener error: {e}; reconnecting in {backoff}s")
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 60)
+            finally:
+                if conn is not None:
+                    conn.close()
@@ -0,0 +1,313 @@
+"""
+Daily range partitioning for the `stocks` history table.
+
+`stocks` is partitioned on `created_at`, one partition per day
+(`stocks_pYYYYMMDD`) plus a default partition that catches rows for days
+whose partition does not exist yet. Window queries filtering on
+`created_at > NOW() - INTERVAL ...` are pruned to the current day's
+partition, and retention drops whole partitions instead of deleting rows.
+If maintenance misses a day, that day's rows land in the default partition.
+The next run moves them into the day's new partition, because Postgres
+refuses to create a partition while the default holds rows in its range.
+History converted by `migrate` lives in one `stocks_legacy` partition;
+retention drops it whole once its newest day falls out of the window.
+
+Maintenance runs from the backend once per day per worker (see
+`insert_data`), and can also be run from cron:
+
+    python partitions.py maintain     # create upcoming partitions, apply retention
+    python partitions.py migrate      # convert an existing unpartitioned table
+"""
+
+import logging
+import os
+import re
+import sys
+from datetime import datetime, timedelta
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = 'stocks_p'
+DEFAULT_PARTITION = 'stocks_default'
+# Single partition holding the rows of a migrated unpartitioned table
+LEGACY_PARTITION = 'stocks_legacy'
+# Upper bound in pg_get_expr(relpartbound): FOR VALUES FROM (MINVALUE) TO ('2026-01-05 00:00:00')
+PARTITION_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+# Partitions created ahead of today
+PARTITION_DAYS_AHEAD = int(os.getenv('STOCKS_PARTITION_DAYS_AHEAD', 3))
+# Days of history to keep; unset or 0 keeps everything
+RETENTION_DAYS = int(os.getenv('STOCKS_RETENTION_DAYS', 0))
+# Detach expired partitions (keeping them as standalone tables) instead of dropping them
+RETENTION_DETACH_ONLY = os.getenv('STOCKS_RETENTION_DETACH_ONLY', '0') == '1'
+
+# pg_advisory_xact_lock key so concurrent workers don't race on DDL
+MAINTENANCE_LOCK_KEY = 5_730_001
+
+STOCKS_COLUMNS_SQL = """
+    id INTEGER NOT NULL DEFAULT nextval('stocks_id_seq'),
+    run_timestamp TIMESTAMP NOT NULL,
+    symbol VARCHAR(20) NOT NULL,
+    stock_name VARCHAR(100),
+    pct_chg DECIMAL(10,2),
+    price DECIMAL(15,2),
+    volume BIGINT,
+    links VARCHAR(50),
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    screener VARCHAR(64)
+"""
+
+CREATE_PARTITIONED_SQL = f"""
+    CREATE SEQUENCE IF NOT EXISTS stocks_id_seq;
+    CREATE TABLE IF NOT EXISTS stocks (
+        {STOCKS_COLUMNS_SQL},
+        PRIMARY KEY (id, created_at)
+    ) PARTITION BY RANGE (created_at);
+    ALTER SEQUENCE stocks_id_seq OWNED BY stocks.id;
+    CREATE TABLE IF NOT EXISTS {DEFAULT_PARTITION} PARTITION OF stocks DEFAULT;
+"""
+
+
+def partition_name(day):
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+
+def table_kind(cursor, table='stocks'):
+    """'p' for a partitioned table, 'r' for a plain one, None if missing"""
+    cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass(%s)", (table,))
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def list_partitions(cursor):
+    """Daily partitions of stocks as {day: name}"""
+    cursor.execute("""
+        SELECT child.relname
+        FROM pg_inherits
+        JOIN pg_class parent ON parent.oid = pg_inherits.inhparent
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE parent.oid = to_regclass('stocks')
+    """)
+    partitions = {}
+    for (name,) in cursor.fetchall():
+        if not name.startswith(PARTITION_PREFIX):
+            continue
+        try:
+            day = datetime.strptime(name[len(PARTITION_PREFIX):], '%Y%m%d').date()
+        except ValueError:
+            continue
+        partitions[day] = name
+    return partitions
+
+
+def legacy_partition_end(cursor):
+    """Day the migrated legacy partition ends before (exclusive), or None if there is none"""
+    cursor.execute("""
+        SELECT pg_get_expr(child.relpartbound, child.oid)
+        FROM pg_inherits
+        JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+        WHERE pg_inherits.inhparent = to_regclass('stocks') AND child.relname = %s
+    """, (LEGACY_PARTITION,))
+    row = cursor.fetchone()
+    match = PARTITION_UPPER_BOUND.search(row[0]) if row else None
+    return datetime.fromisoformat(match.group(1)).date() if match else None
+
+
+def stranded_days(cursor):
+    """Days with rows in the default partition (normally none)"""
+    cursor.execute(f"SELECT DISTINCT created_at::date FROM {DEFAULT_PARTITION}")
+    return sorted(row[0] for row in cursor.fetchall())
+
+
+def create_partition(cursor, day):
+    """Create `day`'s partition, first moving its rows out of the default partition"""
+    name = partition_name(day)
+    bounds = (day, day + timedelta(days=1))
+    cursor.execute(
+        f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s)",
+        bounds
+    )
+    if not cursor.fetchone()[0]:
+        cursor.execute(f"CREATE TABLE {name} PARTITION OF stocks FOR VALUES FROM (%s) TO (%s)", bounds)
+        return 0
+
+    # Set the rows aside, create the partition, then route them back through stocks
+    cursor.execute(f"CREATE TEMP TABLE stocks_moving (LIKE {DEFAULT_PARTITION})")
+    cursor.execute(f"""
+        WITH moved AS (
+            DELETE FROM {DEFAULT_PARTITION} WHERE created_at >= %s AND created_at < %s RETURNING *
+        )
+        INSERT INTO stocks_moving SELECT * FROM moved
+    """, bounds)
+    moved = cursor.rowcount
+    cursor.execute(f"CREATE TABLE {name} PARTITION OF stocks FOR VALUES FROM (%s) TO (%s)", bounds)
+    cursor.execute("INSERT INTO stocks SELECT * FROM stocks_moving")
+    cursor.execute("DROP TABLE stocks_moving")
+    return moved
+
+
+def ensure_partitions(cursor, today, days_ahead=PARTITION_DAYS_AHEAD):
+    """Create partitions for today through today + days_ahead, and for any day
+    whose rows were left in the default partition; returns names created
+    """
+    existing = list_partitions(cursor)
+    days = {today + timedelta(days=offset) for offset in range(days_ahead + 1)}
+    days.update(stranded_days(cursor))
+    created = []
+    for day in sorted(days):
+        if day in existing:
+            continue
+        name = partition_name(day)
+        # A failure must not abort the rest of the maintenance
+        cursor.execute("SAVEPOINT create_partition")
+        try:
+            moved = create_partition(cursor, day)
+            cursor.execute("RELEASE SAVEPOINT create_partition")
+            created.append(name)
+            if moved:
+                logger.warning(f"⚠ Moved {moved} rows for {day} from {DEFAULT_PARTITION} into {name}")
+        except Exception as e:
+            cursor.execute("ROLLBACK TO SAVEPOINT create_partition")
+            if getattr(e, 'pgcode', None) == '42P17':
+                # Range already covered, e.g. by a migrated legacy partition
+                logger.warning(f"⚠ Partition {name} not created: {e}")
+            else:
+                logger.error(f"❌ Partition {name} not created; its rows stay in {DEFAULT_PARTITION}: {e}")
+    return created
+
+
+def expire_partitions(cursor, today, retention_days=RETENTION_DAYS, detach_only=RETENTION_DETACH_ONLY):
+    """Detach (and unless detach_only, drop) partitions older than the retention window,
+    including the migrated legacy partition once all of it is older
+    """
+    if not retention_days:
+        return []
+    cutoff = today - timedelta(days=retention_days)
+    expired = []
+    legacy_end = legacy_partition_end(cursor)
+    if legacy_end is not None and legacy_end <= cutoff:
+        cursor.execute(f"ALTER TABLE stocks DETACH PARTITION {LEGACY_PARTITION}")
+        if not detach_only:
+            cursor.execute(f"DROP TABLE {LEGACY_PARTITION}")
+        expired.append(LEGACY_PARTITION)
+    for day, name in sorted(list_partitions(cursor).items()):
+        if day + timedelta(days=1) > cutoff:
+            break
+        cursor.execute(f"ALTER TABLE stocks DETACH PARTITION {name}")
+        if not detach_only:
+            cursor.execute(f"DROP TABLE {name}")
+        expired.append(name)
+    return expired
+
+
+def maintain(conn, days_ahead=PARTITION_DAYS_AHEAD, retention_days=RETENTION_DAYS,
+             detach_only=RETENTION_DETACH_ONLY):
+    """Create upcoming partitions and apply retention in one transaction.
+
+    Days are taken from the database clock, which is what `created_at`
+    defaults to. Does nothing if stocks is not partitioned.
+    """
+    cursor = conn.cursor()
+    try:
+        if table_kind(cursor) != 'p':
+            return False
+        cursor.execute("SELECT pg_advisory_xact_lock(%s)", (MAINTENANCE_LOCK_KEY,))
+        cursor.execute("SELECT CURRENT_DATE")
+        today = cursor.fetchone()[0]
+
+        created = ensure_partitions(cursor, today, days_ahead)
+        expired = expire_partitions(cursor, today, retention_days, detach_only)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    if created:
+        logger.info(f"✓ Created partitions: {', '.join(created)}")
+    if expired:
+        action = 'Detached' if detach_only else 'Dropped'
+        logger.info(f"✓ {action} expired partitions: {', '.join(expired)}")
+    return True
+
+
+def migrate_to_partitioned(conn):
+    """Convert an existing plain stocks table into the partitioned layout.
+
+    The old table is renamed to stocks_legacy and attached as a single
+    partition covering everything up to the end of its newest day; daily
+    partitions start after that. Attaching validates the legacy rows, so run
+    this once, off-hours.
+    """
+    cursor = conn.cursor()
+    try:
+        if table_kind(cursor) != 'r':
+            logger.info("stocks is not a plain table; nothing to migrate")
+            return False
+
+        cursor.execute("LOCK TABLE stocks IN ACCESS EXCLUSIVE MODE")
+        cursor.execute("SELECT COALESCE(MAX(created_at)::date, CURRENT_DATE) + 1 FROM stocks")
+        legacy_until = cursor.fetchone()[0]
+
+        cursor.execute("""
+            ALTER TABLE stocks RENAME TO stocks_legacy;
+            ALTER TABLE stocks_legacy DROP CONSTRAINT IF EXISTS stocks_pkey;
+            ALTER INDEX IF EXISTS idx_symbol RENAME TO stocks_legacy_idx_symbol;
+            ALTER INDEX IF EXISTS idx_timestamp RENAME TO stocks_legacy_idx_timestamp;
+            ALTER INDEX IF EXISTS idx_created RENAME TO stocks_legacy_idx_created;
+            UPDATE stocks_legacy SET created_at = run_timestamp WHERE created_at IS NULL;
+            ALTER TABLE stocks_legacy ALTER COLUMN created_at SET NOT NULL;
+            ALTER TABLE stocks_legacy ALTER COLUMN id DROP DEFAULT;
+            ALTER TABLE stocks_legacy ADD COLUMN IF NOT EXISTS screener VARCHAR(64);
+            ALTER SEQUENCE stocks_id_seq OWNED BY NONE;
+        """)
+        cursor.execute(f"""
+            CREATE TABLE stocks (
+                {STOCKS_COLUMNS_SQL},
+                PRIMARY KEY (id, created_at)
+            ) PARTITION BY RANGE (created_at);
+            ALTER SEQUENCE stocks_id_seq OWNED BY stocks.id;
+        """)
+        cursor.execute(
+            "ALTER TABLE stocks ATTACH PARTITION stocks_legacy FOR VALUES FROM (MINVALUE) TO (%s)",
+            (legacy_until,)
+        )
+        cursor.execute(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF stocks DEFAULT")
+        # Matching indexes already on stocks_legacy are attached, not rebuilt;
+        # only the (id, created_at) primary key is built during ATTACH
+        cursor.execute("""
+            CREATE INDEX idx_symbol ON stocks(symbol);
+            CREATE INDEX idx_timestamp ON stocks(run_timestamp);
+            CREATE INDEX idx_created ON stocks(created_at);
+        """)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    logger.info(f"✓ Migrated stocks to daily partitions (legacy rows before {legacy_until})")
+    maintain(conn)
+    return True
+
+
+if __name__ == '__main__':
+    import psycopg2
+
+    logging.basicConfig(level=logging.INFO)
+    command = sys.argv[1] if len(sys.argv) > 1 else 'maintain'
+    if command not in ('maintain', 'migrate'):
+        print("usage: python partitions.py [maintain|migrate]")
+        sys.exit(2)
+
+    conn = psycopg2.connect(os.getenv('DATABASE_URL'))
+    try:
+        if command == 'migrate':
+            migrate_to_partitioned(conn)
+        elif not maintain(conn):
+            print("stocks is not partitioned; run `python partitions.py migrate` first")
+            sys.exit(1)
+    finally:
+        conn.close()
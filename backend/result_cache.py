@@ -0,0 +1,97 @@
+"""
+In-process result cache for the analytics layer.
+
+Analytics only change when a scraper batch is inserted, so results are kept
+for a short TTL and dropped as soon as `/api/data/insert` commits. The cache
+is per worker process: an insert handled by one gunicorn worker clears only
+that worker's cache, and the TTL bounds how stale the others can get.
+"""
+
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries expire after `ttl` seconds.
+
+    Concurrent misses on the same key are collapsed: one caller computes the
+    value while the others wait for it. Results computed across an
+    `invalidate()` are returned to their caller but never stored, so a slow
+    query that started before an insert cannot repopulate stale data.
+    """
+
+    def __init__(self, maxsize=128, ttl=60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()   # key -> (expires_at, value)
+        self._inflight = {}             # key -> threading.Event
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get_or_compute(self, key, compute):
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    if entry[0] > time.monotonic():
+                        self._entries.move_to_end(key)
+                        self._stats['hits'] += 1
+                        return entry[1]
+                    del self._entries[key]
+
+                pending = self._inflight.get(key)
+                if pending is None:
+                    pending = self._inflight[key] = threading.Event()
+                    generation = self._generation
+                    self._stats['misses'] += 1
+                    break
+
+            # Another thread is computing this key; wait and re-check
+            pending.wait()
+
+        try:
+            value = compute()
+        except BaseException:
+            with self._lock:
+                self._inflight.pop(key, None)
+            pending.set()
+            raise
+
+        with self._lock:
+            self._inflight.pop(key, None)
+            if generation == self._generation:
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.maxsize:
+                    self._entries.popitem(last=False)
+                    self._stats['evictions'] += 1
+        pending.set()
+        return value
+
+    def invalidate(self):
+        """Drop every entry (called after an ingest commits)"""
+        with self._lock:
+            self._entries.clear()
+            self._generation += 1
+            self._stats['invalidations'] += 1
+
+    def stats(self):
+        with self._lock:
+            snapshot = dict(self._stats)
+            snapshot.update({'size': len(self._entries), 'maxsize': self.maxsize, 'ttl': self.ttl})
+        return snapshot
+
+
+def cached(cache, name):
+    """Decorator caching a function's result under (name, args, kwargs)"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (name, args, tuple(sorted(kwargs.items())))
+            return cache.get_or_compute(key, lambda: func(*args, **kwargs))
+        wrapper.uncached = func
+        return wrapper
+    return decorator
@@ -0,0 +1,333 @@
+"""
+Streaming window aggregates for the analytics layer.
+
+Rows are folded into per-symbol, per-minute buckets as batches arrive. For
+each window span (1 hour, 30 and 15 minutes) the engine keeps running
+counts and sums per symbol, adding new buckets as they arrive and
+subtracting buckets as they age out, so top-gainers, momentum and breakouts
+are answered from memory instead of re-aggregating raw rows.
+
+Windows are evicted a minute bucket at a time using the newest timestamp in
+the bucket; with the scraper's one batch per minute this matches the
+`created_at > NOW() - INTERVAL ...` filters of the SQL queries.
+"""
+
+import bisect
+import threading
+from datetime import datetime, timedelta
+
+BUCKET_SECONDS = 60
+
+# Name -> span in seconds
+WINDOWS = {
+    '1h': 3600,
+    '30m': 1800,
+    '15m': 900,
+}
+
+# How far behind the watermark sync() looks for batches committed out of order
+SYNC_OVERLAP = timedelta(minutes=2)
+
+
+def _num(value):
+    return float(value) if value is not None else 0.0
+
+
+class _Agg:
+    """Count, sums and extremes over a set of rows"""
+
+    __slots__ = ('count', 'sum_pct', 'sum_price', 'sum_volume',
+                 'max_pct', 'min_pct', 'max_price', 'min_price', 'max_volume', 'last_ts')
+
+    def __init__(self):
+        self.count = 0
+        self.sum_pct = 0.0
+        self.sum_price = 0.0
+        self.sum_volume = 0
+        self.max_pct = None
+        self.min_pct = None
+        self.max_price = None
+        self.min_price = None
+        self.max_volume = None
+        self.last_ts = None
+
+    def add_row(self, ts, pct, price, volume):
+        self.count += 1
+        self.sum_pct += pct
+        self.sum_price += price
+        self.sum_volume += volume
+        self._extend(pct, pct, price, price, volume, ts)
+
+    def subtract(self, other):
+        """Remove a bucket's rows; returns True if the extremes need recomputing"""
+        self.count -= other.count
+        self.sum_pct -= other.sum_pct
+        self.sum_price -= other.sum_price
+        self.sum_volume -= other.sum_volume
+        return (other.max_pct == self.max_pct or other.min_pct == self.min_pct or
+                other.max_price == self.max_price or other.min_price == self.min_price or
+                other.max_volume == self.max_volume or other.last_ts == self.last_ts)
+
+    def reset_extremes(self):
+        self.max_pct = self.min_pct = None
+        self.max_price = self.min_price = None
+        self.max_volume = self.last_ts = None
+
+    def _extend(self, max_pct, min_pct, max_price, min_price, max_volume, ts):
+        if self.max_pct is None or max_pct > self.max_pct:
+            self.max_pct = max_pct
+        if self.min_pct is None or min_pct < self.min_pct:
+            self.min_pct = min_pct
+        if self.max_price is None or max_price > self.max_price:
+            self.max_price = max_price
+        if self.min_price is None or min_price < self.min_price:
+            self.min_price = min_price
+        if self.max_volume is None or max_volume > self.max_volume:
+            self.max_volume = max_volume
+        if self.last_ts is None or ts > self.last_ts:
+            self.last_ts = ts
+
+
+class _Window:
+    """Running per-key totals over the buckets newer than `cutoff`"""
+
+    def __init__(self, span):
+        self.span = timedelta(seconds=span)
+        self.totals = {}        # key -> _Agg
+        self.dirty = set()      # keys whose extremes must be recomputed
+        self.start = None       # minutes before this have been evicted
+        self.cutoff = None      # rows at or before this time are out
+
+
+class RollingWindowEngine:
+    """Per-symbol minute buckets with incrementally maintained window totals.
+
+    Keys are (symbol, stock_name), matching the GROUP BY of the SQL queries.
+    Thread-safe; all public methods take the engine lock.
+    """
+
+    def __init__(self, windows=None):
+        self._lock = threading.Lock()
+        self._windows = {name: _Window(span) for name, span in (windows or WINDOWS).items()}
+        self._max_span = max(w.span for w in self._windows.values())
+        self._minutes = []          # sorted minute keys present in _buckets
+        self._buckets = {}          # minute -> {key: _Agg}
+        self._minute_last_ts = {}   # minute -> newest row timestamp in it
+        self._seen_batches = set()  # (run_timestamp, screener) batches already applied
+        self.watermark = None       # newest run_timestamp applied
+        self._loaded = False        # history loaded by the first sync()
+
+    # ---------- feeding ----------
+
+    def add_rows(self, rows, screener=None):
+        """Apply one batch's rows of (run_timestamp, symbol, stock_name, pct_chg, price, volume, ...)"""
+        with self._lock:
+            self._add_rows((screener, row) for row in rows)
+
+    def _add_rows(self, tagged_rows):
+        # Screeners scraped on the same tick share a run_timestamp, so a
+        # batch is identified by both
+        new_batches = set()
+        for screener, row in tagged_rows:
+            ts, symbol, stock_name, pct, price, volume = row[:6]
+            batch = (ts, screener)
+            if batch in self._seen_batches:
+                continue
+            new_batches.add(batch)
+            self._add_row(ts, (symbol, stock_name), _num(pct), _num(price), int(volume or 0))
+
+        self._seen_batches |= new_batches
+        if new_batches:
+            newest = max(ts for ts, _ in new_batches)
+            if self.watermark is None or newest > self.watermark:
+                self.watermark = newest
+
+    def _add_row(self, ts, key, pct, price, volume):
+        minute = ts.replace(second=0, microsecond=0)
+        bucket_map = self._buckets.get(minute)
+        if bucket_map is None:
+            bucket_map = self._buckets[minute] = {}
+            bisect.insort(self._minutes, minute)
+        bucket = bucket_map.get(key)
+        if bucket is None:
+            bucket = bucket_map[key] = _Agg()
+        bucket.add_row(ts, pct, price, volume)
+        if minute not in self._minute_last_ts or ts > self._minute_last_ts[minute]:
+            self._minute_last_ts[minute] = ts
+
+        for window in self._windows.values():
+            if window.cutoff is not None and ts <= window.cutoff:
+                continue
+            if window.start is not None and minute < window.start:
+                continue
+            total = window.totals.get(key)
+            if total is None:
+                total = window.totals[key] = _Agg()
+            total.add_row(ts, pct, price, volume)
+
+    def sync(self, conn, now=None, until=None):
+        """Catch up with batches committed by other workers.
+
+        Reads rows newer than the watermark (minus a small overlap for
+        out-of-order commits) and applies the batches not seen yet. On a
+        cold engine this loads the largest window from the database. If the
+        caller already knows the newest batch (`until`) and the engine has
+        applied it, no query is made.
+        """
+        now = now or datetime.now()
+        with self._lock:
+            if (self._loaded and until is not None and self.watermark is not None
+                    and self.watermark >= until):
+                return
+            if not self._loaded or self.watermark is None:
+                since = now - self._max_span
+            else:
+                since = self.watermark - SYNC_OVERLAP
+
+        # The created_at bound is relative to the database clock, so it lets
+        # Postgres prune to the newest partition(s) even if the app and
+        # database clocks disagree.
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT run_timestamp, symbol, stock_name, pct_chg, price, volume, screener
+            FROM stocks
+            WHERE run_timestamp > %s
+              AND created_at > NOW() - %s
+            ORDER BY run_timestamp
+        """, (since, now - since + SYNC_OVERLAP))
+        rows = cursor.fetchall()
+        cursor.close()
+
+        with self._lock:
+            self._add_rows((row[6], row) for row in rows)
+            self._loaded = True
+
+    # ---------- eviction ----------
+
+    def _advance(self, now):
+        for window in self._windows.values():
+            cutoff = now - window.span
+            window.cutoff = cutoff
+            index = self._first_index(window)
+            while index < len(self._minutes):
+                minute = self._minutes[index]
+                if self._minute_last_ts[minute] > cutoff:
+                    break
+                for key, bucket in self._buckets[minute].items():
+                    total = window.totals.get(key)
+                    if total is None:
+                        continue
+                    if total.subtract(bucket):
+                        window.dirty.add(key)
+                    if total.count <= 0:
+                        del window.totals[key]
+                        window.dirty.discard(key)
+                window.start = minute + timedelta(seconds=BUCKET_SECONDS)
+                index += 1
+
+        # Drop buckets that have left every window
+        starts = [window.start for window in self._windows.values()]
+        if None not in starts:
+            drop = bisect.bisect_left(self._minutes, min(starts))
+            for minute in self._minutes[:drop]:
+                del self._buckets[minute]
+                del self._minute_last_ts[minute]
+            del self._minutes[:drop]
+
+        horizon = now - self._max_span - SYNC_OVERLAP
+        self._seen_batches = {batch for batch in self._seen_batches if batch[0] > horizon}
+
+    def _first_index(self, window):
+        """Index of the oldest minute still inside `window`"""
+        if window.start is None:
+            return 0
+        return bisect.bisect_left(self._minutes, window.start)
+
+    def _totals(self, name, now):
+        """Advance all windows to `now` and return the live totals for one window"""
+        self._advance(now)
+        window = self._windows[name]
+        for key in window.dirty:
+            total = window.totals[key]
+            total.reset_extremes()
+            for minute in self._minutes[self._first_index(window):]:
+                bucket = self._buckets[minute].get(key)
+                if bucket is not None:
+                    total._extend(bucket.max_pct, bucket.min_pct, bucket.max_price,
+                                  bucket.min_price, bucket.max_volume, bucket.last_ts)
+        window.dirty.clear()
+        return window.totals
+
+    # ---------- analytics ----------
+
+    def top_performers(self, now=None, limit=25):
+        """Top average gainers over the last hour (>= 3 observations)"""
+        with self._lock:
+            totals = self._totals('1h', now or datetime.now())
+            results = [
+                {
+                    'symbol': symbol,
+                    'stock_name': stock_name,
+                    'avg_gain': round(t.sum_pct / t.count, 2),
+                    'max_gain': t.max_pct,
+                    'min_gain': t.min_pct,
+                    'max_price': t.max_price,
+                    'max_volume': t.max_volume,
+                    'occurrences': t.count,
+                    'last_updated': t.last_ts,
+                }
+                for (symbol, stock_name), t in totals.items()
+                if t.count >= 3
+            ]
+        results.sort(key=lambda r: r['avg_gain'], reverse=True)
+        return results[:limit]
+
+    def momentum(self, now=None, limit=20):
+        """Consistently positive symbols over the last 30 minutes (>= 25 observations)"""
+        with self._lock:
+            totals = self._totals('30m', now or datetime.now())
+            results = [
+                {
+                    'symbol': symbol,
+                    'stock_name': stock_name,
+                    'avg_gain': round(t.sum_pct / t.count, 2),
+                    'appearances': t.count,
+                    'last_updated': t.last_ts,
+                    'volatility': round(t.max_pct - t.min_pct, 2),
+                }
+                for (symbol, stock_name), t in totals.items()
+                if t.count >= 25 and t.sum_pct / t.count > 0
+            ]
+        results.sort(key=lambda r: (r['avg_gain'], r['appearances']), reverse=True)
+        return results[:limit]
+
+    def breakouts(self, now=None, limit=20):
+        """Symbols whose 15-minute price range exceeds 2% of their average price"""
+        with self._lock:
+            totals = self._totals('15m', now or datetime.now())
+            results = [
+                {
+                    'symbol': symbol,
+                    'stock_name': stock_name,
+                    'price_high': round(t.max_price, 2),
+                    'price_low': round(t.min_price, 2),
+                    'max_gain': round(t.max_pct, 2),
+                    'price_range': round(t.max_price - t.min_price, 2),
+                    'avg_volume': round(t.sum_volume / t.count),
+                    'last_updated': t.last_ts,
+                }
+                for (symbol, stock_name), t in totals.items()
+                if (t.max_price - t.min_price) > (t.sum_price / t.count) * 0.02
+            ]
+        results.sort(key=lambda r: r['max_gain'], reverse=True)
+        return results[:limit]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'loaded': self._loaded,
+                'watermark': self.watermark.isoformat() if self.watermark else None,
+                'minutes': len(self._minutes),
+                'buckets': sum(len(b) for b in self._buckets.values()),
+                'windows': {name: len(w.totals) for name, w in self._windows.items()},
+            }
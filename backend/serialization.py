@@ -0,0 +1,126 @@
+"""
+Response encoding for the dashboard and analytics endpoints.
+
+Rows come out of psycopg2 as dicts of `Decimal` and `datetime` values. They
+are encoded with orjson when it is installed (stdlib json otherwise).
+Decimals stay strings, as Flask's default encoder sent them, so `pct_chg`
+and `price` keep their wire format; datetimes become ISO 8601 strings, with
+naive values marked UTC as Flask's default encoder assumed.
+
+Clients sending `Accept: application/vnd.trc.columnar+json` get every list
+of rows as `{"columns": [...], "rows": [[...], ...]}`, which repeats no key
+strings. Bodies above COMPRESS_MIN_BYTES are brotli- or gzip-compressed per
+`Accept-Encoding`.
+
+Only responses use orjson. Request bodies are parsed with stdlib json,
+because orjson rejects the NaN that pandas writes for empty CSV cells and
+the scraper posts those values as they are.
+"""
+
+import datetime
+import decimal
+import gzip
+import json
+import os
+from operator import itemgetter
+
+from flask.json.provider import JSONProvider
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speedup
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional encoding
+    brotli = None
+
+JSON_MIMETYPE = 'application/json'
+COLUMNAR_MIMETYPE = 'application/vnd.trc.columnar+json'
+
+# Smaller bodies are sent uncompressed
+COMPRESS_MIN_BYTES = int(os.getenv('COMPRESS_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.getenv('GZIP_LEVEL', 6))
+BROTLI_QUALITY = int(os.getenv('BROTLI_QUALITY', 5))
+
+
+def _default(obj):
+    if isinstance(obj, decimal.Decimal):
+        return str(obj)
+    if isinstance(obj, datetime.datetime):
+        if obj.tzinfo is None:
+            obj = obj.replace(tzinfo=datetime.timezone.utc)
+        return obj.isoformat()
+    if isinstance(obj, (datetime.date, datetime.time)):
+        return obj.isoformat()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+if orjson is not None:
+    _ORJSON_OPTIONS = orjson.OPT_NAIVE_UTC | orjson.OPT_NON_STR_KEYS
+
+    def dumps(obj):
+        """Encode to compact JSON bytes"""
+        return orjson.dumps(obj, default=_default, option=_ORJSON_OPTIONS)
+else:
+    _encoder = json.JSONEncoder(default=_default, separators=(',', ':'), ensure_ascii=False)
+
+    def dumps(obj):
+        """Encode to compact JSON bytes"""
+        return _encoder.encode(obj).encode('utf-8')
+
+
+def to_columnar(obj):
+    """Turn every list of row dicts inside `obj` into {'columns', 'rows'}"""
+    if isinstance(obj, dict):
+        return {key: to_columnar(value) for key, value in obj.items()}
+    if isinstance(obj, list) and obj and isinstance(obj[0], dict):
+        columns = list(obj[0])
+        if len(columns) == 1:
+            return {'columns': columns, 'rows': [[row.get(columns[0])] for row in obj]}
+        # Rows from one query (or one engine call) share their key order
+        getter = itemgetter(*columns)
+        return {'columns': columns, 'rows': [getter(row) for row in obj]}
+    return obj
+
+
+def negotiate_encoding(accept_encodings):
+    """'br', 'gzip' or None for a werkzeug Accept-Encoding header"""
+    if brotli is not None and accept_encodings.quality('br') > 0:
+        return 'br'
+    if accept_encodings.quality('gzip') > 0:
+        return 'gzip'
+    return None
+
+
+def compress(body, encoding):
+    if encoding == 'br':
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    if encoding == 'gzip':
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    return body
+
+
+def encode_body(obj, columnar=False, encoding=None):
+    """Serialize (and maybe compress) a payload; returns (body, content_encoding)"""
+    body = dumps(to_columnar(obj) if columnar else obj)
+    if encoding and len(body) >= COMPRESS_MIN_BYTES:
+        return compress(body, encoding), encoding
+    return body, None
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by `dumps`, so jsonify() shares the fast path"""
+
+    def dumps(self, obj, **kwargs):
+        return dumps(obj).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        # Request bodies go through stdlib json, which (unlike orjson)
+        # accepts the NaN that pandas gives for empty CSV cells
+        return json.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=JSON_MIMETYPE)
@@ -9,4 +9,24 @@ CREATE TABLE IF NOT EXISTS stock_ticks (
     timestamp TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
-CREATE INDEX IF NOT EXISTS idx_symbol_time ON stock_ticks(symbol, timestamp);
+-- Natural key: one tick per symbol per file timestamp, so re-ingesting a file is a no-op.
+-- The old append-only ingester stored duplicates; the first time, keep the first copy of each.
+DO $$
+BEGIN
+    IF to_regclass('uq_stock_ticks_symbol_time') IS NULL THEN
+        DELETE FROM stock_ticks a USING stock_ticks b
+        WHERE a.symbol = b.symbol AND a.timestamp = b.timestamp AND a.id > b.id;
+    END IF;
+END $$;
+DROP INDEX IF EXISTS idx_symbol_time;
+CREATE UNIQUE INDEX IF NOT EXISTS uq_stock_ticks_symbol_time ON stock_ticks(symbol, timestamp);
+
+-- Files already loaded by scripts/ingest_to_postgres.py
+CREATE TABLE IF NOT EXISTS csv_ingest_manifest (
+    file_name VARCHAR(128) PRIMARY KEY,
+    size BIGINT NOT NULL,
+    mtime DOUBLE PRECISION NOT NULL,
+    sha256 CHAR(64) NOT NULL,
+    rows INTEGER NOT NULL,
+    ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
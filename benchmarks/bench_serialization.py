@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Serialization benchmark: Flask jsonify vs the fast encoder, row vs columnar
+
+Encodes stocks_latest-shaped rows (dicts of Decimal and datetime values, as
+RealDictCursor returns them) for 100 and 2,000 symbols, and reports encode
+time and body size, raw and compressed. No database is needed.
+
+Usage:
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --sizes 100 2000 --repeat 50 --json
+"""
+
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'backend'))
+
+from flask import Flask  # noqa: E402
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+import serialization  # noqa: E402
+
+
+def make_rows(count, seed=42):
+    """Rows shaped like /api/dashboard/latest"""
+    rng = random.Random(seed)
+    now = datetime(2026, 1, 5, 10, 15)
+    return [
+        {
+            'id': 1_000_000 + i,
+            'run_timestamp': now,
+            'symbol': f'SYM{i:05d}',
+            'stock_name': f'Company {i} Ltd',
+            'pct_chg': Decimal(f'{rng.uniform(-8, 12):.2f}'),
+            'price': Decimal(f'{rng.uniform(10, 5000):.2f}'),
+            'volume': rng.randint(1_000, 5_000_000),
+            'links': 'P&F | F.A',
+            'created_at': now + timedelta(microseconds=rng.randint(0, 999_999)),
+        }
+        for i in range(count)
+    ]
+
+
+def time_call(func, repeat):
+    timings = []
+    for _ in range(repeat + 1):
+        started = time.perf_counter()
+        result = func()
+        timings.append((time.perf_counter() - started) * 1000)
+    # First call warms up
+    return result, timings[1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 2000])
+    parser.add_argument('--repeat', type=int, default=30)
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    args = parser.parse_args()
+
+    baseline = DefaultJSONProvider(Flask(__name__))
+    encoders = [
+        ('jsonify', lambda rows: baseline.dumps(rows).encode('utf-8')),
+        ('fast', lambda rows: serialization.encode_body(rows)[0]),
+        ('fast_columnar', lambda rows: serialization.encode_body(rows, columnar=True)[0]),
+    ]
+    encodings = ['gzip'] + (['br'] if serialization.brotli is not None else [])
+
+    results = []
+    for size in args.sizes:
+        rows = make_rows(size)
+        for name, encode in encoders:
+            body, timings = time_call(lambda: encode(rows), args.repeat)
+            result = {
+                'encoder': name,
+                'symbols': size,
+                'median_ms': round(statistics.median(timings), 3),
+                'bytes': len(body),
+            }
+            for encoding in encodings:
+                compressed, timings = time_call(lambda: serialization.compress(body, encoding), args.repeat)
+                result[f'{encoding}_bytes'] = len(compressed)
+                result[f'{encoding}_ms'] = round(statistics.median(timings), 3)
+            results.append(result)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+
+    header = f"{'symbols':>7}  {'encoder':<14} {'median ms':>10} {'bytes':>9}"
+    for encoding in encodings:
+        header += f" {encoding + ' bytes':>11} {encoding + ' ms':>8}"
+    print(header)
+    for r in results:
+        line = f"{r['symbols']:>7}  {r['encoder']:<14} {r['median_ms']:>10} {r['bytes']:>9}"
+        for encoding in encodings:
+            line += f" {r[encoding + '_bytes']:>11} {r[encoding + '_ms']:>8}"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
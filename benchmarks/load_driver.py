@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+"""
+Load driver: throughput and latency of a running backend over HTTP
+
+First posts `--warmup-batches` market_data batches, one per minute of the
+last half hour, so the windowed analytics have data. Then, for
+`--duration` seconds, `--concurrency` closed-loop readers cycle through
+the dashboard and analytics endpoints while one writer posts a new batch
+to /api/data/insert every `--insert-interval` seconds.
+
+Results per endpoint (requests, errors, req/s, mean/p50/p90/p95/p99/max
+ms), the run's settings and the git commit go to `--output` as JSON. If
+the server runs with TIMING_METRICS=1, its /api/metrics/timings snapshot
+is included. `--baseline` prints the change against an earlier results
+file, so runs can be compared between commits.
+
+Usage:
+    python benchmarks/load_driver.py --url http://127.0.0.1:5000 --output results.json
+    python benchmarks/load_driver.py --concurrency 32 --duration 60 --baseline results.json
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import requests
+
+from market_data import MarketSimulator
+
+READ_ENDPOINTS = {
+    'latest': '/api/dashboard/latest',
+    'bundle': '/api/dashboard/bundle',
+    'stats': '/api/dashboard/stats',
+    'top_gainers': '/api/analytics/top-gainers',
+    'momentum': '/api/analytics/momentum',
+    'breakouts': '/api/analytics/breakouts',
+}
+INSERT_PATH = '/api/data/insert'
+
+COLUMNAR_MIMETYPE = 'application/vnd.trc.columnar+json'
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of sorted `values`"""
+    if not values:
+        return None
+    index = max(0, math.ceil(q / 100 * len(values)) - 1)
+    return round(values[index], 3)
+
+
+def summarize(latencies, errors, elapsed):
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        'requests': count,
+        'errors': errors,
+        'throughput_rps': round(count / elapsed, 2) if elapsed else None,
+        'mean_ms': round(sum(latencies) / count, 3) if count else None,
+        'p50_ms': percentile(latencies, 50),
+        'p90_ms': percentile(latencies, 90),
+        'p95_ms': percentile(latencies, 95),
+        'p99_ms': percentile(latencies, 99),
+        'max_ms': round(latencies[-1], 3) if count else None,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__))
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+class Recorder:
+    """Latencies and error counts per endpoint, from every thread"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+        self.last_error = {}
+
+    def record(self, name, ms, error=None):
+        with self._lock:
+            if error is None:
+                self.latencies.setdefault(name, []).append(ms)
+            else:
+                self.errors[name] = self.errors.get(name, 0) + 1
+                self.last_error[name] = error
+
+
+class LoadDriver:
+    def __init__(self, args):
+        self.args = args
+        self.url = args.url.rstrip('/')
+        self.market = MarketSimulator(args.symbols, args.seed)
+        self.market.open_day()
+        self.recorder = Recorder()
+        self.stop = threading.Event()
+        self._last_run_time = None
+        self.started_at = None
+        self.headers = {'Accept': COLUMNAR_MIMETYPE} if args.columnar else {}
+        self.insert_params = {'mode': args.mode, 'screener': args.screener, 'async': '1' if args.async_ingest else '0'}
+
+    def next_batch(self, run_time):
+        self.market.step()
+        # Strictly increasing, so no two batches share a run_timestamp
+        if self._last_run_time is not None and run_time <= self._last_run_time:
+            run_time = self._last_run_time + timedelta(milliseconds=1)
+        self._last_run_time = run_time
+        return {'batch_id': uuid.uuid4().hex, 'run_timestamp': run_time.isoformat(), 'rows': self.market.batch(self.args.rows)}
+
+    def post(self, session, batches):
+        response = session.post(f"{self.url}{INSERT_PATH}", params=self.insert_params,
+                                json={'batches': batches}, timeout=self.args.timeout)
+        if response.status_code not in (200, 202):
+            raise RuntimeError(f"insert failed ({response.status_code}): {response.text[:200]}")
+
+    def warm_up(self):
+        now = datetime.now().replace(second=0, microsecond=0)
+        count = self.args.warmup_batches
+        batches = [self.next_batch(now - timedelta(minutes=count - i)) for i in range(count)]
+        with requests.Session() as session:
+            for start in range(0, len(batches), 10):
+                self.post(session, batches[start:start + 10])
+            # Untimed pass so first-use costs (window load, pool growth) stay out of the numbers
+            for path in READ_ENDPOINTS.values():
+                session.get(f"{self.url}{path}", headers=self.headers, timeout=self.args.timeout)
+
+    def reader(self, worker):
+        names = self.args.endpoints
+        index = worker % len(names)
+        with requests.Session() as session:
+            while not self.stop.is_set():
+                name = names[index]
+                index = (index + 1) % len(names)
+                started = time.perf_counter()
+                error = None
+                try:
+                    response = session.get(f"{self.url}{READ_ENDPOINTS[name]}", headers=self.headers,
+                                           timeout=self.args.timeout)
+                    if response.status_code >= 400:
+                        error = f"HTTP {response.status_code}"
+                except requests.RequestException as e:
+                    error = str(e)
+                self.recorder.record(name, (time.perf_counter() - started) * 1000, error)
+
+    def writer(self):
+        interval = self.args.insert_interval
+        next_at = time.monotonic()
+        with requests.Session() as session:
+            while not self.stop.is_set():
+                batch = self.next_batch(datetime.now())
+                started = time.perf_counter()
+                error = None
+                try:
+                    self.post(session, [batch])
+                except (requests.RequestException, RuntimeError) as e:
+                    error = str(e)
+                self.recorder.record('insert', (time.perf_counter() - started) * 1000, error)
+                next_at += interval
+                self.stop.wait(max(0.0, next_at - time.monotonic()))
+
+    def run(self):
+        self.warm_up()
+        threads = [threading.Thread(target=self.reader, args=(i,), daemon=True)
+                   for i in range(self.args.concurrency)]
+        if self.args.insert_interval > 0:
+            threads.append(threading.Thread(target=self.writer, daemon=True))
+        self.started_at = datetime.now()
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        time.sleep(self.args.duration)
+        self.stop.set()
+        for thread in threads:
+            thread.join(self.args.timeout + 1)
+        elapsed = time.perf_counter() - started
+        return self.results(elapsed)
+
+    def server_metrics(self):
+        metrics = {}
+        for name, path in (('timings', '/api/metrics/timings'), ('pool', '/api/metrics/pool')):
+            try:
+                body = requests.get(f"{self.url}{path}", timeout=self.args.timeout).json()
+            except (requests.RequestException, ValueError):
+                continue
+            if body.get('enabled', True):
+                metrics[name] = body
+        return metrics
+
+    def results(self, elapsed):
+        recorder = self.recorder
+        names = list(self.args.endpoints) + (['insert'] if self.args.insert_interval > 0 else [])
+        endpoints = {name: summarize(recorder.latencies.get(name, []), recorder.errors.get(name, 0), elapsed)
+                     for name in names}
+        for name, error in recorder.last_error.items():
+            endpoints[name]['last_error'] = error
+        reads = [ms for name in self.args.endpoints for ms in recorder.latencies.get(name, [])]
+        settings = {key: value for key, value in vars(self.args).items() if key not in ('output', 'baseline', 'json')}
+        return {
+            'meta': {
+                'started_at': self.started_at.isoformat(timespec='seconds'),
+                'git_commit': git_commit(),
+                'python': platform.python_version(),
+                'elapsed_seconds': round(elapsed, 2),
+                'settings': settings,
+            },
+            'reads': summarize(reads, sum(recorder.errors.get(name, 0) for name in self.args.endpoints), elapsed),
+            'endpoints': endpoints,
+            'server': self.server_metrics(),
+        }
+
+
+def print_results(results):
+    print(f"{'endpoint':<12} {'req':>7} {'err':>5} {'req/s':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    rows = list(results['endpoints'].items()) + [('all reads', results['reads'])]
+    for name, r in rows:
+        print(f"{name:<12} {r['requests']:>7} {r['errors']:>5} {r['throughput_rps'] or 0:>9} "
+              f"{r['p50_ms'] or '-':>8} {r['p95_ms'] or '-':>8} {r['p99_ms'] or '-':>8} {r['max_ms'] or '-':>8}")
+
+
+def print_comparison(baseline, results):
+    def change(old, new):
+        if not old or new is None:
+            return '-'
+        return f"{(new - old) / old * 100:+.1f}%"
+
+    print(f"\nvs {baseline['meta'].get('git_commit') or 'baseline'} "
+          f"({baseline['meta'].get('started_at')}):")
+    print(f"{'endpoint':<12} {'req/s':>18} {'p50 ms':>18} {'p99 ms':>18}")
+    old_rows = {**baseline.get('endpoints', {}), 'all reads': baseline.get('reads', {})}
+    new_rows = {**results['endpoints'], 'all reads': results['reads']}
+    for name, new in new_rows.items():
+        old = old_rows.get(name)
+        if not old:
+            continue
+        cells = []
+        for key in ('throughput_rps', 'p50_ms', 'p99_ms'):
+            cells.append(f"{change(old.get(key), new.get(key)):>8} ({new.get(key) or '-'})")
+        print(f"{name:<12} " + ' '.join(f"{cell:>18}" for cell in cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--url', default=os.getenv('API_URL', 'http://127.0.0.1:5000'))
+    parser.add_argument('--concurrency', type=int, default=8, help='reader threads')
+    parser.add_argument('--duration', type=float, default=30, help='seconds of measured load')
+    parser.add_argument('--endpoints', nargs='+', choices=sorted(READ_ENDPOINTS), default=list(READ_ENDPOINTS))
+    parser.add_argument('--insert-interval', type=float, default=1.0, help='seconds between inserts; 0 for none')
+    parser.add_argument('--warmup-batches', type=int, default=30)
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--rows', type=int, help='records per batch (top by %%Chg); default all symbols')
+    parser.add_argument('--mode', choices=('values', 'copy'), default='values', help='ingest mode')
+    parser.add_argument('--async-ingest', action='store_true', help='post with async=1')
+    parser.add_argument('--screener', default='bench')
+    parser.add_argument('--columnar', action='store_true', help='request the columnar response shape')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help='write the results JSON here')
+    parser.add_argument('--baseline', help='earlier results JSON to compare against')
+    parser.add_argument('--json', action='store_true', help='print machine-readable results')
+    args = parser.parse_args()
+
+    try:
+        results = LoadDriver(args).run()
+    except (requests.RequestException, RuntimeError) as e:
+        print(f"Warm-up failed: {e}")
+        sys.exit(1)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            print_comparison(json.load(f), results)
+
+
+if __name__ == '__main__':
+    main()
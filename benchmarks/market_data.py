@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+Synthetic market data in Chartink's shape
+
+A seeded random-walk market of `symbols` stocks over NSE trading minutes
+(09:15-15:29, weekdays). Every minute produces one Chartink batch:
+records with `Symbol`, `Stock Narr`, `%Chg`, `Price`, `Volume` and `Links`,
+sorted by %Chg like a scan result and optionally cut to the top `rows`.
+Each stock drifts with its own volatility. Now and then a stock breaks out
+for 10-20 minutes, so the momentum and breakout analytics have something
+to find. The same seed always gives the same batches.
+
+Used by load_history.py, load_driver.py and bench_ingest.py. Run directly,
+it prints batches as JSON lines ({"run_timestamp", "rows"}):
+
+Usage:
+    python benchmarks/market_data.py --symbols 200 --days 1 > batches.jsonl
+    python benchmarks/market_data.py --symbols 50 --rows 20 --days 2 --end 2026-01-09
+"""
+
+import argparse
+import json
+import math
+import random
+import sys
+from datetime import date, datetime, time, timedelta
+
+MARKET_OPEN = time(9, 15)
+MINUTES_PER_DAY = 375               # 09:15 through 15:29
+LINKS = 'P&F | F.A'
+
+# Per-minute chance that a stock starts a breakout, and its length in minutes
+BREAKOUT_CHANCE = 0.002
+BREAKOUT_MINUTES = (10, 20)
+
+
+def trading_days(end, count):
+    """The `count` weekdays up to and including `end`, oldest first"""
+    days = []
+    day = end
+    while len(days) < count:
+        if day.weekday() < 5:
+            days.append(day)
+        day -= timedelta(days=1)
+    return days[::-1]
+
+
+def trading_minutes(day):
+    """Batch timestamps of one trading day"""
+    start = datetime.combine(day, MARKET_OPEN)
+    return [start + timedelta(minutes=i) for i in range(MINUTES_PER_DAY)]
+
+
+class MarketSimulator:
+    """Seeded random walk over `symbols` stocks, one step per trading minute"""
+
+    def __init__(self, symbols=200, seed=42):
+        self.rng = random.Random(seed)
+        rng = self.rng
+        self.symbols = [f'SYM{i:05d}' for i in range(symbols)]
+        self.names = [f'Company {i} Ltd' for i in range(symbols)]
+        self.price = [math.exp(rng.uniform(math.log(20), math.log(4000))) for _ in range(symbols)]
+        self.volatility = [rng.uniform(0.0005, 0.003) for _ in range(symbols)]
+        self.liquidity = [rng.randint(500, 50_000) for _ in range(symbols)]
+        self.prev_close = list(self.price)
+        self.volume = [0] * symbols
+        self.breakout = [0] * symbols    # minutes of breakout left
+        self.drift = [0.0] * symbols
+
+    def open_day(self):
+        """Start a session: today's %Chg is measured from the last close"""
+        rng = self.rng
+        for i in range(len(self.symbols)):
+            # Overnight gap
+            self.price[i] *= math.exp(rng.gauss(0, self.volatility[i] * 4))
+            self.prev_close[i] = self.price[i]
+            self.volume[i] = 0
+            self.breakout[i] = 0
+            self.drift[i] = 0.0
+
+    def step(self):
+        """Advance one minute"""
+        rng = self.rng
+        for i in range(len(self.symbols)):
+            if self.breakout[i]:
+                self.breakout[i] -= 1
+            elif rng.random() < BREAKOUT_CHANCE:
+                self.breakout[i] = rng.randint(*BREAKOUT_MINUTES)
+                self.drift[i] = rng.choice((1, -1)) * rng.uniform(0.002, 0.006)
+            drift = self.drift[i] if self.breakout[i] else 0.0
+            self.price[i] *= math.exp(drift + rng.gauss(0, self.volatility[i]))
+            self.volume[i] += int(self.liquidity[i] * rng.uniform(0.2, 1.8) * (4 if self.breakout[i] else 1))
+
+    def batch(self, rows=None):
+        """The current minute as Chartink records, best %Chg first"""
+        records = []
+        for i, symbol in enumerate(self.symbols):
+            records.append({
+                'Stock Narr': self.names[i],
+                'Symbol': symbol,
+                'Links': LINKS,
+                '%Chg': round((self.price[i] / self.prev_close[i] - 1) * 100, 2),
+                'Price': round(self.price[i], 2),
+                'Volume': self.volume[i],
+            })
+        records.sort(key=lambda r: r['%Chg'], reverse=True)
+        if rows is not None:
+            records = records[:rows]
+        for number, record in enumerate(records, 1):
+            record['Sr.'] = number
+            record['%Chg'] = f"{record['%Chg']:.2f}"
+            record['Price'] = f"{record['Price']:.2f}"
+            record['Volume'] = str(record['Volume'])
+        return records
+
+    def session(self, day, rows=None, until=None):
+        """(run_timestamp, records) for each minute of `day`, stopping before `until`"""
+        self.open_day()
+        for run_timestamp in trading_minutes(day):
+            if until is not None and run_timestamp >= until:
+                return
+            self.step()
+            yield run_timestamp, self.batch(rows)
+
+
+def make_records(count, seed=42):
+    """One Chartink-shaped batch of `count` records"""
+    market = MarketSimulator(count, seed)
+    market.open_day()
+    market.step()
+    return market.batch()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--symbols', type=int, default=200)
+    parser.add_argument('--rows', type=int, help='records per batch (top by %%Chg); default all symbols')
+    parser.add_argument('--days', type=int, default=1, help='trading days')
+    parser.add_argument('--end', type=date.fromisoformat, default=date.today(), help='last day (YYYY-MM-DD)')
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    market = MarketSimulator(args.symbols, args.seed)
+    out = sys.stdout
+    for day in trading_days(args.end, args.days):
+        for run_timestamp, records in market.session(day, args.rows):
+            out.write(json.dumps({'run_timestamp': run_timestamp.isoformat(), 'rows': records}) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,12 +1,20 @@
+import logging
 import os
+import sys
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 import time
 from datetime import datetime
 import psycopg2
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'selenium'))
+from page_load import LoadTimer, block_in_chrome, chrome_load_stats, configure_chrome_options, wait_for_data
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
 # Get DB connection from environment variable
 DATABASE_URL = os.environ.get("DATABASE_URL")
 
@@ -26,6 +34,8 @@ chrome_options = webdriver.ChromeOptions()
 chrome_options.add_argument("--headless")
 chrome_options.add_argument("--no-sandbox")
 chrome_options.add_argument("--disable-dev-shm-usage")
+# Skip images, fonts, ads and analytics; get() returns at DOMContentLoaded
+configure_chrome_options(chrome_options)
 
 # Set the URL of the webpage you want to reload
 url = "https://chartink.com/screener/15-minute-stock-breakouts"
@@ -34,13 +44,20 @@ url = "https://chartink.com/screener/15-minute-stock-breakouts"
 stop_time = datetime.now().replace(hour=15, minute=30, second=0, microsecond=0)
 
 driver = webdriver.Chrome(options=chrome_options)
+block_in_chrome(driver)
 
 try:
     while True:
         if datetime.now() > stop_time:
             print("Stopping execution as current time is past 3:30 PM.")
             break
+        timer = LoadTimer()
         driver.get(url)
+        try:
+            wait_for_data(driver)
+            timer.finish(chrome_load_stats(driver))
+        except TimeoutException:
+            print("Results table did not load within 15 seconds.")
         # TODO: Add scraping logic here and call save_to_db(parsed_data)
         print("Page loaded. Implement scraping and DB save logic.")
         time.sleep(900)  # 15 minutes
@@ -8,25 +8,20 @@ export default function Dashboard() {
   const [breakouts, setBreakouts] = useState([]);
   const [lastUpdate, setLastUpdate] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [live, setLive] = useState(false);
   const API_URL = process.env.NEXT_PUBLIC_API_URL || 'https://chartlink-api.onrender.com';
 
+  // One bundled request; the browser revalidates with the ETag and gets a
+  // bodyless 304 when no batch has arrived since the last load
   const fetchData = async () => {
     try {
       setLoading(true);
-      const [latestRes, statsRes, gainersRes, momentumRes, breakoutsRes] = await Promise.all([
-        fetch(`${API_URL}/api/dashboard/latest`),
-        fetch(`${API_URL}/api/dashboard/stats`),
-        fetch(`${API_URL}/api/analytics/top-gainers`),
-        fetch(`${API_URL}/api/analytics/momentum`),
-        fetch(`${API_URL}/api/analytics/breakouts`)
-      ]);
-
-      if (latestRes.ok) setStocks(await latestRes.json());
-      if (statsRes.ok) setStats(await statsRes.json());
-      if (gainersRes.ok) setGainers(await gainersRes.json());
-      if (momentumRes.ok) setMomentum(await momentumRes.json());
-      if (breakoutsRes.ok) setBreakouts(await breakoutsRes.json());
-      setLastUpdate(new Date());
+      const res = await fetch(`${API_URL}/api/dashboard/bundle`);
+      if (res.ok) {
+        const data = await res.json();
+        setStocks(data.latest || []);
+        applyAnalytics(data);
+      }
     } catch (err) {
       console.error('Fetch error:', err);
     } finally {
@@ -34,11 +29,61 @@ export default function Dashboard() {
     }
   };
 
-  // Load data immediately and auto-refresh every 5 minutes
+  const applyAnalytics = (data) => {
+    if (data.stats) setStats(data.stats);
+    if (data.top_gainers) setGainers(data.top_gainers);
+    if (data.momentum) setMomentum(data.momentum);
+    if (data.breakouts) setBreakouts(data.breakouts);
+    setLastUpdate(new Date());
+  };
+
+  // Merge the symbols changed by a batch into the current table
+  const mergeChanged = (changed) => {
+    setStocks((current) => {
+      const bySymbol = new Map(current.map((s) => [s.symbol, s]));
+      changed.forEach((s) => bySymbol.set(s.symbol, s));
+      return Array.from(bySymbol.values())
+        .sort((a, b) => a.symbol.localeCompare(b.symbol))
+        .slice(0, 100);
+    });
+  };
+
+  // Subscribe to pushed updates; fall back to polling without EventSource
   useEffect(() => {
-    fetchData(); // Initial load
-    const interval = setInterval(fetchData, 300000); // Auto-refresh every 5 min
-    return () => clearInterval(interval);
+    if (typeof EventSource === 'undefined') {
+      fetchData();
+      const interval = setInterval(fetchData, 300000);
+      return () => clearInterval(interval);
+    }
+
+    const source = new EventSource(`${API_URL}/api/stream`);
+    source.addEventListener('snapshot', (e) => {
+      const data = JSON.parse(e.data);
+      setStocks(data.latest || []);
+      applyAnalytics(data);
+      setLive(true);
+      setLoading(false);
+    });
+    source.addEventListener('update', (e) => {
+      const data = JSON.parse(e.data);
+      mergeChanged(data.changed || []);
+      applyAnalytics(data);
+    });
+    // EventSource reconnects on its own and gets a fresh snapshot, except
+    // after an error status (503 when the worker's stream cap is reached),
+    // which closes it for good; poll the bundle from then on
+    let poll = null;
+    source.onerror = () => {
+      setLive(false);
+      if (source.readyState === EventSource.CLOSED && !poll) {
+        fetchData();
+        poll = setInterval(fetchData, 60000);
+      }
+    };
+    return () => {
+      source.close();
+      if (poll) clearInterval(poll);
+    };
   }, []);
 
   return (
@@ -46,7 +91,7 @@ export default function Dashboard() {
       <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', marginBottom: '20px' }}>
         <h1 style={{ margin: 0 }}>📊 Stock Screener Dashboard</h1>
         <div style={{ display: 'flex', alignItems: 'center', gap: '10px' }}>
-          <span style={{ fontSize: '12px', color: '#666' }}>🔴 LIVE</span>
+          <span style={{ fontSize: '12px', color: '#666' }}>{live ? '🔴 LIVE' : '⚪ Reconnecting...'}</span>
           <button 
             onClick={fetchData}
             style={{
@@ -66,7 +111,7 @@ export default function Dashboard() {
       <p style={{ color: '#666' }}>
         Last loaded: {lastUpdate?.toLocaleTimeString() || 'Loading...'} 
         <br/>
-        <small>✓ Auto-refreshes every 5 minutes | Data pulled every 1 minute</small>
+        <small>✓ Updates pushed as each batch arrives | Data pulled every 1 minute</small>
       </p>
 
       {stats && (
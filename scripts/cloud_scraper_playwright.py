@@ -1,32 +1,361 @@
+"""
+Long-lived Playwright scraping service for several screeners.
+
+One Chromium process serves every screener. It holds a pool of POOL_SIZE
+browser contexts with one page each; a screener borrows a page for each
+scrape and hands it back, so twenty screeners cost a handful of tabs, not
+twenty browsers. Screeners run concurrently, each on its own interval,
+aligned to the market session (selenium/market_schedule.py).
+
+Images, fonts, media and ad/analytics domains are blocked in every context
+(selenium/page_load.py), and a scrape waits for table rows rather than the
+full page load.
+
+A context is recycled (closed and reopened) once its page's JS heap passes
+CONTEXT_HEAP_BUDGET_MB, after CONTEXT_MAX_USES scrapes, or after a failed
+scrape, which bounds what long-running pages accumulate.
+
+Tables are read inside the page (EXTRACT_TABLE_JS): rows come back as
+typed JSON records keyed the way the API reads them (`Stock Narr`, `%Chg`),
+with no HTML round trip and no pandas. EXTRACTION_MODE=html keeps the old
+outerHTML + pd.read_html path, which also needs `pip install lxml`.
+
+Every batch is posted in the API's `{"batches": [...]}` form, tagged with
+its screener id and tick time. The batch id is derived from both, so a
+retried post is not stored twice.
+
+Screeners are read from SCREENERS_FILE (default screeners.json next to
+this script):
+
+    [{"id": "breakouts-15m", "url": "https://chartink.com/screener/...", "interval": 60}]
+
+Without that file, SCRAPE_URL is scraped every SCRAPE_INTERVAL seconds.
+"""
+
 import asyncio
-from playwright.async_api import async_playwright
-import requests
+import json
+import logging
+import math
 import os
-import pandas as pd
-from datetime import datetime
+import re
+import sys
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from io import StringIO
+
+import requests
+from playwright.async_api import async_playwright
+from requests.adapters import HTTPAdapter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'selenium'))
+
+from market_schedule import MAX_SLEEP_CHUNK, MarketCalendar, MinuteScheduler  # noqa: E402
+from page_load import LOAD_STATS_JS, LoadTimer, block_in_playwright  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
 
 # CONFIG
 API_URL = os.environ.get('API_URL', 'https://your-backend.onrender.com/api/data/insert')
-SCRAPE_URL = os.environ.get('SCRAPE_URL', 'https://example.com/your-stock-page')
+SCREENERS_FILE = os.environ.get(
+    'SCREENERS_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'screeners.json')
+)
+# Single-screener fallback when there is no SCREENERS_FILE
+SCRAPE_URL = os.environ.get('SCRAPE_URL', 'https://chartink.com/screener/15-minute-stock-breakouts')
+SCRAPE_INTERVAL = int(os.environ.get('SCRAPE_INTERVAL', 60))
+
+# Contexts (one page each) shared by all screeners
+POOL_SIZE = int(os.environ.get('POOL_SIZE', 4))
+# Recycle a context past this JS heap size, or after this many scrapes
+CONTEXT_HEAP_BUDGET_MB = float(os.environ.get('CONTEXT_HEAP_BUDGET_MB', 150))
+CONTEXT_MAX_USES = int(os.environ.get('CONTEXT_MAX_USES', 500))
+# Seconds for one page load + table read
+SCRAPE_TIMEOUT = float(os.environ.get('SCRAPE_TIMEOUT', 30))
+POST_ATTEMPTS = 3
+# A tick reached later than this is skipped rather than scraped late
+TICK_GRACE = timedelta(seconds=5)
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/118.0 Safari/537.36')
+# Makes performance.memory exact rather than bucketed
+BROWSER_ARGS = ['--enable-precise-memory-info', '--disable-dev-shm-usage', '--no-sandbox']
+
+# 'js' reads the table in the page; 'html' parses its HTML with pandas
+EXTRACTION_MODE = os.environ.get('EXTRACTION_MODE', 'js')
+
+# Screener table header -> the record key the API reads
+HEADER_ALIASES = {'% Chg': '%Chg', '%chg': '%Chg', 'Stock Name': 'Stock Narr'}
+# Parsed to numbers in the page (commas and % stripped); blank cells become null
+NUMERIC_COLUMNS = ['Sr.', '%Chg', 'Price', 'Volume']
+
+# (table, [numericColumns, aliases]) -> [{header: value}]; rows whose cell
+# count doesn't match the header (e.g. DataTables' "No data" row) are skipped
+EXTRACT_TABLE_JS = """(table, [numericColumns, aliases]) => {
+    const text = cell => cell.textContent.replace(/\\s+/g, ' ').trim();
+    const headRow = table.tHead && table.tHead.rows.length
+        ? table.tHead.rows[table.tHead.rows.length - 1] : table.rows[0];
+    const headers = Array.from(headRow.cells, cell => aliases[text(cell)] || text(cell));
+    const numeric = headers.map(header => numericColumns.includes(header));
+    const records = [];
+    for (const body of table.tBodies) {
+        for (const row of body.rows) {
+            if (row.cells.length !== headers.length) continue;
+            const record = {};
+            for (let i = 0; i < headers.length; i++) {
+                const value = text(row.cells[i]);
+                if (numeric[i]) {
+                    const number = parseFloat(value.replace(/[,%\\s]/g, ''));
+                    record[headers[i]] = Number.isNaN(number) ? null : number;
+                } else {
+                    record[headers[i]] = value;
+                }
+            }
+            records.push(record);
+        }
+    }
+    return records;
+}"""
+
+SCREENER_ID_PATTERN = re.compile(r'^[A-Za-z0-9_.-]{1,40}$')
+
+
+class Screener:
+    """One screener page to scrape every `interval` seconds"""
+
+    def __init__(self, id, url, interval=SCRAPE_INTERVAL, table='table'):
+        if not SCREENER_ID_PATTERN.match(str(id)):
+            raise ValueError(f"Screener id {id!r} must be 1-40 letters, digits, '.', '_' or '-'")
+        if int(interval) < 10:
+            raise ValueError(f"Screener {id}: interval must be at least 10 seconds")
+        self.id = id
+        self.url = url
+        self.interval = int(interval)
+        self.table = table
+
+
+def load_screeners(path=SCREENERS_FILE):
+    if not os.path.exists(path):
+        return [Screener('default', SCRAPE_URL, SCRAPE_INTERVAL)]
+    with open(path) as f:
+        screeners = [Screener(**entry) for entry in json.load(f)]
+    ids = [screener.id for screener in screeners]
+    if len(set(ids)) != len(ids):
+        raise ValueError(f"Duplicate screener ids in {path}")
+    return screeners
+
+
+class _Slot:
+    """A pooled context and its page; page is None until (re)opened"""
+
+    def __init__(self):
+        self.context = None
+        self.page = None
+        self.url = None     # screener currently loaded, so a repeat visit is a reload
+        self.uses = 0
+        self.counter = {'blocked': 0}   # requests aborted by page_load's routing
+
+
+class PagePool:
+    """Browser contexts with one page each, lent out to scrape tasks"""
+
+    def __init__(self, browser, size=POOL_SIZE, heap_budget_mb=CONTEXT_HEAP_BUDGET_MB,
+                 max_uses=CONTEXT_MAX_USES):
+        self.browser = browser
+        self.size = size
+        self.heap_budget = heap_budget_mb * 1024 * 1024
+        self.max_uses = max_uses
+        self._idle = asyncio.Queue()
+        self.recycled = 0
+
+    async def start(self):
+        for _ in range(self.size):
+            slot = _Slot()
+            await self._reopen(slot)
+            self._idle.put_nowait(slot)
+
+    @asynccontextmanager
+    async def page(self):
+        """Borrow a slot; waits while every page is busy"""
+        slot = await self._idle.get()
+        healthy = False
+        try:
+            if slot.page is None:
+                await self._reopen(slot)
+            yield slot
+            healthy = True
+        finally:
+            try:
+                await self._check_in(slot, healthy)
+            except Exception as e:
+                # Reopened on its next borrow
+                logger.warning(f"⚠ Could not recycle context: {e}")
+                slot.page = None
+            self._idle.put_nowait(slot)
+
+    async def _check_in(self, slot, healthy):
+        slot.uses += 1
+        if not healthy:
+            reason = "failed scrape"
+        elif slot.uses >= self.max_uses:
+            reason = f"{slot.uses} scrapes"
+        else:
+            heap = await slot.page.evaluate(
+                "performance.memory ? performance.memory.usedJSHeapSize : 0"
+            )
+            if heap <= self.heap_budget:
+                return
+            reason = f"JS heap {heap / 1024 / 1024:.0f} MB"
+        logger.info(f"♻ Recycling browser context ({reason})")
+        self.recycled += 1
+        await self._reopen(slot)
+
+    async def _reopen(self, slot):
+        if slot.context is not None:
+            try:
+                await slot.context.close()
+            except Exception as e:
+                logger.warning(f"⚠ Closing context failed: {e}")
+        slot.context = slot.page = slot.url = None
+        slot.uses = 0
+        slot.context = await self.browser.new_context(user_agent=USER_AGENT)
+        await block_in_playwright(slot.context, slot.counter)
+        slot.page = await slot.context.new_page()
+
+
+def _clean(value):
+    # Empty cells come back from pandas as NaN, which is not valid JSON
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+async def read_table_html(page, selector):
+    """EXTRACTION_MODE=html: ship the table's HTML to Python and parse it with pandas"""
+    import pandas as pd
+
+    table_html = await page.eval_on_selector(selector, "table => table.outerHTML")
+    df = pd.read_html(StringIO(table_html))[0].rename(columns=HEADER_ALIASES)
+    return [{key: _clean(value) for key, value in row.items()} for row in df.to_dict('records')]
+
+
+async def scrape(slot, screener):
+    """Load the screener in the borrowed page and read its results table"""
+    page = slot.page
+    timer = LoadTimer(f"[{screener.id}] Page load")
+    blocked_before = slot.counter['blocked']
+    if slot.url == screener.url:
+        await page.reload(wait_until='domcontentloaded')
+    else:
+        await page.goto(screener.url, wait_until='domcontentloaded')
+        slot.url = screener.url
+    await page.wait_for_selector(f"{screener.table} tbody tr")
+    timer.finish(await page.evaluate(LOAD_STATS_JS), blocked=slot.counter['blocked'] - blocked_before)
+    if EXTRACTION_MODE == 'html':
+        return await read_table_html(page, screener.table)
+    return await page.eval_on_selector(screener.table, EXTRACT_TABLE_JS, [NUMERIC_COLUMNS, HEADER_ALIASES])
+
+
+def post_batch(session, screener, tick, records):
+    """Send one tagged batch; returns the API response"""
+    body = {'batches': [{
+        'batch_id': f"{screener.id}@{tick:%Y%m%dT%H%M%S}",
+        'run_timestamp': tick.isoformat(),
+        'screener': screener.id,
+        'rows': records,
+    }]}
+    return session.post(API_URL, json=body, timeout=15)
+
+
+async def send(session, screener, tick, records):
+    for attempt in range(1, POST_ATTEMPTS + 1):
+        try:
+            response = await asyncio.to_thread(post_batch, session, screener, tick, records)
+            if response.status_code in (200, 202):
+                logger.info(f"✓ [{screener.id}] {len(records)} rows sent for {tick:%H:%M:%S}")
+                return True
+            logger.error(f"✗ [{screener.id}] API Error (Status {response.status_code}): {response.text[:200]}")
+            if response.status_code < 500:
+                return False
+        except requests.RequestException as e:
+            logger.error(f"✗ [{screener.id}] API Connection Error: {e}")
+        if attempt < POST_ATTEMPTS:
+            await asyncio.sleep(2 ** attempt)
+    return False
+
+
+async def sleep_until(target):
+    while True:
+        remaining = (target - datetime.now(target.tzinfo)).total_seconds()
+        if remaining <= 0:
+            return
+        await asyncio.sleep(min(remaining, MAX_SLEEP_CHUNK))
+
+
+async def run_screener(pool, session, calendar, screener):
+    """Scrape one screener on its own schedule, forever"""
+    scheduler = MinuteScheduler(calendar, interval=screener.interval)
+    tick = scheduler.next_tick(datetime.now(calendar.tz))
+    while True:
+        await sleep_until(tick)
+        try:
+            async with pool.page() as slot:
+                records = await asyncio.wait_for(scrape(slot, screener), SCRAPE_TIMEOUT)
+            await send(session, screener, tick, records)
+        except Exception as e:
+            logger.error(f"✗ [{screener.id}] Scrape failed: {e!r}")
+
+        upcoming = scheduler.next_tick(tick + timedelta(microseconds=1))
+        now = datetime.now(calendar.tz)
+        if now - upcoming > TICK_GRACE:
+            # Waited too long for a page or the site was slow; resume on schedule
+            tick = scheduler.next_tick(now)
+            logger.warning(f"⚠ [{screener.id}] Skipping to {tick:%H:%M:%S}")
+        else:
+            tick = upcoming
+
+
+async def main():
+    screeners = load_screeners()
+    calendar = MarketCalendar.from_file()
+
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
 
-async def scrape_and_send():
     async with async_playwright() as p:
-        browser = await p.chromium.launch(headless=True)
-        page = await browser.new_page()
-        await page.goto(SCRAPE_URL)
-        # TODO: Replace below with your actual scraping logic
-        # Example: Scrape a table into a DataFrame
-        table_html = await page.inner_html('table#your-table-id')
-        df = pd.read_html(table_html)[0]
-        # Data cleaning/renaming as per your schema
-        # df = ...
-        # Convert to list of dicts
-        data = df.to_dict('records')
-        # Send to backend
-        resp = requests.post(API_URL, json=data)
-        print(f"POST {API_URL} status: {resp.status_code}")
-        print(resp.text)
-        await browser.close()
+        browser = await p.chromium.launch(headless=True, args=BROWSER_ARGS)
+        disconnected = asyncio.Event()
+        browser.on('disconnected', lambda _: disconnected.set())
+
+        pool = PagePool(browser, size=min(POOL_SIZE, len(screeners)))
+        await pool.start()
+        logger.info(f"✓ Browser ready: {len(screeners)} screeners sharing {pool.size} pages")
+
+        tasks = [asyncio.create_task(run_screener(pool, session, calendar, screener))
+                 for screener in screeners]
+        watchdog = asyncio.create_task(disconnected.wait())
+        try:
+            done, _ = await asyncio.wait([watchdog, *tasks], return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task is not watchdog:
+                    task.result()   # a screener loop only ends by raising
+        finally:
+            for task in (watchdog, *tasks):
+                task.cancel()
+            if browser.is_connected():
+                await browser.close()
+            session.close()
+
+    if disconnected.is_set():
+        # Let the process supervisor restart us with a fresh browser
+        logger.critical("❌ Browser disconnected; exiting")
+        sys.exit(1)
+
 
 if __name__ == "__main__":
-    asyncio.run(scrape_and_send())
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        logger.info("⛔ Stopped by user (Ctrl+C)")
@@ -1,7 +1,12 @@
+import argparse
+import hashlib
+import io
+import itertools
 import os
 import pandas as pd
 import psycopg2
 from psycopg2.extras import execute_values
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
 from datetime import datetime
 
 # CONFIGURATION
@@ -11,6 +16,7 @@ DB_PORT = os.environ.get('PGPORT', '5432')
 DB_NAME = os.environ.get('PGDATABASE', 'stocks')
 DB_USER = os.environ.get('PGUSER', 'postgres')
 DB_PASS = os.environ.get('PGPASSWORD', 'password')
+INSERT_CHUNK_ROWS = int(os.environ.get('INSERT_CHUNK_ROWS', 5000))
 
 # Connect to PostgreSQL
 def get_connection():
@@ -22,69 +28,240 @@ def get_connection():
         password=DB_PASS
     )
 
+def load_csv_frame(file_path, file):
+    """Read and clean one 15_minutes_YYYYMMDD_HHMMSS.csv file; None if unreadable"""
+    try:
+        df = pd.read_csv(file_path).drop(['Sr.','Links'], axis=1)
+    except Exception as e:
+        print(f"Skipping {file}: {e}")
+        return None
+    column_name_mapping = {'Stock Name': 'stock', 'Symbol': 'symbol', '%Chg': 'chg_percentage','Price':'price','Volume':'volume'}
+    df.rename(columns=column_name_mapping, inplace=True)
+    df['chg_percentage'] = pd.to_numeric(df['chg_percentage'].astype(str).str.rstrip('%'), errors='coerce')
+    file_time = parse_file_timestamp(file)
+    if file_time is None:
+        print(f"Skipping file '{file}' due to unexpected filename format.")
+        return None
+    # Parsed once per file and broadcast, rather than per row
+    df['timestamp'] = pd.Timestamp(file_time)
+    df['date_'] = file_time.date()
+    return df
+
+def parse_file_timestamp(file):
+    """datetime encoded in 15_minutes_YYYYMMDD_HHMMSS.csv, or None"""
+    try:
+        parts = os.path.splitext(file)[0].split('_')
+        return datetime.strptime(parts[2] + parts[3], '%Y%m%d%H%M%S')
+    except (ValueError, IndexError):
+        return None
+
+def list_csv_files(day=None, until=None):
+    """os.DirEntry objects for 15-minute files from `day` through `until` (default: today only),
+    in filename (time) order"""
+    day = day or datetime.now().date()
+    until = until or day
+    first, last = day.strftime('%Y%m%d'), until.strftime('%Y%m%d')
+    with os.scandir(CSV_DIR) as entries:
+        files = [
+            e for e in entries
+            if e.name.startswith('15_minutes_') and first <= e.name[11:19] <= last and e.is_file()
+        ]
+    files.sort(key=lambda e: e.name)
+    return files
+
+def iter_csv_frames():
+    """Yield one cleaned DataFrame per CSV file for today"""
+    for entry in list_csv_files():
+        df = load_csv_frame(entry.path, entry.name)
+        if df is not None:
+            yield df
+
 def process_csv_files():
-    today_date = datetime.now().date()
-    files = [f for f in os.listdir(CSV_DIR) if os.path.isfile(os.path.join(CSV_DIR, f))]
-    files.sort(key=lambda x: os.path.getctime(os.path.join(CSV_DIR, x)), reverse=True)
-    all_dfs = []
-    for file in files:
-        if file.startswith(f"15_minutes_{today_date.strftime('%Y%m%d')}"):
-            file_path = os.path.join(CSV_DIR, file)
-            try:
-                df = pd.read_csv(file_path).drop(['Sr.','Links'], axis=1)
-            except Exception as e:
-                print(f"Skipping {file}: {e}")
-                continue
-            column_name_mapping = {'Stock Name': 'stock', 'Symbol': 'symbol', '%Chg': 'chg_percentage','Price':'price','Volume':'volume'}
-            df.rename(columns=column_name_mapping, inplace=True)
-            df['chg_percentage'] = pd.to_numeric(df['chg_percentage'].astype(str).str.rstrip('%'), errors='coerce')
-            try:
-                file_date = pd.to_datetime(file.split('_')[2], format='%Y%m%d').date()
-                number = file.split('_')[3].split('.')[0]
-            except (ValueError, IndexError):
-                print(f"Skipping file '{file}' due to unexpected filename format.")
-                continue
-            df['file_date'] = file_date
-            df['number'] = number
-            all_dfs.append(df)
+    """All of today's files as one DataFrame (prefer iter_csv_frames for large loads)"""
+    all_dfs = list(iter_csv_frames())
     if not all_dfs:
         print("No files found for today.")
         return pd.DataFrame()
-    df_15min = pd.concat(all_dfs, ignore_index=True)
-    df_15min['number'] = pd.to_datetime(df_15min['number'], format='%H%M%S').dt.strftime('%H:%M:%S')
-    df_15min['timestamp'] = pd.to_datetime(df_15min['file_date'].astype(str) + ' ' + df_15min['number'])
-    df_15min = df_15min.drop(['file_date','number'], axis=1)
-    df_15min['timestamp'] = pd.to_datetime(df_15min['timestamp'])
-    df_15min['date_'] = df_15min['timestamp'].dt.date
-    return df_15min
+    return pd.concat(all_dfs, ignore_index=True)
+
+def _nullable(series):
+    """Column as a list of Python values with NaN/NaT mapped to None"""
+    return series.astype(object).where(series.notna(), None).tolist()
+
+def frame_to_rows(df, created_at):
+    """Vectorized DataFrame -> stock_ticks tuples iterator (no per-row pandas access)"""
+    price = pd.to_numeric(df['price'], errors='coerce')
+    chg = pd.to_numeric(df['chg_percentage'], errors='coerce')
+    volume = pd.to_numeric(df['volume'], errors='coerce').round().astype('Int64')
+    timestamps = df['timestamp'].dt.to_pydatetime().tolist()
+    return zip(
+        _nullable(df['symbol']),
+        _nullable(df['stock']),
+        _nullable(price),
+        _nullable(chg),
+        _nullable(volume),
+        timestamps,
+        itertools.repeat(created_at, len(df)),
+    )
+
+INSERT_QUERY = '''
+    INSERT INTO stock_ticks (symbol, stock, price, chg_percentage, volume, timestamp, created_at)
+    VALUES %s
+    ON CONFLICT (symbol, timestamp) DO NOTHING
+'''
+
+def write_rows(cur, rows, chunk_rows=INSERT_CHUNK_ROWS):
+    """Stream row tuples to Postgres in fixed-size chunks; returns rows sent"""
+    total = 0
+    while True:
+        chunk = list(itertools.islice(rows, chunk_rows))
+        if not chunk:
+            return total
+        execute_values(cur, INSERT_QUERY, chunk, page_size=len(chunk))
+        total += len(chunk)
 
 def save_to_postgres(df):
-    if df.empty:
-        print("No data to insert.")
+    save_frames([df] if not df.empty else [])
+
+def save_frames(frames):
+    """Insert DataFrames one at a time in a single transaction"""
+    conn = None
+    cur = None
+    total = 0
+    try:
+        created_at = datetime.now()
+        for df in frames:
+            if df.empty:
+                continue
+            if conn is None:
+                conn = get_connection()
+                cur = conn.cursor()
+            total += write_rows(cur, frame_to_rows(df, created_at))
+        if conn is None:
+            print("No data to insert.")
+            return
+        conn.commit()
+        print(f"Inserted {total} rows into stock_ticks.")
+    except Exception as e:
+        print(f"Error inserting to DB: {e}")
+        if conn is not None:
+            conn.rollback()
+    finally:
+        if cur is not None:
+            cur.close()
+        if conn is not None:
+            conn.close()
+
+# ==================== MANIFEST ====================
+# One row per ingested file, written in the same transaction as its rows, so
+# an interrupted run resumes at the first file that was not committed.
+
+MANIFEST_SCHEMA = '''
+    CREATE TABLE IF NOT EXISTS csv_ingest_manifest (
+        file_name VARCHAR(128) PRIMARY KEY,
+        size BIGINT NOT NULL,
+        mtime DOUBLE PRECISION NOT NULL,
+        sha256 CHAR(64) NOT NULL,
+        rows INTEGER NOT NULL,
+        ingested_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+# Natural key that makes re-ingesting a file a no-op (also in stock_ticks_schema.sql)
+NATURAL_KEY_SCHEMA = '''
+    CREATE UNIQUE INDEX IF NOT EXISTS uq_stock_ticks_symbol_time ON stock_ticks(symbol, timestamp)
+'''
+
+# One-time migration: the append-only ingester stored a file again on every
+# run, so keep the first copy of each (symbol, timestamp) before indexing
+DEDUPE_TICKS_SQL = '''
+    DELETE FROM stock_ticks a USING stock_ticks b
+    WHERE a.symbol = b.symbol AND a.timestamp = b.timestamp AND a.id > b.id
+'''
+
+def ensure_natural_key(cur):
+    """Create the natural-key index, first removing duplicate ticks if it doesn't exist yet"""
+    cur.execute("SELECT to_regclass('uq_stock_ticks_symbol_time') IS NOT NULL")
+    if cur.fetchone()[0]:
         return
+    cur.execute("LOCK TABLE stock_ticks IN SHARE ROW EXCLUSIVE MODE")
+    cur.execute(DEDUPE_TICKS_SQL)
+    if cur.rowcount:
+        print(f"Removed {cur.rowcount} duplicate stock_ticks rows before adding the (symbol, timestamp) key.")
+    cur.execute(NATURAL_KEY_SCHEMA)
+
+def file_sha256(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def load_manifest(cur, names):
+    """{file_name: (size, mtime, sha256)} for the given file names"""
+    if not names:
+        return {}
+    cur.execute(
+        "SELECT file_name, size, mtime, sha256 FROM csv_ingest_manifest WHERE file_name = ANY(%s)",
+        (list(names),)
+    )
+    return {name: (size, mtime, sha) for name, size, mtime, sha in cur.fetchall()}
+
+def pending_files(cur, entries):
+    """Filter directory entries down to files not yet ingested.
+
+    Unchanged size and mtime means already ingested without reading the
+    file; otherwise the content hash decides (a touched but identical file
+    only gets its manifest row refreshed). Returns [(entry, stat, sha256)].
+    """
+    manifest = load_manifest(cur, [e.name for e in entries])
+    pending = []
+    for entry in entries:
+        stat = entry.stat()
+        known = manifest.get(entry.name)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime:
+            continue
+        sha = file_sha256(entry.path)
+        if known and known[2] == sha:
+            cur.execute(
+                "UPDATE csv_ingest_manifest SET size = %s, mtime = %s WHERE file_name = %s",
+                (stat.st_size, stat.st_mtime, entry.name)
+            )
+            continue
+        pending.append((entry, stat, sha))
+    return pending
+
+def record_file(cur, entry, stat, sha, rows):
+    cur.execute('''
+        INSERT INTO csv_ingest_manifest (file_name, size, mtime, sha256, rows)
+        VALUES (%s, %s, %s, %s, %s)
+        ON CONFLICT (file_name) DO UPDATE SET
+            size = EXCLUDED.size, mtime = EXCLUDED.mtime, sha256 = EXCLUDED.sha256,
+            rows = EXCLUDED.rows, ingested_at = CURRENT_TIMESTAMP
+    ''', (entry.name, stat.st_size, stat.st_mtime, sha, rows))
+
+def ingest_new_files(entries=None):
+    """Ingest files missing from the manifest, committing file by file"""
+    entries = list_csv_files() if entries is None else entries
     conn = get_connection()
     cur = conn.cursor()
-    insert_query = '''
-        INSERT INTO stock_ticks (symbol, stock, price, chg_percentage, volume, timestamp, created_at)
-        VALUES %s
-        ON CONFLICT DO NOTHING
-    '''
-    values = [
-        (
-            row['symbol'],
-            row['stock'],
-            float(row['price']) if not pd.isnull(row['price']) else None,
-            float(row['chg_percentage']) if not pd.isnull(row['chg_percentage']) else None,
-            int(row['volume']) if not pd.isnull(row['volume']) else None,
-            row['timestamp'],
-            datetime.now()
-        )
-        for _, row in df.iterrows()
-    ]
+    ingested = skipped = total = 0
     try:
-        execute_values(cur, insert_query, values)
+        cur.execute(MANIFEST_SCHEMA)
+        ensure_natural_key(cur)
+        pending = pending_files(cur, entries)
         conn.commit()
-        print(f"Inserted {len(values)} rows into stock_ticks.")
+        skipped = len(entries) - len(pending)
+
+        created_at = datetime.now()
+        for entry, stat, sha in pending:
+            df = load_csv_frame(entry.path, entry.name)
+            rows = 0 if df is None or df.empty else write_rows(cur, frame_to_rows(df, created_at))
+            # Unreadable files are recorded too, so they are not retried until they change
+            record_file(cur, entry, stat, sha, rows)
+            conn.commit()
+            ingested += 1
+            total += rows
     except Exception as e:
         print(f"Error inserting to DB: {e}")
         conn.rollback()
@@ -92,9 +269,131 @@ def save_to_postgres(df):
         cur.close()
         conn.close()
 
+    print(f"Ingested {ingested} new files ({total} rows), {skipped} already in manifest.")
+    return ingested
+
+# ==================== BACKFILL ====================
+
+STAGE_SCHEMA = '''
+    CREATE TEMP TABLE IF NOT EXISTS stock_ticks_stage (
+        symbol VARCHAR(16), stock VARCHAR(64), price NUMERIC, chg_percentage NUMERIC,
+        volume BIGINT, timestamp TIMESTAMP, created_at TIMESTAMP
+    ) ON COMMIT DELETE ROWS
+'''
+
+def parse_file_csv(path, name, created_at):
+    """Process-pool task: parse one file into COPY-ready CSV text; returns (text, rows)"""
+    df = load_csv_frame(path, name)
+    if df is None or df.empty:
+        return '', 0
+    out = pd.DataFrame({
+        'symbol': df['symbol'],
+        'stock': df['stock'],
+        'price': pd.to_numeric(df['price'], errors='coerce'),
+        'chg_percentage': pd.to_numeric(df['chg_percentage'], errors='coerce'),
+        'volume': pd.to_numeric(df['volume'], errors='coerce').round().astype('Int64'),
+        'timestamp': df['timestamp'],
+        'created_at': pd.Timestamp(created_at),
+    })
+    # Unquoted empty fields are NULL to COPY ... (FORMAT csv)
+    return out.to_csv(header=False, index=False, na_rep=''), len(out)
+
+def copy_csv(cur, text):
+    """COPY CSV text into a staging table, then merge it on the natural key.
+    The stage is emptied when the transaction commits."""
+    cur.execute(STAGE_SCHEMA)
+    cur.copy_expert(
+        "COPY stock_ticks_stage (symbol, stock, price, chg_percentage, volume, timestamp, created_at) "
+        "FROM STDIN WITH (FORMAT csv)",
+        io.StringIO(text)
+    )
+    cur.execute('''
+        INSERT INTO stock_ticks (symbol, stock, price, chg_percentage, volume, timestamp, created_at)
+        SELECT symbol, stock, price, chg_percentage, volume, timestamp, created_at FROM stock_ticks_stage
+        ON CONFLICT (symbol, timestamp) DO NOTHING
+    ''')
+
+def backfill(start, end, workers=None):
+    """Ingest every unseen file between two dates, parsing across a process pool.
+
+    Workers parse files straight to COPY-ready CSV text. This process
+    streams each result through COPY and commits it with its manifest row
+    as soon as it comes back, while the pool keeps parsing; at most
+    2 x workers files are in flight at once. A file that fails to parse or
+    load is reported at the end and left out of the manifest, so the next
+    run retries it; the other files carry on.
+    """
+    workers = workers or os.cpu_count() or 1
+    entries = list_csv_files(start, end)
+    conn = get_connection()
+    cur = conn.cursor()
+    ingested = total = 0
+    failed = []
+    try:
+        cur.execute(MANIFEST_SCHEMA)
+        ensure_natural_key(cur)
+        pending = pending_files(cur, entries)
+        conn.commit()
+        print(f"Backfill {start} .. {end}: {len(pending)} files to ingest, "
+              f"{len(entries) - len(pending)} already in manifest, {workers} workers")
+
+        created_at = datetime.now()
+        queue = iter(pending)
+        in_flight = {}
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            def submit(count):
+                for item in itertools.islice(queue, count):
+                    entry = item[0]
+                    in_flight[pool.submit(parse_file_csv, entry.path, entry.name, created_at)] = item
+
+            submit(workers * 2)
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    entry, stat, sha = in_flight.pop(future)
+                    submit(1)
+                    try:
+                        text, rows = future.result()
+                        if rows:
+                            copy_csv(cur, text)
+                        record_file(cur, entry, stat, sha, rows)
+                        conn.commit()
+                    except psycopg2.OperationalError:
+                        raise
+                    except Exception as e:
+                        # One bad file (parse error, uncastable value) doesn't stop the rest
+                        conn.rollback()
+                        failed.append((entry.name, e))
+                        continue
+                    ingested += 1
+                    total += rows
+    except Exception as e:
+        print(f"Error during backfill: {e}")
+        conn.rollback()
+    finally:
+        cur.close()
+        conn.close()
+
+    print(f"Backfilled {ingested} files ({total} rows).")
+    if failed:
+        print(f"{len(failed)} files failed and will be retried on the next run:")
+        for name, error in failed:
+            detail = str(error).strip().split('\n')[0]
+            print(f"  {name}: {type(error).__name__}: {detail}")
+    return ingested
+
 def main():
-    df = process_csv_files()
-    save_to_postgres(df)
+    parser = argparse.ArgumentParser(description="Load 15-minute Chartink CSVs into stock_ticks")
+    parser.add_argument('--backfill', nargs=2, metavar=('START', 'END'),
+                        help="ingest every file between two dates (YYYY-MM-DD), in parallel")
+    parser.add_argument('--workers', type=int, default=None, help="parser processes for --backfill")
+    args = parser.parse_args()
+
+    if args.backfill:
+        start, end = (datetime.strptime(d, '%Y-%m-%d').date() for d in args.backfill)
+        backfill(start, end, args.workers)
+    else:
+        ingest_new_files()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,176 @@
+"""
+Direct HTTP acquisition of screener results, no browser involved.
+
+The screener page embeds a CSRF token and the scan clause; the results
+table itself is filled from a JSON POST to `/screener/process`. This client
+does the same over one pooled, keep-alive `requests.Session`: it loads the
+page once for the token, cookies and clause, then posts the clause every
+tick and parses the JSON in memory. An expired token (HTTP 419) or session
+is refreshed transparently.
+
+Records come back keyed the way the scraper has always posted them
+(`Stock Narr` for the name), so the backend receives the same payload in
+either mode.
+
+Try it against the local stand-in server:
+
+    python standin_server.py &
+    python chartink_http.py http://127.0.0.1:8765/screener/15-minute-stock-breakouts
+"""
+
+import csv
+import html
+import json
+import logging
+import re
+import sys
+import time
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+CSV_COLUMNS = ['Sr.', 'Stock Name', 'Symbol', 'Links', '%Chg', 'Price', 'Volume']
+# Record key for each CSV column; the backend reads the name from 'Stock Narr'
+RECORD_KEYS = ['Sr.', 'Stock Narr', 'Symbol', 'Links', '%Chg', 'Price', 'Volume']
+LINKS_TEXT = 'P&F | F.A'
+
+USER_AGENT = ('Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 '
+              '(KHTML, like Gecko) Chrome/118.0 Safari/537.36')
+
+CSRF_PATTERN = re.compile(r'<meta\s+name="csrf-token"\s+content="([^"]+)"', re.I)
+# Where screener pages have carried the clause: a form field, a textarea, or page JSON
+SCAN_CLAUSE_PATTERNS = [
+    re.compile(r'<input[^>]*name="scan_clause"[^>]*value="([^"]*)"', re.I | re.S),
+    re.compile(r'<textarea[^>]*name="scan_clause"[^>]*>(.*?)</textarea>', re.I | re.S),
+    re.compile(r'"scan_clause"\s*:\s*"((?:[^"\\]|\\.)*)"', re.S),
+]
+
+
+class AcquisitionError(Exception):
+    """The screener could not be fetched over HTTP (caller may fall back to the browser)"""
+
+
+def extract_scan_clause(page):
+    for pattern in SCAN_CLAUSE_PATTERNS:
+        match = pattern.search(page)
+        if match:
+            clause = match.group(1)
+            if pattern is SCAN_CLAUSE_PATTERNS[-1]:
+                clause = json.loads(f'"{clause}"')
+            return html.unescape(clause).strip()
+    return None
+
+
+def to_records(payload):
+    """Screener JSON rows -> records keyed like the scraper's payload"""
+    return [
+        {
+            'Sr.': row.get('sr', i + 1),
+            'Stock Narr': row.get('name'),
+            'Symbol': row.get('nsecode'),
+            'Links': LINKS_TEXT,
+            '%Chg': row.get('per_chg'),
+            'Price': row.get('close'),
+            'Volume': row.get('volume'),
+        }
+        for i, row in enumerate(payload.get('data') or [])
+    ]
+
+
+def write_csv(records, path):
+    """Archive records in the CSV download's layout"""
+    with open(path, 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(CSV_COLUMNS)
+        writer.writerows([record.get(key) for key in RECORD_KEYS] for record in records)
+
+
+class ChartinkClient:
+    """Fetches one screener's results over a pooled HTTP session"""
+
+    def __init__(self, screener_url, scan_clause=None, timeout=10):
+        self.screener_url = screener_url
+        self.process_url = urljoin(screener_url, '/screener/process')
+        self.fixed_clause = scan_clause
+        self.timeout = timeout
+        self.scan_clause = scan_clause
+        self.csrf_token = None
+
+        self.session = requests.Session()
+        retries = Retry(total=2, backoff_factor=0.3, status_forcelist=(502, 503, 504),
+                        allowed_methods=('GET', 'POST'))
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=2, max_retries=retries)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers['User-Agent'] = USER_AGENT
+
+    def refresh(self):
+        """Load the screener page for a fresh CSRF token, cookies and scan clause"""
+        try:
+            response = self.session.get(self.screener_url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise AcquisitionError(f"Screener page failed: {e}") from e
+
+        match = CSRF_PATTERN.search(response.text)
+        if not match:
+            raise AcquisitionError("No CSRF token on the screener page")
+        self.csrf_token = match.group(1)
+
+        if not self.fixed_clause:
+            self.scan_clause = extract_scan_clause(response.text)
+            if not self.scan_clause:
+                raise AcquisitionError("No scan clause on the screener page; set SCAN_CLAUSE")
+
+    def fetch(self):
+        """Current screener rows as CSV-shaped records"""
+        if self.csrf_token is None:
+            self.refresh()
+
+        for attempt in range(2):
+            try:
+                response = self.session.post(
+                    self.process_url,
+                    data={'scan_clause': self.scan_clause},
+                    headers={
+                        'X-CSRF-TOKEN': self.csrf_token,
+                        'X-Requested-With': 'XMLHttpRequest',
+                        'Referer': self.screener_url,
+                    },
+                    timeout=self.timeout,
+                )
+            except requests.RequestException as e:
+                raise AcquisitionError(f"Screener request failed: {e}") from e
+
+            # 419: CSRF token expired; 401/403: session dropped
+            if response.status_code in (401, 403, 419) and attempt == 0:
+                logger.info("Screener session expired; refreshing token")
+                self.refresh()
+                continue
+            if response.status_code != 200:
+                raise AcquisitionError(f"Screener returned status {response.status_code}")
+            try:
+                payload = response.json()
+            except ValueError as e:
+                raise AcquisitionError(f"Screener returned invalid JSON: {e}") from e
+            if 'data' not in payload:
+                raise AcquisitionError(f"Unexpected screener response: {str(payload)[:200]}")
+            return to_records(payload)
+
+    def close(self):
+        self.session.close()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    target = sys.argv[1] if len(sys.argv) > 1 else 'https://chartink.com/screener/15-minute-stock-breakouts'
+    client = ChartinkClient(target)
+    for _ in range(5):
+        started = time.perf_counter()
+        records = client.fetch()
+        logger.info(f"✓ {len(records)} rows in {(time.perf_counter() - started) * 1000:.1f} ms")
+    client.close()
@@ -0,0 +1,141 @@
+"""
+Download completion detection for the scraper.
+
+Chrome downloads into a dedicated, normally empty `incoming` directory, and
+finished files are moved out to the archive right away. Completion is
+signalled by filesystem notifications (watchdog) on that directory, so
+detecting a download never lists or stats the archive, however many
+`15_minutes_*.csv` files pile up there. Without watchdog the incoming
+directory is polled instead, which is still cheap because it holds at most
+a file or two.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # pragma: no cover - polling fallback
+    FileSystemEventHandler = object
+    Observer = None
+
+logger = logging.getLogger(__name__)
+
+# In-progress download names (Chrome, Firefox, Edge)
+PARTIAL_SUFFIXES = ('.crdownload', '.part', '.tmp')
+POLL_INTERVAL = 0.1
+
+
+class _Notify(FileSystemEventHandler):
+    def __init__(self, event):
+        self._event = event
+
+    def on_any_event(self, event):
+        self._event.set()
+
+
+class DownloadWatcher:
+    """Hands back the path of each completed download in `directory`"""
+
+    def __init__(self, directory, archive_dir):
+        self.directory = directory
+        self.archive_dir = archive_dir
+        os.makedirs(directory, exist_ok=True)
+        self._changed = threading.Event()
+        # Leftovers expect() could not clear: name -> (size, mtime) when it tried
+        self._stale = {}
+        self._observer = None
+        if Observer is not None:
+            self._observer = Observer()
+            self._observer.schedule(_Notify(self._changed), directory, recursive=False)
+            self._observer.daemon = True
+            self._observer.start()
+        else:
+            logger.warning("⚠ watchdog not installed; polling the download directory")
+
+    def expect(self):
+        """Call before triggering a download: clears stale events and leftovers from failed attempts.
+
+        Leftovers that can't be cleared are remembered and ignored by wait(),
+        so an old download is never handed back as the new one.
+        """
+        self._stale = {}
+        for name in self._entries():
+            path = os.path.join(self.directory, name)
+            try:
+                if name.endswith(PARTIAL_SUFFIXES):
+                    # Never a usable file; archiving it would only collect junk
+                    os.remove(path)
+                else:
+                    shutil.move(path, self._archive_path(name))
+            except OSError as e:
+                # e.g. Chrome still holds the file on Windows; retried before the next download
+                logger.warning(f"⚠ Could not clear leftover download {name}: {e}")
+                signature = self._signature(path)
+                if signature is not None:
+                    self._stale[name] = signature
+        self._changed.clear()
+
+    def _archive_path(self, name):
+        """A path in the archive that doesn't exist yet: Chrome reuses the same download name,
+        and moving onto an existing file fails on Windows"""
+        stamp = time.strftime('%Y%m%d_%H%M%S')
+        candidate = os.path.join(self.archive_dir, f"leftover_{stamp}_{name}")
+        counter = 1
+        while os.path.exists(candidate):
+            candidate = os.path.join(self.archive_dir, f"leftover_{stamp}_{counter}_{name}")
+            counter += 1
+        return candidate
+
+    def wait(self, timeout=10):
+        """Path of the completed download, or None if nothing finished within `timeout` seconds"""
+        deadline = time.monotonic() + timeout
+        while True:
+            path = self._completed()
+            if path:
+                return path
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            if self._observer is not None:
+                self._changed.wait(remaining)
+                self._changed.clear()
+            else:
+                time.sleep(min(POLL_INTERVAL, remaining))
+
+    def stop(self):
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout=5)
+
+    def _entries(self):
+        with os.scandir(self.directory) as entries:
+            return [entry.name for entry in entries if entry.is_file()]
+
+    def _signature(self, path):
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        return stat.st_size, stat.st_mtime_ns
+
+    def _completed(self):
+        names = [
+            name for name in self._entries()
+            # A leftover that has since changed was rewritten by this download
+            if name not in self._stale
+            or self._signature(os.path.join(self.directory, name)) != self._stale[name]
+        ]
+        # Chrome creates an empty placeholder under the final name before it
+        # starts writing, then renames the .crdownload over it when done
+        if any(name.endswith(PARTIAL_SUFFIXES) for name in names):
+            return None
+        for name in names:
+            path = os.path.join(self.directory, name)
+            if os.path.getsize(path) > 0:
+                return path
+        return None
@@ -2,17 +2,33 @@
 """
 Stock Screener Health Monitor
 Checks all system components and alerts on failures
+
+    python health_monitor.py            # one-shot report (exit code 1 if unhealthy)
+    python health_monitor.py --daemon   # keep checking; metrics on 127.0.0.1:HEALTH_METRICS_PORT
+
+In daemon mode every check runs on its own interval and timeout, and a
+bounded history of results is served as JSON at /metrics (Prometheus text
+at /metrics/prometheus): API latency percentiles, data freshness lag,
+scraper staleness and per-component uptime ratios.
 """
 
 import os
 import sys
 import json
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as CheckTimeout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 import requests
 import psycopg2
 from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import logging
 
+from log_tail import LogTail, ScraperLogSignals
+
 # Setup logging
 logging.basicConfig(
     level=logging.INFO,
@@ -24,6 +40,51 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 API_URL = os.getenv('API_URL', 'http://localhost:5000')
 DATABASE_URL = os.getenv('DATABASE_URL')
+# Health queries give up after this rather than wait on locks or a busy server
+DB_STATEMENT_TIMEOUT_MS = int(os.getenv('HEALTH_DB_TIMEOUT_MS', 2000))
+
+# Scraper log: an explicit file, or the newest .log in the directory
+SCRAPER_LOG = os.getenv('SCRAPER_LOG')
+SCRAPER_LOG_DIR = os.getenv('SCRAPER_LOG_DIR', 'selenium/logs')
+# Window for error rate / retry counts, and how long without a successful post is DEGRADED
+LOG_SIGNAL_WINDOW = int(os.getenv('SCRAPER_LOG_WINDOW', 900))
+SUCCESS_STALE_SECONDS = int(os.getenv('SCRAPER_SUCCESS_STALE', 600))
+
+# Daemon mode: check -> (method, interval seconds, timeout seconds)
+DAEMON_CHECKS = {
+    'api': ('check_api', int(os.getenv('HEALTH_API_INTERVAL', 15)), 10),
+    'database': ('check_database', int(os.getenv('HEALTH_DB_INTERVAL', 30)), 10),
+    'scraper': ('check_scraper_logs', int(os.getenv('HEALTH_SCRAPER_INTERVAL', 60)), 10),
+}
+# Results kept per check (720 API checks = 3 hours at 15 s)
+HISTORY_SIZE = int(os.getenv('HEALTH_HISTORY', 720))
+METRICS_HOST = os.getenv('HEALTH_METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('HEALTH_METRICS_PORT', 9108))
+# Component states that count as "up"
+UP_STATES = ('HEALTHY', 'RUNNING')
+
+# Every probe below is O(1) in the size of stocks: catalog estimates, the
+# backend's ingest_stats counters row, or one index lookup.
+ROW_ESTIMATE_SQL = """
+    SELECT COALESCE(SUM(GREATEST(c.reltuples, 0)), 0)::bigint
+    FROM pg_class c
+    WHERE (c.oid = 'stocks'::regclass AND c.relkind = 'r')
+       OR c.oid IN (SELECT inhrelid FROM pg_inherits WHERE inhparent = 'stocks'::regclass)
+"""
+
+COUNTERS_SQL = """
+    SELECT rows_ingested, batches_ingested, last_batch_rows, last_run_timestamp,
+           EXTRACT(EPOCH FROM (NOW() - last_ingest_at))
+    FROM ingest_stats
+    WHERE id = 1 AND last_ingest_at IS NOT NULL
+"""
+
+LATEST_ROW_SQL = """
+    SELECT run_timestamp, EXTRACT(EPOCH FROM (NOW() - created_at))
+    FROM stocks
+    ORDER BY created_at DESC
+    LIMIT 1
+"""
 
 class HealthMonitor:
     def __init__(self):
@@ -32,11 +93,16 @@ class HealthMonitor:
             'overall': 'UNKNOWN',
             'components': {}
         }
+        self._conn = None
+        self._session = requests.Session()   # keep-alive, so latency is the API's, not TCP setup
+        self._last_counters = None   # (monotonic time, rows_ingested) at the previous check
+        self._log_tails = {}         # log path -> LogTail
+        self._log_signals = {}       # log path -> ScraperLogSignals
     
     def check_api(self):
         """Check backend API health"""
         try:
-            response = requests.get(f"{API_URL}/health", timeout=5)
+            response = self._session.get(f"{API_URL}/health", timeout=5)
             if response.status_code == 200:
                 self.status['components']['api'] = {
                     'status': 'HEALTHY',
@@ -61,41 +127,67 @@ class HealthMonitor:
             logger.error(f"✗ API: {e}")
             return False
     
+    def _db(self):
+        """Persistent autocommit connection; health probes never queue behind a busy database"""
+        if self._conn is None or self._conn.closed:
+            self._conn = psycopg2.connect(
+                DATABASE_URL,
+                connect_timeout=5,
+                application_name='health_monitor',
+                options=f'-c statement_timeout={DB_STATEMENT_TIMEOUT_MS}'
+            )
+            self._conn.autocommit = True
+        return self._conn
+    
+    def close(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+    
     def check_database(self):
-        """Check database connectivity and recent data"""
+        """Check database connectivity and data freshness with constant-time probes"""
         try:
-            conn = psycopg2.connect(DATABASE_URL)
-            cursor = conn.cursor()
+            cursor = self._db().cursor()
             
-            # Check table exists
-            cursor.execute("""
-                SELECT COUNT(*) FROM information_schema.tables 
-                WHERE table_name = 'stocks'
-            """)
-            if cursor.fetchone()[0] == 0:
+            cursor.execute("SELECT to_regclass('stocks') IS NOT NULL, to_regclass('ingest_stats') IS NOT NULL")
+            has_stocks, has_counters = cursor.fetchone()
+            if not has_stocks:
                 raise Exception("Table 'stocks' not found")
             
-            # Count total records
-            cursor.execute("SELECT COUNT(*) FROM stocks")
-            total_records = cursor.fetchone()[0]
+            # Planner estimate from the catalog (as of the last ANALYZE), not a scan
+            cursor.execute(ROW_ESTIMATE_SQL)
+            estimated_records = cursor.fetchone()[0]
             
-            # Check latest data age
-            cursor.execute("""
-                SELECT EXTRACT(EPOCH FROM (NOW() - MAX(timestamp))) 
-                FROM stocks
-            """)
-            latest_age_seconds = cursor.fetchone()[0]
+            details = {}
+            if has_counters:
+                # Kept by the backend in the same transaction as every insert
+                cursor.execute(COUNTERS_SQL)
+                counters = cursor.fetchone()
+            else:
+                counters = None
             
-            # Count records in last hour
-            cursor.execute("""
-                SELECT COUNT(*) FROM stocks 
-                WHERE timestamp > NOW() - INTERVAL '1 hour'
-            """)
-            records_last_hour = cursor.fetchone()[0]
+            if counters:
+                rows_ingested, batches_ingested, last_batch_rows, latest_batch, latest_age_seconds = counters
+                details.update({
+                    'rows_ingested': rows_ingested,
+                    'batches_ingested': batches_ingested,
+                    'last_batch_rows': last_batch_rows,
+                })
+                now = time.monotonic()
+                if self._last_counters is not None:
+                    then, previous_rows = self._last_counters
+                    details['rows_per_minute'] = round((rows_ingested - previous_rows) * 60 / (now - then), 1)
+                self._last_counters = (now, rows_ingested)
+            else:
+                # Backend without ingest_stats: newest row via the created_at index
+                cursor.execute(LATEST_ROW_SQL)
+                row = cursor.fetchone()
+                latest_batch, latest_age_seconds = row if row else (None, None)
             
             cursor.close()
-            conn.close()
             
+            if latest_age_seconds is None:
+                raise Exception("No data ingested yet")
             latest_age_minutes = int(latest_age_seconds / 60)
             
             if latest_age_seconds < 120:  # Less than 2 minutes
@@ -107,14 +199,16 @@ class HealthMonitor:
             
             self.status['components']['database'] = {
                 'status': status,
-                'total_records': total_records,
-                'records_last_hour': records_last_hour,
+                'estimated_records': estimated_records,
+                **details,
+                'latest_batch': latest_batch.isoformat() if latest_batch else None,
                 'latest_data_age_minutes': latest_age_minutes,
+                'latest_data_age_seconds': round(float(latest_age_seconds), 1),
                 'message': f'Last data: {latest_age_minutes} minutes ago'
             }
             
             if status == 'HEALTHY':
-                logger.info(f"✓ Database: HEALTHY ({total_records} records, latest {latest_age_minutes}m ago)")
+                logger.info(f"✓ Database: HEALTHY (~{estimated_records} records, latest {latest_age_minutes}m ago)")
             elif status == 'DEGRADED':
                 logger.warning(f"⚠ Database: DEGRADED (latest {latest_age_minutes}m ago)")
             else:
@@ -123,6 +217,9 @@ class HealthMonitor:
             return status == 'HEALTHY'
             
         except Exception as e:
+            if isinstance(e, psycopg2.Error):
+                # Reconnect on the next check
+                self.close()
             self.status['components']['database'] = {
                 'status': 'FAILED',
                 'message': str(e)
@@ -130,42 +227,49 @@ class HealthMonitor:
             logger.error(f"✗ Database: {e}")
             return False
     
+    def _scraper_log_path(self):
+        """SCRAPER_LOG if set, else the newest .log in SCRAPER_LOG_DIR; None if there is none"""
+        if SCRAPER_LOG:
+            return SCRAPER_LOG if os.path.exists(SCRAPER_LOG) else None
+        if not os.path.isdir(SCRAPER_LOG_DIR):
+            return None
+        with os.scandir(SCRAPER_LOG_DIR) as entries:
+            logs = [entry for entry in entries if entry.name.endswith('.log') and entry.is_file()]
+        if not logs:
+            return None
+        return max(logs, key=lambda entry: entry.stat().st_mtime).path
+    
     def check_scraper_logs(self):
-        """Check if scraper is running (via log file recency)"""
+        """Check if scraper is running and succeeding, reading only new log lines"""
         try:
-            log_dir = 'selenium/logs'
-            if not os.path.exists(log_dir):
+            log_path = self._scraper_log_path()
+            if log_path is None:
                 self.status['components']['scraper'] = {
                     'status': 'UNKNOWN',
-                    'message': 'Log directory not found'
+                    'message': f'No scraper log found (SCRAPER_LOG / {SCRAPER_LOG_DIR})'
                 }
-                logger.warning("⚠ Scraper: No logs directory")
+                logger.warning("⚠ Scraper: No log file")
                 return None
             
-            # Get latest log file
-            log_files = [f for f in os.listdir(log_dir) if f.endswith('.log')]
-            if not log_files:
-                self.status['components']['scraper'] = {
-                    'status': 'IDLE',
-                    'message': 'No log files found'
-                }
-                logger.warning("⚠ Scraper: No log files")
-                return None
-            
-            latest_log = max(log_files, key=lambda f: os.path.getmtime(os.path.join(log_dir, f)))
-            log_path = os.path.join(log_dir, latest_log)
+            # Offsets and signals carry over between checks (daemon mode)
+            tail = self._log_tails.get(log_path)
+            if tail is None:
+                tail = self._log_tails[log_path] = LogTail(log_path)
+                self._log_signals[log_path] = ScraperLogSignals(window=LOG_SIGNAL_WINDOW)
+            signals = self._log_signals[log_path]
+            signals.feed(tail.read_new())
+            summary = signals.summary()
             
             # Check log age
-            log_age_seconds = (datetime.now() - datetime.fromtimestamp(os.path.getmtime(log_path))).total_seconds()
+            log_age_seconds = time.time() - os.path.getmtime(log_path)
             log_age_minutes = int(log_age_seconds / 60)
             
-            # Read last few lines
-            with open(log_path, 'r') as f:
-                lines = f.readlines()
-                recent_lines = lines[-5:] if lines else []
-            
             if log_age_seconds < 300:  # Less than 5 minutes
                 status = 'RUNNING'
+                since_success = summary['seconds_since_success']
+                if since_success is None or since_success > SUCCESS_STALE_SECONDS:
+                    # Alive but nothing has reached the API lately
+                    status = 'DEGRADED'
             elif log_age_seconds < 3600:  # Less than 1 hour
                 status = 'IDLE'
             else:
@@ -173,13 +277,18 @@ class HealthMonitor:
             
             self.status['components']['scraper'] = {
                 'status': status,
-                'latest_log': latest_log,
+                'latest_log': os.path.basename(log_path),
                 'log_age_minutes': log_age_minutes,
-                'recent_activity': recent_lines[-1].strip() if recent_lines else 'N/A'
+                'log_age_seconds': round(log_age_seconds, 1),
+                **summary,
+                'recent_activity': tail.recent[-1].strip() if tail.recent else 'N/A'
             }
             
             if status == 'RUNNING':
-                logger.info(f"✓ Scraper: RUNNING (updated {log_age_minutes}m ago)")
+                logger.info(f"✓ Scraper: RUNNING (updated {log_age_minutes}m ago, error rate {summary['error_rate']:.0%})")
+            elif status == 'DEGRADED':
+                logger.warning(f"⚠ Scraper: DEGRADED (no successful post in {SUCCESS_STALE_SECONDS // 60}m, "
+                               f"{summary['retries']} retries, {summary['errors']} errors)")
             elif status == 'IDLE':
                 logger.warning(f"⚠ Scraper: IDLE (not updated for {log_age_minutes}m)")
             else:
@@ -250,9 +359,167 @@ class HealthMonitor:
         """Return status as JSON"""
         return json.dumps(self.status, indent=2)
 
+def percentile(values, pct):
+    """Nearest-rank percentile of a non-empty list"""
+    ordered = sorted(values)
+    return ordered[max(1, math.ceil(pct / 100 * len(ordered))) - 1]
+
+
+class HealthDaemon:
+    """Runs HealthMonitor checks concurrently, each on its own interval, and keeps their history"""
+    
+    def __init__(self, monitor, checks=DAEMON_CHECKS, history_size=HISTORY_SIZE):
+        self.monitor = monitor
+        self.checks = checks
+        self.history = {name: deque(maxlen=history_size) for name in checks}
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        # A hung check holds its worker; each check has one so others keep running
+        self._executor = ThreadPoolExecutor(max_workers=len(checks), thread_name_prefix='health-check')
+    
+    def start(self):
+        for name in self.checks:
+            threading.Thread(target=self._loop, args=(name,), name=f'health-{name}', daemon=True).start()
+    
+    def stop(self):
+        self._stop.set()
+        self._executor.shutdown(wait=False)
+    
+    def _loop(self, name):
+        method, interval, timeout = self.checks[name]
+        check = getattr(self.monitor, method)
+        running = None
+        while not self._stop.is_set():
+            started = time.monotonic()
+            if running is not None and not running.done():
+                # Never stack a second run behind one that is still stuck
+                entry = {'status': 'TIMEOUT', 'message': 'Previous check still running'}
+            else:
+                running = self._executor.submit(check)
+                try:
+                    running.result(timeout=timeout)
+                    entry = dict(self.monitor.status['components'].get(name, {}))
+                except CheckTimeout:
+                    entry = {'status': 'TIMEOUT', 'message': f'No result within {timeout}s'}
+                    logger.error(f"✗ {name.capitalize()}: check timed out after {timeout}s")
+                except Exception as e:
+                    entry = {'status': 'ERROR', 'message': str(e)}
+            entry['time'] = time.time()
+            entry['check_ms'] = round((time.monotonic() - started) * 1000, 1)
+            with self._lock:
+                self.history[name].append(entry)
+            self._stop.wait(max(0, interval - (time.monotonic() - started)))
+    
+    def metrics(self):
+        """Summary of the recorded history"""
+        with self._lock:
+            history = {name: list(entries) for name, entries in self.history.items()}
+        
+        checks = {}
+        for name, entries in history.items():
+            last = entries[-1] if entries else {}
+            up = sum(1 for e in entries if e.get('status') in UP_STATES)
+            durations = [e['check_ms'] for e in entries]
+            checks[name] = {
+                'status': last.get('status', 'UNKNOWN'),
+                'last_run': datetime.fromtimestamp(last['time']).isoformat() if last else None,
+                'samples': len(entries),
+                'uptime_ratio': round(up / len(entries), 4) if entries else None,
+                'check_ms_p50': percentile(durations, 50) if durations else None,
+                'check_ms_p95': percentile(durations, 95) if durations else None,
+            }
+        
+        latencies = [e['response_time_ms'] for e in history['api'] if 'response_time_ms' in e] if 'api' in history else []
+        database = history.get('database') or [{}]
+        scraper = history.get('scraper') or [{}]
+        return {
+            'generated_at': datetime.now().isoformat(),
+            'daemon_uptime_seconds': round(time.time() - self.started, 1),
+            'overall': self._overall(checks),
+            'api_latency_ms': {
+                'p50': round(percentile(latencies, 50), 1) if latencies else None,
+                'p95': round(percentile(latencies, 95), 1) if latencies else None,
+                'samples': len(latencies),
+            },
+            'data_freshness_lag_seconds': database[-1].get('latest_data_age_seconds'),
+            'scraper_staleness_seconds': scraper[-1].get('log_age_seconds'),
+            'checks': checks,
+        }
+    
+    def _overall(self, checks):
+        statuses = [check['status'] for check in checks.values()]
+        if all(s in UP_STATES for s in statuses):
+            return 'HEALTHY'
+        if any(s in ('FAILED', 'TIMEOUT', 'ERROR') for s in statuses):
+            return 'FAILED'
+        if any(s == 'STALE' for s in statuses):
+            return 'WARNING'
+        return 'DEGRADED'
+    
+    def prometheus(self):
+        """The metrics in Prometheus text exposition format"""
+        m = self.metrics()
+        lines = [f"trc_health_up {1 if m['overall'] == 'HEALTHY' else 0}"]
+        for quantile in ('p50', 'p95'):
+            if m['api_latency_ms'][quantile] is not None:
+                q = int(quantile[1:]) / 100
+                lines.append(f'trc_api_latency_ms{{quantile="{q}"}} {m["api_latency_ms"][quantile]}')
+        if m['data_freshness_lag_seconds'] is not None:
+            lines.append(f"trc_data_freshness_lag_seconds {m['data_freshness_lag_seconds']}")
+        if m['scraper_staleness_seconds'] is not None:
+            lines.append(f"trc_scraper_staleness_seconds {m['scraper_staleness_seconds']}")
+        for name, check in m['checks'].items():
+            if check['uptime_ratio'] is not None:
+                lines.append(f'trc_check_uptime_ratio{{check="{name}"}} {check["uptime_ratio"]}')
+            lines.append(f'trc_check_up{{check="{name}"}} {1 if check["status"] in UP_STATES else 0}')
+        return "\n".join(lines) + "\n"
+
+
+def serve_metrics(daemon, host=METRICS_HOST, port=METRICS_PORT):
+    """Serve /metrics (JSON) and /metrics/prometheus; blocks until interrupted"""
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path == '/metrics':
+                body, content_type = json.dumps(daemon.metrics(), indent=2).encode(), 'application/json'
+            elif self.path == '/metrics/prometheus':
+                body, content_type = daemon.prometheus().encode(), 'text/plain; version=0.0.4'
+            else:
+                self.send_error(404)
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        
+        def log_message(self, format, *args):
+            pass
+    
+    server = ThreadingHTTPServer((host, port), Handler)
+    logger.info(f"✓ Health metrics on http://{host}:{port}/metrics")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
 if __name__ == '__main__':
     monitor = HealthMonitor()
+    if '--daemon' in sys.argv:
+        daemon = HealthDaemon(monitor)
+        daemon.start()
+        try:
+            serve_metrics(daemon)
+        except KeyboardInterrupt:
+            logger.info("⛔ Stopped by user (Ctrl+C)")
+        finally:
+            daemon.stop()
+            monitor.close()
+        sys.exit(0)
+    
     success = monitor.run()
+    monitor.close()
     
     # Optional: Output JSON if requested
     if '--json' in sys.argv:
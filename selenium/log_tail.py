@@ -0,0 +1,129 @@
+"""
+Incremental log reading for the health monitor.
+
+`LogTail` remembers where it stopped in a log file and reads only what was
+appended since. The first read (and the first read after the file is
+rotated or truncated) starts START_BYTES from the end, so a check never
+costs more than the new lines, however big the log has grown.
+
+`ScraperLogSignals` turns scraper log lines (`%(asctime)s - %(levelname)s -
+%(message)s`) into health signals over a sliding window: the last
+successful API post, retries and the error rate.
+"""
+
+import os
+from collections import deque
+from datetime import datetime, timedelta
+
+# Where a first look starts, counted back from the end of the file
+START_BYTES = 64 * 1024
+# More than this appended between checks is skipped down to the last START_BYTES
+MAX_READ_BYTES = 4 * 1024 * 1024
+
+# Message fragments logged by scraper.py / outbox.py / cloud_scraper_playwright.py
+SUCCESS_MARKERS = ('✓ API accepted', '✓ API Success', 'rows sent for')
+RETRY_MARKERS = ('Retrying in', 'retrying in')
+ERROR_LEVELS = ('ERROR', 'CRITICAL')
+
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class LogTail:
+    """Follows one log file from a remembered byte offset"""
+
+    def __init__(self, path, keep_lines=5, start_bytes=START_BYTES):
+        self.path = path
+        self.start_bytes = start_bytes
+        self.recent = deque(maxlen=keep_lines)  # last lines seen
+        self._offset = None
+        self._inode = None
+        self._partial = b''     # unterminated last line, completed by the next read
+
+    def read_new(self):
+        """Complete lines appended since the previous call"""
+        stat = os.stat(self.path)
+        skip_first = False
+        if (self._offset is None or stat.st_ino != self._inode or stat.st_size < self._offset
+                or stat.st_size - self._offset > MAX_READ_BYTES):
+            # First look, rotation, truncation or a huge gap: start near the end
+            start = max(0, stat.st_size - self.start_bytes)
+            skip_first = start > 0      # most likely starts mid-line
+            self._inode = stat.st_ino
+            self._partial = b''
+        else:
+            start = self._offset
+
+        if stat.st_size <= start:
+            self._offset = start
+            return []
+        with open(self.path, 'rb') as f:
+            f.seek(start)
+            data = f.read(stat.st_size - start)
+        self._offset = start + len(data)
+
+        lines = (self._partial + data).split(b'\n')
+        self._partial = lines.pop()
+        if skip_first and lines:
+            lines = lines[1:]
+        decoded = [line.decode('utf-8', 'replace').rstrip('\r') for line in lines]
+        self.recent.extend(decoded)
+        return decoded
+
+
+def parse_line(line):
+    """(timestamp, level, message) for a formatted log line, or None for continuation lines"""
+    parts = line.split(' - ', 2)
+    if len(parts) < 3:
+        return None
+    try:
+        timestamp = datetime.strptime(parts[0][:19], TIMESTAMP_FORMAT)
+    except ValueError:
+        return None
+    return timestamp, parts[1].strip(), parts[2]
+
+
+class ScraperLogSignals:
+    """Success, retry and error signals from scraper log lines over the last `window` seconds"""
+
+    def __init__(self, window=900):
+        self.window = timedelta(seconds=window)
+        self.events = deque()       # (timestamp, is_error, is_retry) per line in the window
+        self.last_line_at = None
+        self.last_success_at = None
+        self.last_error = None
+
+    def feed(self, lines):
+        for line in lines:
+            parsed = parse_line(line)
+            if parsed is None:
+                continue
+            timestamp, level, message = parsed
+            is_error = level in ERROR_LEVELS
+            is_retry = any(marker in message for marker in RETRY_MARKERS)
+            if any(marker in message for marker in SUCCESS_MARKERS):
+                self.last_success_at = timestamp
+            if is_error:
+                self.last_error = message.strip()
+            self.last_line_at = timestamp
+            self.events.append((timestamp, is_error, is_retry))
+
+    def summary(self, now=None):
+        now = now or datetime.now()
+        cutoff = now - self.window
+        while self.events and self.events[0][0] < cutoff:
+            self.events.popleft()
+
+        lines = len(self.events)
+        errors = sum(1 for _, is_error, _ in self.events if is_error)
+        retries = sum(1 for _, _, is_retry in self.events if is_retry)
+        return {
+            'window_minutes': int(self.window.total_seconds() // 60),
+            'lines': lines,
+            'errors': errors,
+            'retries': retries,
+            'error_rate': round(errors / lines, 3) if lines else 0.0,
+            'last_success_at': self.last_success_at.isoformat() if self.last_success_at else None,
+            'seconds_since_success': (round((now - self.last_success_at).total_seconds(), 1)
+                                      if self.last_success_at else None),
+            'last_error': self.last_error,
+        }
@@ -0,0 +1,149 @@
+"""
+Market calendar and minute-aligned tick scheduler for the scraper.
+
+Ticks fall on wall-clock minute boundaries in the exchange timezone
+(09:15:00, 09:16:00, ... IST), computed from the clock rather than by
+sleeping a fixed amount after each scrape, so scrape and refresh time
+never accumulate as drift. Session hours are worked out per day, so the
+window rolls over at midnight, and outside them the scheduler sleeps
+straight through to the next trading day's open, skipping weekends and
+listed holidays.
+"""
+
+import logging
+import os
+import time
+from datetime import date, datetime, time as dt_time, timedelta
+from zoneinfo import ZoneInfo
+
+logger = logging.getLogger(__name__)
+
+EXCHANGE_TZ = ZoneInfo(os.getenv('EXCHANGE_TZ', 'Asia/Kolkata'))
+SESSION_OPEN = dt_time(9, 15)
+SESSION_CLOSE = dt_time(15, 30)
+
+HOLIDAYS_FILE = os.getenv(
+    'MARKET_HOLIDAYS_FILE',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'market_holidays.txt')
+)
+
+# Longest single sleep; long waits are re-checked against the clock in
+# case the machine was suspended or its clock was adjusted
+MAX_SLEEP_CHUNK = 900
+
+
+class MarketCalendar:
+    """Trading days (weekdays minus holidays) and their session hours"""
+
+    def __init__(self, holidays=(), annual_holidays=(), tz=EXCHANGE_TZ,
+                 open_time=SESSION_OPEN, close_time=SESSION_CLOSE):
+        self.holidays = set(holidays)                  # specific dates
+        self.annual_holidays = set(annual_holidays)    # (month, day) every year
+        self.tz = tz
+        self.open_time = open_time
+        self.close_time = close_time
+
+    @classmethod
+    def from_file(cls, path=HOLIDAYS_FILE, **kwargs):
+        """Load holidays from a file of `YYYY-MM-DD` or `MM-DD` (every year) lines; # starts a comment"""
+        holidays, annual = set(), set()
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    entry = line.split('#', 1)[0].strip()
+                    if not entry:
+                        continue
+                    parts = entry.split('-')
+                    if len(parts) == 3:
+                        holidays.add(date(*map(int, parts)))
+                    elif len(parts) == 2:
+                        annual.add(tuple(map(int, parts)))
+                    else:
+                        raise ValueError(f"Bad holiday entry in {path}: {line.strip()}")
+        else:
+            logger.warning(f"⚠ No holiday file at {path}; treating every weekday as a trading day")
+        return cls(holidays, annual, **kwargs)
+
+    def is_trading_day(self, day):
+        return (day.weekday() < 5 and day not in self.holidays
+                and (day.month, day.day) not in self.annual_holidays)
+
+    def session(self, day):
+        """(open, close) as aware datetimes, or None if the market is shut that day"""
+        if not self.is_trading_day(day):
+            return None
+        return (datetime.combine(day, self.open_time, self.tz),
+                datetime.combine(day, self.close_time, self.tz))
+
+    def next_session(self, after):
+        """The first session whose close is at or after `after`"""
+        day = after.astimezone(self.tz).date()
+        for _ in range(366):
+            session = self.session(day)
+            if session and session[1] >= after:
+                return session
+            day += timedelta(days=1)
+        raise RuntimeError("No trading session within a year; check the holiday file")
+
+
+class MinuteScheduler:
+    """Yields tick times aligned to `interval` seconds within market sessions.
+
+    A tick reached less than `grace` seconds late still fires. After slow
+    work, ticks that have passed by more than that are either dropped
+    (default) or, with catch_up=True, yielded back to back, oldest first.
+    """
+
+    def __init__(self, calendar, interval=60, catch_up=False, grace=5, now=None, sleep=time.sleep):
+        self.calendar = calendar
+        self.interval = timedelta(seconds=interval)
+        self.catch_up = catch_up
+        self.grace = timedelta(seconds=grace)
+        self._now = now or (lambda: datetime.now(calendar.tz))
+        self._sleep = sleep
+        self.skipped = 0
+
+    def next_tick(self, after):
+        """First aligned tick at or after `after` that falls within a session"""
+        open_at, close_at = self.calendar.next_session(after)
+        if after <= open_at:
+            return open_at
+        # Align on the session open so ticks stay on minute boundaries
+        steps = -(-(after - open_at) // self.interval)
+        tick = open_at + steps * self.interval
+        if tick > close_at:
+            return self.next_tick(close_at + timedelta(microseconds=1))
+        return tick
+
+    def sleep_until(self, target):
+        while True:
+            remaining = (target - self._now()).total_seconds()
+            if remaining <= 0:
+                return
+            self._sleep(min(remaining, MAX_SLEEP_CHUNK))
+
+    def ticks(self):
+        tick = self.next_tick(self._now())
+        while True:
+            now = self._now()
+            if tick > now:
+                if tick - now > self.interval:
+                    logger.info(f"Market closed. Sleeping until {tick:%a %Y-%m-%d %H:%M %Z}")
+                self.sleep_until(tick)
+            elif now - tick > self.grace and not self.catch_up:
+                # Work overran one or more ticks; resume at the next boundary
+                upcoming = self.next_tick(now)
+                missed = self._count_between(tick, upcoming)
+                self.skipped += missed
+                logger.warning(f"⚠ Skipped {missed} missed tick(s) from {tick:%H:%M}; next at {upcoming:%H:%M}")
+                tick = upcoming
+                continue
+            yield tick
+            tick = self.next_tick(tick + timedelta(microseconds=1))
+
+    def _count_between(self, first, upcoming):
+        count, tick = 0, first
+        while tick < upcoming:
+            count += 1
+            tick = self.next_tick(tick + timedelta(microseconds=1))
+        return count
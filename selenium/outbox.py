@@ -0,0 +1,262 @@
+"""
+Durable outbox between the scraper and the API.
+
+Every batch is appended to a local log file and fsync'd before anything is
+sent, so a failed POST (or a crash) no longer loses that minute. A
+background sender drains the log over one keep-alive `requests.Session`,
+backing off exponentially while the API is unreachable. After an outage
+the backlog goes out as merged requests of up to MAX_MERGE batches, each
+keeping its own run_timestamp, via the API's `{"batches": [...]}` body;
+batch ids make resends after a lost response harmless.
+
+The log is JSON lines: `{"op": "put", ...}` for each batch and
+`{"op": "ack", "ids": [...]}` once the API has it. Replaying the file on
+start gives the pending set; a torn last line from a crash is cut off before
+appending resumes. The file is rewritten with just the pending batches once
+enough acks pile up.
+"""
+
+import json
+import logging
+import math
+import os
+import random
+import threading
+import uuid
+from collections import OrderedDict
+
+import requests
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+# Batches per merged request, and a cap on their combined rows
+MAX_MERGE = int(os.getenv('OUTBOX_MAX_MERGE', 30))
+MAX_MERGE_ROWS = int(os.getenv('OUTBOX_MAX_MERGE_ROWS', 20000))
+# Backoff between failed sends, in seconds
+BACKOFF_START = 1
+BACKOFF_MAX = 60
+# Rewrite the log after this many acked batches
+COMPACT_AFTER = 500
+
+
+def _clean(value):
+    # pandas gives NaN for empty CSV cells; it is not valid JSON
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return value
+
+
+class Outbox:
+    """Append-only, fsync'd batch log with a background sender"""
+
+    def __init__(self, path, api_url, timeout=15):
+        self.path = path
+        self.api_url = api_url
+        self.timeout = timeout
+        self.rejected_path = path + '.rejected'
+        self._pending = OrderedDict()   # batch id -> put record, oldest first
+        self._cond = threading.Condition()
+        self._acked_since_compact = 0
+        self._sender = None
+        self._stop = threading.Event()
+        self.stats = {'queued': 0, 'sent': 0, 'requests': 0, 'failures': 0, 'rejected': 0}
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._load()
+        self._file = open(path, 'a', encoding='utf-8')
+        self._sync_dir()
+
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        if self._pending:
+            logger.info(f"Outbox has {len(self._pending)} unsent batches from a previous run")
+
+    # ---------- producer ----------
+
+    def put(self, run_timestamp, rows):
+        """Durably record a batch; returns its id once it is on disk"""
+        record = {
+            'op': 'put',
+            'batch_id': uuid.uuid4().hex,
+            'run_timestamp': run_timestamp.isoformat(),
+            'rows': [{key: _clean(value) for key, value in row.items()} for row in rows],
+        }
+        with self._cond:
+            self._append(record)
+            self._pending[record['batch_id']] = record
+            self.stats['queued'] += 1
+            self._cond.notify()
+        return record['batch_id']
+
+    @property
+    def pending(self):
+        with self._cond:
+            return len(self._pending)
+
+    # ---------- sender ----------
+
+    def start(self):
+        if self._sender is None or not self._sender.is_alive():
+            self._sender = threading.Thread(target=self._run, name='outbox-sender', daemon=True)
+            self._sender.start()
+
+    def close(self):
+        """Stop the sender (letting an in-flight request finish) and close the log"""
+        with self._cond:
+            self._stop.set()
+            self._cond.notify_all()
+        if self._sender is not None:
+            self._sender.join(self.timeout + 5)
+        with self._cond:
+            self._file.close()
+        self.session.close()
+
+    def _run(self):
+        backoff = BACKOFF_START
+        while not self._stop.is_set():
+            with self._cond:
+                while not self._pending and not self._stop.is_set():
+                    self._cond.wait()
+                if self._stop.is_set():
+                    return
+                group = self._next_group()
+
+            ok, retry_after = self._deliver(group)
+            if ok:
+                backoff = BACKOFF_START
+                continue
+            delay = retry_after or backoff * random.uniform(0.8, 1.2)
+            logger.warning(f"⚠ Outbox: {self.pending} batches waiting; retrying in {delay:.0f}s")
+            self._stop.wait(delay)
+            backoff = min(backoff * 2, BACKOFF_MAX)
+
+    def _next_group(self):
+        group, rows = [], 0
+        for record in self._pending.values():
+            if group and (len(group) >= MAX_MERGE or rows + len(record['rows']) > MAX_MERGE_ROWS):
+                break
+            group.append(record)
+            rows += len(record['rows'])
+        return group
+
+    def _deliver(self, group):
+        """Send a group; returns (done, retry_after). Rejected batches are isolated and set aside."""
+        status, retry_after = self._post(group)
+        if status in (200, 202):
+            self._ack([record['batch_id'] for record in group])
+            self.stats['sent'] += len(group)
+            logger.info(f"✓ API accepted {len(group)} batch(es), {sum(len(r['rows']) for r in group)} rows")
+            return True, None
+        if status in (400, 413, 422):
+            if len(group) > 1:
+                # Bisect to isolate the bad batch(es); the rest still go out merged
+                middle = len(group) // 2
+                for half in (group[:middle], group[middle:]):
+                    done, retry_after = self._deliver(half)
+                    if not done:
+                        return False, retry_after
+                return True, None
+            self._reject(group[0], status)
+            return True, None
+        self.stats['failures'] += 1
+        return False, retry_after
+
+    def _post(self, group):
+        body = {'batches': [
+            {'batch_id': r['batch_id'], 'run_timestamp': r['run_timestamp'], 'rows': r['rows']}
+            for r in group
+        ]}
+        self.stats['requests'] += 1
+        try:
+            response = self.session.post(self.api_url, json=body, timeout=self.timeout)
+        except requests.RequestException as e:
+            logger.error(f"✗ API Connection Error: {e}")
+            return None, None
+        if response.status_code not in (200, 202):
+            logger.error(f"✗ API Error (Status {response.status_code}): {response.text[:200]}")
+        retry_after = response.headers.get('Retry-After')
+        return response.status_code, float(retry_after) if retry_after and retry_after.isdigit() else None
+
+    def _reject(self, record, status):
+        # Set aside (not lost) so one malformed batch can't block the queue
+        with open(self.rejected_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record) + '\n')
+        self._ack([record['batch_id']])
+        self.stats['rejected'] += 1
+        logger.error(f"✗ Batch {record['batch_id']} rejected with status {status}; moved to {self.rejected_path}")
+
+    # ---------- log file ----------
+
+    def _append(self, *records):
+        self._file.write(''.join(json.dumps(record) + '\n' for record in records))
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _ack(self, batch_ids):
+        with self._cond:
+            if self._file.closed:
+                # close() gave up waiting; the batches are resent (and deduplicated) next run
+                return
+            self._append({'op': 'ack', 'ids': batch_ids})
+            for batch_id in batch_ids:
+                self._pending.pop(batch_id, None)
+            self._acked_since_compact += len(batch_ids)
+            if self._acked_since_compact >= COMPACT_AFTER or not self._pending:
+                self._compact()
+
+    def _compact(self):
+        """Rewrite the log with only the pending batches (caller holds the lock)"""
+        if not self._acked_since_compact:
+            return
+        temp_path = self.path + '.tmp'
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            f.write(''.join(json.dumps(record) + '\n' for record in self._pending.values()))
+            f.flush()
+            os.fsync(f.fileno())
+        self._file.close()
+        os.replace(temp_path, self.path)
+        self._sync_dir()
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._acked_since_compact = 0
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'rb') as f:
+            data = f.read()
+
+        end = data.rfind(b'\n') + 1
+        if end < len(data):
+            # Torn write from a crash. Cut it off, or the next append would be
+            # glued onto the fragment and lost on the following restart too.
+            with open(self.path, 'r+b') as f:
+                f.truncate(end)
+                f.flush()
+                os.fsync(f.fileno())
+            logger.warning(f"⚠ Outbox: dropped a torn {len(data) - end}-byte record at the end of {self.path}")
+
+        for line in data[:end].decode('utf-8', 'replace').splitlines():
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue
+            if record.get('op') == 'put':
+                self._pending[record['batch_id']] = record
+            elif record.get('op') == 'ack':
+                for batch_id in record['ids']:
+                    self._pending.pop(batch_id, None)
+
+    def _sync_dir(self):
+        # Make the file's creation/rename durable too (not possible on Windows)
+        try:
+            fd = os.open(os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(fd)
+        except OSError:
+            pass
+        finally:
+            os.close(fd)
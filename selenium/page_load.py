@@ -0,0 +1,171 @@
+"""
+Lean page loads for the browser scrapers.
+
+Screener pages pull in images, fonts, ads and analytics the scrapers never
+look at. This module blocks them, for Selenium through Chrome's DevTools
+protocol (Network.setBlockedURLs, plus the image content setting) and for
+Playwright through request routing. Loads return at DOMContentLoaded and
+then wait for the results table to have rows (the data-ready condition),
+not for every subresource to finish.
+
+`LoadTimer` reports each load's time to data, and the requests and bytes
+the page fetched, from the browser's Performance API. Cross-origin
+responses without Timing-Allow-Origin count as 0 bytes, so byte totals
+are a lower bound.
+
+    BLOCK_RESOURCES=0                      # turn blocking off
+    BLOCKED_RESOURCE_TYPES=image,media,font
+    BLOCKED_DOMAINS=doubleclick.net,...    # replaces the default list
+"""
+
+import logging
+import os
+import time
+from urllib.parse import urlsplit
+
+logger = logging.getLogger(__name__)
+
+
+def _env_list(name, default):
+    value = os.getenv(name)
+    if value is None:
+        return list(default)
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+BLOCK_RESOURCES = os.getenv('BLOCK_RESOURCES', '1') == '1'
+
+# Playwright resource types (request.resource_type)
+BLOCKED_RESOURCE_TYPES = set(_env_list('BLOCKED_RESOURCE_TYPES', ['image', 'media', 'font']))
+
+BLOCKED_DOMAINS = _env_list('BLOCKED_DOMAINS', [
+    'google-analytics.com',
+    'googletagmanager.com',
+    'googlesyndication.com',
+    'googleadservices.com',
+    'doubleclick.net',
+    'adservice.google.com',
+    'amazon-adsystem.com',
+    'facebook.net',
+    'hotjar.com',
+    'clarity.ms',
+    'taboola.com',
+    'outbrain.com',
+    'onesignal.com',
+])
+
+# Chrome's URL blocking has no resource types, so types map to extensions
+TYPE_URL_PATTERNS = {
+    'image': ['*.png*', '*.jpg*', '*.jpeg*', '*.gif*', '*.webp*', '*.svg*', '*.ico*'],
+    'font': ['*.woff*', '*.woff2*', '*.ttf*', '*.otf*', '*.eot*'],
+    'media': ['*.mp4*', '*.webm*', '*.mp3*', '*.m3u8*'],
+    'stylesheet': ['*.css*'],
+}
+
+# Results table has at least one data row
+DATA_READY_XPATH = os.getenv('DATA_READY_XPATH', '//table//tbody/tr[td]')
+DATA_READY_SELECTOR = os.getenv('DATA_READY_SELECTOR', 'table tbody tr')
+
+# Requests and bytes fetched by the current document
+LOAD_STATS_JS = """(() => {
+    const nav = performance.getEntriesByType('navigation')[0];
+    const resources = performance.getEntriesByType('resource');
+    let bytes = nav ? nav.transferSize : 0;
+    for (const r of resources) bytes += r.transferSize;
+    return {requests: resources.length + (nav ? 1 : 0), bytes: bytes};
+})()"""
+
+
+def is_blocked_host(host):
+    host = (host or '').lower()
+    return any(host == domain or host.endswith('.' + domain) for domain in BLOCKED_DOMAINS)
+
+
+def blocked_url_patterns():
+    patterns = [f'*{domain}/*' for domain in BLOCKED_DOMAINS]
+    for resource_type in sorted(BLOCKED_RESOURCE_TYPES):
+        patterns.extend(TYPE_URL_PATTERNS.get(resource_type, []))
+    return patterns
+
+
+# ---------- Selenium (Chrome) ----------
+
+def configure_chrome_options(options):
+    """Return from get()/refresh() at DOMContentLoaded and skip image decoding"""
+    options.page_load_strategy = 'eager'
+    if BLOCK_RESOURCES and 'image' in BLOCKED_RESOURCE_TYPES:
+        prefs = options.experimental_options.setdefault('prefs', {})
+        prefs['profile.managed_default_content_settings.images'] = 2
+    return options
+
+
+def block_in_chrome(driver):
+    """Install URL blocking on a running Chrome driver (before the first get())"""
+    if not BLOCK_RESOURCES:
+        return
+    patterns = blocked_url_patterns()
+    driver.execute_cdp_cmd('Network.enable', {})
+    driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+    logger.info(f"✓ Blocking {len(patterns)} URL patterns ({', '.join(sorted(BLOCKED_RESOURCE_TYPES))} + ad/analytics domains)")
+
+
+def wait_for_data(driver, timeout=15):
+    # Imported here so the Playwright service can use this module without selenium
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.support import expected_conditions as EC
+    from selenium.webdriver.support.ui import WebDriverWait
+
+    WebDriverWait(driver, timeout).until(
+        EC.presence_of_element_located((By.XPATH, DATA_READY_XPATH))
+    )
+
+
+# ---------- Playwright ----------
+
+async def block_in_playwright(context, counter=None):
+    """Abort blocked requests for every page of `context`; counts them in counter['blocked']"""
+    if not BLOCK_RESOURCES:
+        return
+
+    async def handle(route):
+        request = route.request
+        if (request.resource_type in BLOCKED_RESOURCE_TYPES
+                or is_blocked_host(urlsplit(request.url).hostname)):
+            if counter is not None:
+                counter['blocked'] = counter.get('blocked', 0) + 1
+            await route.abort()
+        else:
+            await route.continue_()
+
+    await context.route('**/*', handle)
+
+
+# ---------- stats ----------
+
+class LoadTimer:
+    """Times one page load to data-ready and logs what it fetched"""
+
+    def __init__(self, label='Page load'):
+        self.label = label
+        self.started = time.perf_counter()
+        self.stats = None
+
+    def finish(self, stats, blocked=None):
+        """`stats` is the LOAD_STATS_JS result; returns (and logs) the load's numbers"""
+        self.stats = {
+            'ready_ms': round((time.perf_counter() - self.started) * 1000, 1),
+            'requests': int(stats.get('requests') or 0),
+            'bytes': int(stats.get('bytes') or 0),
+        }
+        if blocked is not None:
+            self.stats['blocked'] = blocked
+        extra = f", {blocked} blocked" if blocked is not None else ""
+        logger.info(
+            f"📄 {self.label}: data ready in {self.stats['ready_ms']:.0f} ms, "
+            f"{self.stats['bytes'] / 1024:.0f} KB over {self.stats['requests']} requests{extra}"
+        )
+        return self.stats
+
+
+def chrome_load_stats(driver):
+    return driver.execute_script('return ' + LOAD_STATS_JS)
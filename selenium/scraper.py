@@ -2,14 +2,19 @@ from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
-import pandas as pd
-import requests
+from selenium.common.exceptions import TimeoutException
 import time
 import os
 from datetime import datetime
 import logging
 import sys
 
+from chartink_http import AcquisitionError, ChartinkClient, write_csv
+from download_watcher import DownloadWatcher
+from market_schedule import MarketCalendar, MinuteScheduler
+from outbox import Outbox
+from page_load import LoadTimer, block_in_chrome, chrome_load_stats, configure_chrome_options, wait_for_data
+
 # Setup logging with file + console
 logging.basicConfig(
     level=logging.INFO,
@@ -24,13 +29,23 @@ logger = logging.getLogger(__name__)
 # Configuration (EDIT THESE)
 download_path = r"C:\Users\saikumar\Desktop\chartlink\15_minute"
 os.makedirs(download_path, exist_ok=True)
+# Chrome saves here; finished files are renamed into download_path
+incoming_path = os.path.join(download_path, "incoming")
 
 API_URL = "https://chartlink-api.onrender.com"  # Replace with your Render URL
 url = "https://chartink.com/screener/15-minute-stock-breakouts"
 
-# Market hours: 9:15 AM to 3:30 PM (IST)
-market_start = datetime.now().replace(hour=9, minute=15, second=0, microsecond=0)
-market_end = datetime.now().replace(hour=15, minute=30, second=0, microsecond=0)
+# 'http' requests the screener data directly and only starts Chrome if that
+# fails; 'browser' always clicks the CSV button
+ACQUISITION_MODE = os.getenv('ACQUISITION_MODE', 'http')
+# Scan clause to post in HTTP mode; read from the screener page when unset
+SCAN_CLAUSE = os.getenv('SCAN_CLAUSE')
+
+# Market hours: 9:15 AM to 3:30 PM IST on trading days (see market_schedule.py)
+calendar = MarketCalendar.from_file()
+# One pull per minute on the minute. Ticks missed by a slow pull are skipped:
+# a screener only shows the current minute, so a late pull can't recover them.
+scheduler = MinuteScheduler(calendar, interval=60)
 
 # Retry configuration
 MAX_RETRIES = 3
@@ -39,120 +54,142 @@ RETRY_DELAY = 5  # seconds
 # Chrome options
 chrome_options = webdriver.ChromeOptions()
 chrome_options.add_experimental_option("prefs", {
-    "download.default_directory": download_path,
+    "download.default_directory": incoming_path,
     "download.prompt_for_download": False,
     "download.directory_upgrade": True,
 })
 chrome_options.add_argument("--disable-blink-features=AutomationControlled")
 chrome_options.add_argument("--no-sandbox")
 chrome_options.add_argument("--disable-dev-shm-usage")  # For memory issues
+# Load only what the table needs: no images, fonts, ads or analytics (see page_load.py)
+configure_chrome_options(chrome_options)
+
+watcher = DownloadWatcher(incoming_path, download_path)
+# Batches are logged to disk here and posted by a background sender (see outbox.py)
+outbox = Outbox(os.path.join(download_path, "outbox.jsonl"), f"{API_URL}/api/data/insert")
+http_client = ChartinkClient(url, scan_clause=SCAN_CLAUSE) if ACQUISITION_MODE == 'http' else None
+driver = None
 
-driver = webdriver.Chrome(options=chrome_options)
+def open_browser():
+    """Start Chrome on first use (browser mode, or when HTTP acquisition fails)"""
+    global driver
+    if driver is None:
+        driver = webdriver.Chrome(options=chrome_options)
+        block_in_chrome(driver)
+        load_page()
+        logger.info("✓ Browser loaded")
+    return driver
+
+def load_page(refresh=False):
+    """(Re)load the screener and wait for its results table, not the whole page"""
+    timer = LoadTimer("Refresh" if refresh else "Page load")
+    if refresh:
+        driver.refresh()
+    else:
+        driver.get(url)
+    try:
+        wait_for_data(driver)
+    except TimeoutException:
+        logger.warning("⚠ Results table not ready after 15 seconds")
+        return
+    timer.finish(chrome_load_stats(driver))
+
+def fetch_via_browser():
+    """Click CSV and read the download; returns (records, downloaded file)"""
+    # Only the browser path needs pandas; HTTP mode never loads it
+    import pandas as pd
+    
+    browser = open_browser()
+    csv_link = WebDriverWait(browser, 5).until(
+        EC.element_to_be_clickable((By.XPATH, '//span[text()="CSV"]'))
+    )
+    watcher.expect()
+    csv_link.click()
+    logger.info("✓ CSV clicked")
+    
+    # Wait for the download to complete (filesystem notification)
+    filepath = watcher.wait(timeout=10)
+    if not filepath:
+        logger.warning("✗ Download did not complete within 10 seconds")
+        return None, None
+    
+    df = pd.read_csv(filepath)
+    logger.info(f"✓ Read {len(df)} rows from CSV")
+    return df.to_dict('records'), filepath
+
+def fetch_data():
+    """Screener rows for this tick over HTTP, falling back to the browser"""
+    if http_client is not None:
+        try:
+            data = http_client.fetch()
+            logger.info(f"✓ Fetched {len(data)} rows over HTTP")
+            return data, None
+        except AcquisitionError as e:
+            logger.warning(f"⚠ HTTP fetch failed ({e}); falling back to browser")
+    return fetch_via_browser()
 
 try:
-    driver.get(url)
-    logger.info("✓ Browser loaded")
+    if http_client is None:
+        open_browser()
+    outbox.start()
     
     iteration = 0
-    while True:
+    session_day = None
+    # Blocks until each minute boundary; sleeps through nights, weekends and holidays
+    for tick in scheduler.ticks():
         iteration += 1
-        current_time = datetime.now()
         
-        # Check market hours (9:15 AM to 3:30 PM)
-        if not (market_start <= current_time <= market_end):
-            logger.info(f"Market closed ({current_time.strftime('%H:%M:%S')}). Waiting for next session...")
-            # Wait 1 hour before checking again
-            time.sleep(3600)
-            continue
+        if tick.date() != session_day:
+            # First pull of a session: the page has been idle since the last close
+            if session_day is not None and driver is not None:
+                load_page(refresh=True)
+            session_day = tick.date()
         
-        logger.info(f"\n--- Iteration {iteration} ({current_time.strftime('%H:%M:%S')}) ---")
+        logger.info(f"\n--- Iteration {iteration} ({tick.strftime('%H:%M:%S')}) ---")
         
+        # Retries must not run into the next tick
+        deadline = tick.timestamp() + 55
         retry_count = 0
         success = False
         
-        while retry_count < MAX_RETRIES and not success:
+        while retry_count < MAX_RETRIES and not success and time.time() < deadline:
             try:
-                # Wait for CSV button
-                csv_link = WebDriverWait(driver, 5).until(
-                    EC.element_to_be_clickable((By.XPATH, '//span[text()="CSV"]'))
-                )
-                csv_link.click()
-                logger.info("✓ CSV clicked")
-                
-                # Wait for download
-                initial_files = set(os.listdir(download_path))
-                timeout = time.time() + 10
-                
-                while time.time() < timeout:
-                    current_files = set(os.listdir(download_path))
-                    new_files = current_files - initial_files
-                    if new_files and not any(f.endswith('.crdownload') for f in new_files):
-                        break
-                    time.sleep(0.3)
-                
-                # Get latest file
-                files = sorted(
-                    [f for f in os.listdir(download_path) if os.path.isfile(os.path.join(download_path, f))],
-                    key=lambda x: os.path.getmtime(os.path.join(download_path, x)),
-                    reverse=True
-                )
+                data, filepath = fetch_data()
                 
-                if files:
-                    latest_file = files[0]
-                    filepath = os.path.join(download_path, latest_file)
+                if data is not None:
+                    # Durable once on disk; the sender posts it (and anything
+                    # backlogged by an API outage) without blocking the next tick
+                    batch_id = outbox.put(tick, data)
+                    success = True
+                    logger.info(f"✓ Queued batch {batch_id} ({outbox.pending} pending)")
                     
-                    # Read CSV
-                    df = pd.read_csv(filepath)
-                    data = df.to_dict('records')
-                    logger.info(f"✓ Read {len(df)} rows from CSV")
-                    
-                    # Send to API
-                    try:
-                        response = requests.post(
-                            f"{API_URL}/api/data/insert",
-                            json=data,
-                            timeout=15
-                        )
-                        if response.status_code == 200:
-                            result = response.json()
-                            logger.info(f"✓ API Success: {result}")
-                            success = True
-                        else:
-                            logger.error(f"✗ API Error (Status {response.status_code}): {response.text}")
-                            retry_count += 1
-                    except Exception as e:
-                        logger.error(f"✗ API Connection Error: {e}")
-                        retry_count += 1
-                    
-                    if success:
-                        # Rename file
-                        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-                        _, ext = os.path.splitext(latest_file)
+                    # Archive the batch as 15_minutes_<timestamp>.csv
+                    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+                    if filepath:
+                        _, ext = os.path.splitext(filepath)
                         new_name = f"15_minutes_{timestamp}{ext}"
                         os.rename(filepath, os.path.join(download_path, new_name))
-                        logger.info(f"✓ Renamed to: {new_name}")
+                    else:
+                        new_name = f"15_minutes_{timestamp}.csv"
+                        write_csv(data, os.path.join(download_path, new_name))
+                    logger.info(f"✓ Saved as: {new_name}")
                 else:
-                    logger.warning("✗ No files found in download folder")
                     retry_count += 1
                 
             except Exception as e:
                 logger.error(f"✗ Error: {e}")
                 retry_count += 1
-                if retry_count < MAX_RETRIES:
+                if retry_count < MAX_RETRIES and time.time() + RETRY_DELAY < deadline:
                     logger.info(f"Retrying in {RETRY_DELAY} seconds ({retry_count}/{MAX_RETRIES})...")
                     time.sleep(RETRY_DELAY)
         
         if not success:
             logger.warning("Failed after all retries. Refreshing page...")
-            driver.refresh()
-            time.sleep(5)
         
         # Refresh page for next cycle
-        driver.refresh()
-        
-        # Wait 60 seconds until next pull
-        logger.info("⏳ Waiting 60 seconds until next pull...")
-        time.sleep(60)
+        if driver is not None:
+            load_page(refresh=True)
+        logger.info("⏳ Waiting for the next minute...")
 
 except KeyboardInterrupt:
     logger.info("\n⛔ Stopped by user (Ctrl+C)")
@@ -161,6 +198,12 @@ except Exception as e:
     logger.critical(f"❌ Critical error: {e}")
     
 finally:
-    driver.quit()
+    if driver is not None:
+        driver.quit()
+    if http_client is not None:
+        http_client.close()
+    watcher.stop()
+    # Unsent batches stay in the outbox file and go out on the next start
+    outbox.close()
     logger.info("✓ Browser closed")
     logger.info("Script ended")
@@ -0,0 +1,97 @@
+"""
+Local stand-in for the Chartink screener, for trying and timing the HTTP
+acquisition mode (chartink_http.py) without touching the real site.
+
+Serves a screener page carrying a CSRF token, a session cookie and the scan
+clause, and answers POST /screener/process with JSON rows the way the real
+endpoint does. Requests without a matching token and cookie get HTTP 419.
+Tokens expire after TOKEN_TTL seconds, to exercise the refresh path.
+
+    python standin_server.py [--port 8765] [--rows 100] [--token-ttl 300]
+"""
+
+import argparse
+import json
+import random
+import secrets
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+SCAN_CLAUSE = '( {cash} ( latest close > 1 day ago close * 1.02 ) )'
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta name="csrf-token" content="{token}"><title>Screener</title></head>
+<body><form><textarea name="scan_clause">{clause}</textarea></form></body></html>
+"""
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    rows = 100
+    token_ttl = 300
+    sessions = {}   # session cookie -> (token, issued_at)
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if not self.path.startswith('/screener/'):
+            return self._send(404, 'text/plain', b'not found')
+        session = secrets.token_hex(16)
+        token = secrets.token_hex(20)
+        self.sessions[session] = (token, time.time())
+        body = PAGE.format(token=token, clause=SCAN_CLAUSE.replace('>', '&gt;')).encode()
+        self._send(200, 'text/html', body, {'Set-Cookie': f'ci_session={session}; Path=/; HttpOnly'})
+
+    def do_POST(self):
+        if self.path != '/screener/process':
+            return self._send(404, 'text/plain', b'not found')
+        length = int(self.headers.get('Content-Length', 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        cookies = dict(part.strip().split('=', 1) for part in self.headers.get('Cookie', '').split(';') if '=' in part)
+
+        issued = self.sessions.get(cookies.get('ci_session'))
+        token_ok = issued and issued[0] == self.headers.get('X-CSRF-TOKEN')
+        if not token_ok or time.time() - issued[1] > self.token_ttl:
+            return self._send(419, 'application/json', b'{"message": "CSRF token mismatch."}')
+        if form.get('scan_clause', [''])[0] != SCAN_CLAUSE:
+            return self._send(200, 'application/json', b'{"scan_error": "Invalid scan clause"}')
+
+        rng = random.Random()
+        data = [
+            {
+                'sr': i + 1,
+                'nsecode': f'SYM{i:04d}',
+                'name': f'Company {i} Ltd',
+                'bsecode': str(500000 + i),
+                'per_chg': round(rng.uniform(-8, 12), 2),
+                'close': round(rng.uniform(10, 5000), 2),
+                'volume': rng.randint(1_000, 5_000_000),
+            }
+            for i in range(self.rows)
+        ]
+        body = json.dumps({'draw': 1, 'recordsTotal': self.rows, 'recordsFiltered': self.rows, 'data': data})
+        self._send(200, 'application/json', body.encode())
+
+    def _send(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Local stand-in for the Chartink screener')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--token-ttl', type=float, default=300)
+    args = parser.parse_args()
+
+    StandinHandler.rows = args.rows
+    StandinHandler.token_ttl = args.token_ttl
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), StandinHandler)
+    print(f"Stand-in screener at http://127.0.0.1:{args.port}/screener/15-minute-stock-breakouts")
+    server.serve_forever()
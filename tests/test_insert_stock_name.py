@@ -0,0 +1,80 @@
+"""
+Records from the HTTP acquisition client keep their stock name through
+/api/data/insert, on both ingest paths.
+
+Needs DATABASE_URL pointing at a database you can throw away:
+
+    DATABASE_URL=postgresql://postgres@localhost/test python -m unittest discover -s tests
+"""
+
+import os
+import sys
+import unittest
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+sys.path.insert(0, os.path.join(ROOT, 'backend'))
+sys.path.insert(0, os.path.join(ROOT, 'selenium'))
+
+from chartink_http import to_records  # noqa: E402
+
+SCREENER = 'test-stock-name'
+PAYLOAD = {'data': [
+    {'sr': 1, 'name': 'Test Industries Ltd', 'nsecode': 'TRCTEST1', 'per_chg': 2.5, 'close': 101.5, 'volume': 12000},
+    {'sr': 2, 'name': 'Sample Textiles Ltd', 'nsecode': 'TRCTEST2', 'per_chg': 1.25, 'close': 48.3, 'volume': 900},
+]}
+NAMES = {row['nsecode']: row['name'] for row in PAYLOAD['data']}
+
+
+@unittest.skipUnless(os.getenv('DATABASE_URL'), 'DATABASE_URL is not set')
+class InsertStockNameTest(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(cls):
+        import app as backend
+        cls.backend = backend
+        backend.init_db()
+        cls.client = backend.app.test_client()
+
+    def tearDown(self):
+        with self.backend.db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM stocks WHERE screener = %s", (SCREENER,))
+            cursor.execute("DELETE FROM stocks_latest WHERE symbol = ANY(%s)", (list(NAMES),))
+            conn.commit()
+            cursor.close()
+
+    def stored_names(self):
+        with self.backend.db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT symbol, stock_name FROM stocks WHERE screener = %s", (SCREENER,))
+            rows = dict(cursor.fetchall())
+            cursor.close()
+        return rows
+
+    def post(self, mode):
+        response = self.client.post(
+            f'/api/data/insert?mode={mode}&screener={SCREENER}', json=to_records(PAYLOAD)
+        )
+        self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+
+    def test_values_path_keeps_stock_name(self):
+        self.post('values')
+        self.assertEqual(self.stored_names(), NAMES)
+
+    def test_copy_path_keeps_stock_name(self):
+        self.post('copy')
+        self.assertEqual(self.stored_names(), NAMES)
+
+    def test_csv_download_key_is_accepted(self):
+        records = to_records(PAYLOAD)
+        for record in records:
+            record['Stock Name'] = record.pop('Stock Narr')
+        for mode in ('values', 'copy'):
+            response = self.client.post(f'/api/data/insert?mode={mode}&screener={SCREENER}', json=records)
+            self.assertEqual(response.status_code, 200, response.get_data(as_text=True))
+            self.assertEqual(self.stored_names(), NAMES)
+            self.tearDown()
+
+
+if __name__ == '__main__':
+    unittest.main()